@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apoyos.models import ProgramaSocial
+from core.imagenes import srcset_imagen
 from servicios.api.serializers import RequisitoSerializer
 
 
@@ -8,6 +9,7 @@ class ProgramaSocialSerializer(serializers.ModelSerializer):
     nombre_dependencia = serializers.CharField(
         source="dependencia.nombre", read_only=True
     )
+    imagen_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProgramaSocial
@@ -19,12 +21,16 @@ class ProgramaSocialSerializer(serializers.ModelSerializer):
             "esta_activo",
             "requisitos_especificos",
             "imagen",
+            "imagen_srcset",
             "destacado",
             "categoria",
             "nombre_dependencia",
         ]
         read_only_fields = ["id"]
 
+    def get_imagen_srcset(self, obj):
+        return srcset_imagen(obj.imagen, self.context.get("request"))
+
 
 class ProgramaSocialCreateUpdateSerializer(serializers.ModelSerializer):
     """
@@ -51,6 +57,7 @@ class ProgramaSocialListSerializer(serializers.ModelSerializer):
     nombre_dependencia = serializers.CharField(
         source="dependencia.nombre", read_only=True
     )
+    imagen_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProgramaSocial
@@ -62,10 +69,17 @@ class ProgramaSocialListSerializer(serializers.ModelSerializer):
             "nombre_dependencia",
             "cantidad_requisitos",
             "imagen",
+            "imagen_srcset",
             "destacado",
             "categoria",
         ]
         read_only_fields = ["id"]
 
     def get_cantidad_requisitos(self, obj):
+        # Anotado por el ViewSet con Count("requisitos_especificos")
+        if hasattr(obj, "total_requisitos"):
+            return obj.total_requisitos
         return obj.requisitos_especificos.count()
+
+    def get_imagen_srcset(self, obj):
+        return srcset_imagen(obj.imagen, self.context.get("request"))
@@ -1,8 +1,12 @@
+from django.db.models import Count
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, filters
 from rest_framework.permissions import IsAuthenticated
 
 from apoyos.models import ProgramaSocial
+from core.autenticacion import dependencia_id_de
+from core.condicional import CatalogoCondicionalMixin, CatalogoEnCacheMixin
+from core.versiones import PROGRAMAS
 from core.permissions import IsAdministradorOrFuncionario, ReadOnlyOrStaff, ReadOnlyPublicOrStaff
 from .serializers import (
     ProgramaSocialSerializer,
@@ -14,7 +18,9 @@ from .serializers import (
 from ..filters import ProgramaSocialFilter
 
 
-class ProgramaSocialViewSet(viewsets.ModelViewSet):
+class ProgramaSocialViewSet(
+    CatalogoCondicionalMixin, CatalogoEnCacheMixin, viewsets.ModelViewSet
+):
     """
     ViewSet para gestionar programas sociales.
     - Lectura: Todos los usuarios autenticados
@@ -33,6 +39,7 @@ class ProgramaSocialViewSet(viewsets.ModelViewSet):
     search_fields = ["nombre", "descripcion"]
     ordering_fields = ["nombre"]
     ordering = ["nombre"]
+    versiones_catalogo = (PROGRAMAS,)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -48,7 +55,7 @@ class ProgramaSocialViewSet(viewsets.ModelViewSet):
         - Funcionarios: solo programas de su dependencia
         - Administradores: todos los programas
         """
-        queryset = super().get_queryset()
+        queryset = self._queryset_por_accion(super().get_queryset())
         user = self.request.user
 
         # Si es ciudadano, solo mostrar programas activos
@@ -57,14 +64,33 @@ class ProgramaSocialViewSet(viewsets.ModelViewSet):
         
         # Si es funcionario, solo mostrar programas de su dependencia
         elif hasattr(user, "rol") and user.rol == "FUNCIONARIO":
-            if hasattr(user, 'funcionario') and user.funcionario:
-                queryset = queryset.filter(dependencia=user.funcionario.dependencia)
+            dependencia_id = dependencia_id_de(user)
+            if dependencia_id:
+                queryset = queryset.filter(dependencia_id=dependencia_id)
             else:
                 # Si no tiene perfil de funcionario asociado, no mostrar nada
                 queryset = queryset.none()
 
         return queryset
 
+    def alcance_cache_catalogo(self, request):
+        # Los ciudadanos solo ven los programas activos
+        if getattr(request.user, "rol", None) == "CIUDADANO":
+            return "activos"
+        return super().alcance_cache_catalogo(request)
+
+    def _queryset_por_accion(self, queryset):
+        """
+        Dependencia por JOIN y conteo de requisitos anotado; en el detalle,
+        los requisitos se cargan en una sola consulta adicional.
+        """
+        queryset = queryset.select_related("dependencia").annotate(
+            total_requisitos=Count("requisitos_especificos")
+        )
+        if self.action != "list":
+            queryset = queryset.prefetch_related("requisitos_especificos")
+        return queryset
+
     def perform_create(self, serializer):
         """
         Validar que el funcionario solo cree programas para su dependencia
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ApoyosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apoyos'
+
+    def ready(self):
+        import apoyos.signals  # noqa
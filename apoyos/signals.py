@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apoyos.models import ProgramaSocial
+from core.imagenes import generar_variantes_en_segundo_plano
+from core.versiones import PROGRAMAS, incrementar_al_confirmar
+from servicios.services.publicacion import programar_publicacion
+
+
+@receiver([post_save, post_delete], sender=ProgramaSocial)
+def versionar_programas(sender, **kwargs):
+    """Invalida ETag y cachés del catálogo de programas sociales."""
+    incrementar_al_confirmar(PROGRAMAS)
+    transaction.on_commit(programar_publicacion)
+
+
+@receiver(post_save, sender=ProgramaSocial)
+def generar_variantes_programa(sender, instance, **kwargs):
+    """Pre-genera las variantes responsivas de la imagen al guardar el programa."""
+    if kwargs.get("raw") or not instance.imagen:
+        return
+    nombre = instance.imagen.name
+    transaction.on_commit(lambda: generar_variantes_en_segundo_plano(nombre))
@@ -1,16 +1,14 @@
-from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from django.core import exceptions
 from ciudadanos.models import Ciudadano
-from ciudadanos.validators.curp import validate_curp_format, check_curp_unica
+from ciudadanos.validators.curp import validate_curp_format, check_registro_unico
 from core.choices import Roles
 from localidades.api.serializers import LocalidadSerializer
+from notificaciones.services import NotificationManager
 from usuarios.api.serializers import UsuarioSerializer, UsuarioCreateSerializer
 from usuarios.models import Usuario
-from django.db import transaction
+from django.db import IntegrityError, transaction
 
 
 class RegistroCiudadanoSerializer(serializers.ModelSerializer):
@@ -36,62 +34,51 @@ class RegistroCiudadanoSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         try:
-            attrs["curp"] = validate_curp_format(attrs["curp"])
+            attrs["curp"] = validate_curp_format(attrs["curp"], comprobar_unicidad=False)
         except exceptions.ValidationError as e:
             raise serializers.ValidationError(e.messages)
 
-        return attrs
-
-    def validate_correo(self, value):
-        import hashlib
+        # Unicidad de CURP y correo en una sola consulta
+        errores = check_registro_unico(attrs["curp"], attrs["correo"])
+        if errores:
+            raise serializers.ValidationError(errores)
 
-        correo_hash = hashlib.sha256(value.lower().encode()).hexdigest()
-        if Ciudadano.objects.filter(correo_hash=correo_hash).exists():
-            raise serializers.ValidationError(
-                "Este correo electrónico ya se encuentra registrado."
-            )
-        return value
+        return attrs
 
     def create(self, validated_data: dict):
         usuario_data = validated_data.pop("usuario")
         curp = validated_data.pop("curp")
-        correo_destino = validated_data.get("correo")
+        manager = NotificationManager()
 
-        with transaction.atomic():
-            usuario = Usuario.objects.create_user(
-                rol=Roles.CIUDADANO, username=curp, **usuario_data
-            )
-
-            ciudadano = Ciudadano.objects.create(
-                usuario=usuario, curp=curp, **validated_data
+        try:
+            with transaction.atomic():
+                usuario = Usuario.objects.create_user(
+                    rol=Roles.CIUDADANO, username=curp, **usuario_data
+                )
+
+                ciudadano = Ciudadano.objects.create(
+                    usuario=usuario, curp=curp, **validated_data
+                )
+
+                # El correo de bienvenida queda en la bandeja de salida y se envía
+                # fuera de la petición, solo si el registro se confirma
+                bienvenida = manager.encolar_bienvenidas([usuario])[0]
+                if bienvenida.pk:
+                    transaction.on_commit(
+                        lambda: manager.enviar_correo_en_segundo_plano(bienvenida.pk)
+                    )
+        except IntegrityError:
+            # Registro simultáneo con la misma CURP o correo (restricciones unique)
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        "La CURP o el correo electrónico ya se encuentran registrados."
+                    ]
+                }
             )
 
-        self.enviar_correo_institucional(correo_destino, ciudadano.nombre, curp)
-
         return ciudadano
 
-    def enviar_correo_institucional(self, email_destino, nombre, curp):
-        context = {"nombre": nombre, "curp": curp, "web": settings.WEB_URL}
-
-        # Renderiza el HTML con los datos del ciudadano
-        html_content = render_to_string("bienvenida_email.html", context)
-        # Crea una versión en texto plano para clientes que no soportan HTML
-        text_content = strip_tags(html_content)
-
-        print(f"Enviando correo a {email_destino}")
-
-        try:
-            send_mail(
-                subject="Bienvenido al Registro Ciudadano - Macuspana",
-                message=text_content,
-                from_email=None,
-                recipient_list=[email_destino],
-                html_message=html_content,  # Este parámetro activa el formato visual
-                fail_silently=False,
-            )
-        except Exception as e:
-            print(f"Error al enviar correo: {e}")
-
 
 class CiudadanoSerializer(serializers.ModelSerializer):
     usuario = UsuarioSerializer()
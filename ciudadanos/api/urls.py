@@ -6,10 +6,12 @@ from ciudadanos.api.views import (
     CiudadanoListView,
     CiudadanoUpdateView,
     CiudadanoDireccionUpdateView,
+    CiudadanoExportView,
 )
 
 urlpatterns = [
     path('lista/', CiudadanoListView.as_view(), name='ciudadano-lista'),
+    path('exportar/', CiudadanoExportView.as_view(), name='ciudadano-exportar'),
     path('actualizar/<int:pk>/', CiudadanoUpdateView.as_view(), name='ciudadano-actualizar'),
     path('actualizar-direccion/', CiudadanoDireccionUpdateView.as_view(), name='ciudadano-direccion-update'),
     path('verificar-curp/', verificar_curp_view, name='ciudadano-verificar-curp'),
@@ -1,11 +1,14 @@
 from rest_framework.decorators import api_view, throttle_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 
 from ciudadanos.api.serializers import RegistroCiudadanoSerializer
 from rest_framework import generics, filters
 from ciudadanos.models import Ciudadano
-from ciudadanos.validators.curp import validate_curp_format, check_curp_unica
+from ciudadanos.validators.curp import validate_curp_format
+from core.timing import MedidorFases
+from core.search import filtrar_por_nombre
 from django.db.models import Q
 import hashlib
 
@@ -14,6 +17,28 @@ class CiudadanoCreateView(generics.CreateAPIView):
     serializer_class = RegistroCiudadanoSerializer
     queryset = Ciudadano.objects.all()
 
+    def create(self, request, *args, **kwargs):
+        # Tiempos por fase (validación / guardado / respuesta) en la cabecera Server-Timing
+        medidor = MedidorFases("registro_ciudadano")
+
+        serializer = self.get_serializer(data=request.data)
+        try:
+            with medidor.fase("validacion"):
+                serializer.is_valid(raise_exception=True)
+        except ValidationError:
+            # El manejador de excepciones de DRF arma la respuesta; aquí solo se registra
+            medidor.registrar()
+            raise
+
+        with medidor.fase("guardado"):
+            self.perform_create(serializer)
+
+        with medidor.fase("serializacion"):
+            data = serializer.data
+
+        headers = self.get_success_headers(data)
+        return medidor.registrar(Response(data, status=201, headers=headers))
+
 
 @api_view(['POST'])
 @throttle_classes([AnonRateThrottle])  # Límite de 5/min en settings
@@ -22,8 +47,7 @@ def verificar_curp_view(request):
 
     try:
         # Validaciones locales (Costo 0)
-        validate_curp_format(curp_input)
-        check_curp_unica(curp_input)
+        validate_curp_format(curp_input)  # Formato y unicidad en una consulta
 
         return Response(status=204)
 
@@ -101,13 +125,16 @@ class CiudadanoListView(generics.ListAPIView):
             curp_hash = hashlib.sha256(search.upper().encode()).hexdigest()
             email_hash = hashlib.sha256(search.lower().encode()).hexdigest()
             
-            queryset = queryset.filter(
-                Q(nombre__icontains=search) |
-                Q(apellido_paterno__icontains=search) |
-                Q(apellido_materno__icontains=search) |
-                Q(curp_hash=curp_hash) |
-                Q(correo_hash=email_hash) |
-                Q(telefono__icontains=search)
+            # Nombre: columna normalizada (sin acentos) con similitud de trigramas
+            queryset = filtrar_por_nombre(
+                queryset,
+                ['nombre_busqueda'],
+                search,
+                extra=(
+                    Q(curp_hash=curp_hash) |
+                    Q(correo_hash=email_hash) |
+                    Q(telefono__icontains=search)
+                ),
             )
         
         return queryset
@@ -140,3 +167,35 @@ class CiudadanoDireccionUpdateView(generics.UpdateAPIView):
     def get_object(self):
         """Obtener el ciudadano del usuario autenticado"""
         return self.request.user.ciudadano
+
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.views import APIView
+from ciudadanos.services.exportacion import FORMATOS, exportar_padron
+from core.permissions import IsAdministrador
+
+
+class CiudadanoExportView(APIView):
+    """
+    Exporta el padrón completo en streaming (CSV o JSONL) sin paginar.
+    GET /ciudadanos/exportar/?formato=csv|jsonl
+    """
+    permission_classes = [IsAuthenticated, IsAdministrador]
+
+    def get(self, request):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            return Response(
+                {"detail": f"Formato no soportado. Opciones: {', '.join(FORMATOS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(
+            exportar_padron(formato, procesos=settings.EXPORTACION_PROCESOS),
+            content_type=FORMATOS[formato],
+        )
+        nombre = f"padron_ciudadanos_{timezone.localdate():%Y%m%d}.{formato}"
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return response
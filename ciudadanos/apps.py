@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CiudadanosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ciudadanos'
+
+    def ready(self):
+        from ciudadanos.signals import preparar_busqueda_nombre
+
+        post_migrate.connect(preparar_busqueda_nombre, sender=self)
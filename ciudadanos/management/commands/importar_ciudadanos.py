@@ -0,0 +1,173 @@
+import csv
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from ciudadanos.models import Ciudadano
+from ciudadanos.services.importacion import (
+    FilaInvalida,
+    guardar_lote,
+    inicializar_worker,
+    normalizar_fila,
+)
+from localidades.models import Localidad
+from usuarios.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa ciudadanos desde un CSV en lotes, con hash de contraseña y cifrado "
+        "en paralelo. Columnas: curp, nombre, apellido_paterno, apellido_materno, "
+        "fecha_nacimiento, sexo, correo, telefono, calle, numero_exterior, "
+        "numero_interior, localidad_id, password (opcional)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ruta", type=str)
+        parser.add_argument("--lote", type=int, default=500, help="Ciudadanos por lote")
+        parser.add_argument(
+            "--procesos", type=int, default=os.cpu_count() or 1, help="Procesos del pool"
+        )
+        parser.add_argument("--encoding", type=str, default="utf-8")
+        parser.add_argument("--delimitador", type=str, default=",")
+        parser.add_argument(
+            "--password-temporal",
+            type=str,
+            default=None,
+            help="Contraseña para filas sin columna password (si se omite, queda inutilizable)",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        self.leidas = 0
+        self.invalidas = 0
+        self.duplicadas = 0
+        self.creadas = 0
+        self.lotes_fallidos = 0
+        self.curps_vistas = set()
+        self.correos_vistos = set()
+
+        procesos = max(1, options["procesos"])
+        self.stdout.write(f"Importando con {procesos} procesos y lotes de {options['lote']}")
+
+        # 'spawn': los procesos hijos no heredan la conexión a BD del proceso principal
+        with ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=inicializar_worker,
+        ) as pool:
+            en_vuelo = set()
+            for registros in self._leer_lotes(options):
+                registros = self._depurar_lote(registros)
+                if not registros:
+                    continue
+
+                en_vuelo.add(pool.submit(guardar_lote, registros, options["password_temporal"]))
+
+                # Limitar lotes en memoria para mantener el consumo constante
+                if len(en_vuelo) >= procesos * 2:
+                    terminados, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    self._recoger(terminados)
+
+            self._recoger(wait(en_vuelo).done)
+
+        self._reportar(time.perf_counter() - inicio)
+
+    def _leer_lotes(self, options):
+        """Lee el CSV en streaming y produce lotes de filas normalizadas."""
+        lote = []
+        with open(options["ruta"], newline="", encoding=options["encoding"]) as archivo:
+            lector = csv.DictReader(archivo, delimiter=options["delimitador"])
+            for numero_linea, fila in enumerate(lector, start=2):
+                self.leidas += 1
+                try:
+                    lote.append(normalizar_fila(fila))
+                except FilaInvalida as e:
+                    self.invalidas += 1
+                    self.stderr.write(f"Línea {numero_linea}: {e}")
+                    continue
+
+                if len(lote) >= options["lote"]:
+                    yield lote
+                    lote = []
+        if lote:
+            yield lote
+
+    def _depurar_lote(self, registros):
+        """
+        Descarta CURP/correos repetidos en el archivo o ya registrados,
+        con cuatro consultas por lote en lugar de varias por ciudadano.
+        """
+        unicos = []
+        for registro in registros:
+            if registro["curp_hash"] in self.curps_vistas or registro["correo_hash"] in self.correos_vistos:
+                self.duplicadas += 1
+                continue
+            self.curps_vistas.add(registro["curp_hash"])
+            self.correos_vistos.add(registro["correo_hash"])
+            unicos.append(registro)
+
+        if not unicos:
+            return unicos
+
+        curps_existentes = set(
+            Ciudadano.global_objects.filter(
+                curp_hash__in=[r["curp_hash"] for r in unicos]
+            ).values_list("curp_hash", flat=True)
+        )
+        correos_existentes = set(
+            Ciudadano.global_objects.filter(
+                correo_hash__in=[r["correo_hash"] for r in unicos]
+            ).values_list("correo_hash", flat=True)
+        )
+        usernames_existentes = set(
+            Usuario.global_objects.filter(
+                username__in=[r["curp"] for r in unicos]
+            ).values_list("username", flat=True)
+        )
+        localidades_validas = set(
+            Localidad.objects.filter(
+                id__in={r["localidad_id"] for r in unicos if r["localidad_id"]}
+            ).values_list("id", flat=True)
+        )
+
+        depurados = []
+        for registro in unicos:
+            if (
+                registro["curp_hash"] in curps_existentes
+                or registro["correo_hash"] in correos_existentes
+                or registro["curp"] in usernames_existentes
+            ):
+                self.duplicadas += 1
+                continue
+            if registro["localidad_id"] and registro["localidad_id"] not in localidades_validas:
+                registro["localidad_id"] = None
+            depurados.append(registro)
+
+        return depurados
+
+    def _recoger(self, futuros):
+        for futuro in futuros:
+            try:
+                self.creadas += futuro.result()
+            except Exception as e:
+                self.lotes_fallidos += 1
+                self.stderr.write(self.style.ERROR(f"Error al guardar lote: {e}"))
+
+    def _reportar(self, segundos):
+        self.stdout.write(f"Filas leídas: {self.leidas}")
+        self.stdout.write(f"Inválidas: {self.invalidas}")
+        self.stdout.write(f"Duplicadas o ya registradas: {self.duplicadas}")
+        if self.lotes_fallidos:
+            self.stdout.write(self.style.ERROR(f"Lotes fallidos: {self.lotes_fallidos}"))
+        self.stdout.write(f"Tiempo total: {segundos:.1f} s")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {self.creadas} ciudadanos creados "
+                f"({self.creadas / segundos if segundos else 0:.1f} ciudadanos/s). "
+                "Correos de bienvenida en cola: ejecute enviar_correos_pendientes."
+            )
+        )
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from ciudadanos.services.cifrado import llaves_configuradas, modelos_cifrados, rotar_rango
+from ciudadanos.services.importacion import inicializar_worker
+
+
+def huella_llave(llave) -> str:
+    """Identifica la llave en el checkpoint sin guardarla."""
+    if isinstance(llave, str):
+        llave = llave.encode()
+    return hashlib.sha256(llave).hexdigest()[:16]
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelve a cifrar los campos cifrados con la primera llave de FIELD_ENCRYPTION_KEY. "
+        "Configure FIELD_ENCRYPTION_KEY=nueva,anterior durante la rotación y retire "
+        "la anterior al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=500, help="Filas por rango de pk")
+        parser.add_argument(
+            "--procesos", type=int, default=os.cpu_count() or 1, help="Procesos del pool"
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=str,
+            default=str(settings.BASE_DIR / "rotar_llave_cifrado.checkpoint.json"),
+            help="Archivo de avance para reanudar",
+        )
+        parser.add_argument(
+            "--reiniciar", action="store_true", help="Ignora el avance guardado"
+        )
+
+    def handle(self, *args, **options):
+        if len(llaves_configuradas()) < 2:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Solo hay una llave configurada: no hay datos que rotar salvo "
+                    "valores guardados sin cifrar."
+                )
+            )
+
+        self.ruta_checkpoint = options["checkpoint"]
+        self.huella_llave = huella_llave(llaves_configuradas()[0])
+        self.checkpoint = {} if options["reiniciar"] else self._leer_checkpoint()
+
+        inicio = time.perf_counter()
+        total_revisadas = 0
+        total_actualizadas = 0
+        procesos = max(1, options["procesos"])
+
+        with ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=inicializar_worker,
+        ) as pool:
+            for etiqueta, campos in modelos_cifrados():
+                revisadas, actualizadas = self._rotar_modelo(
+                    pool, procesos, etiqueta, campos, options["lote"]
+                )
+                total_revisadas += revisadas
+                total_actualizadas += actualizadas
+
+        # Rotación completa: el avance ya no sirve para la siguiente
+        try:
+            os.remove(self.ruta_checkpoint)
+        except FileNotFoundError:
+            pass
+
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {total_revisadas} filas revisadas, {total_actualizadas} recifradas "
+                f"en {segundos:.1f} s ({total_revisadas / segundos if segundos else 0:.0f} filas/s)."
+            )
+        )
+
+    def _rotar_modelo(self, pool, procesos, etiqueta, campos, lote):
+        modelo = apps.get_model(etiqueta)
+        limites = modelo._base_manager.aggregate(minimo=Min("pk"), maximo=Max("pk"))
+        if limites["maximo"] is None:
+            return 0, 0
+
+        # Reanudar desde el último pk confirmado
+        desde = max(limites["minimo"], self.checkpoint.get(etiqueta, limites["minimo"] - 1) + 1)
+        self.stdout.write(f"{etiqueta}: campos {', '.join(campos)} (pk {desde}..{limites['maximo']})")
+
+        rangos = range(desde, limites["maximo"] + 1, lote)
+        pendientes = {}  # futuro -> inicio del rango
+        terminados = set()
+        siguiente_confirmar = desde
+        revisadas = actualizadas = 0
+        inicio = time.perf_counter()
+
+        def recoger(futuros):
+            nonlocal revisadas, actualizadas, siguiente_confirmar
+            for futuro in futuros:
+                r, a = futuro.result()
+                revisadas += r
+                actualizadas += a
+                terminados.add(pendientes.pop(futuro))
+
+            # El checkpoint solo avanza sobre rangos contiguos ya terminados
+            avance = False
+            while siguiente_confirmar in terminados:
+                terminados.remove(siguiente_confirmar)
+                siguiente_confirmar += lote
+                avance = True
+            if avance:
+                self.checkpoint[etiqueta] = siguiente_confirmar - 1
+                self._guardar_checkpoint()
+                segundos = time.perf_counter() - inicio
+                self.stdout.write(
+                    f"  pk <= {siguiente_confirmar - 1}: {revisadas} revisadas, "
+                    f"{actualizadas} recifradas ({revisadas / segundos if segundos else 0:.0f} filas/s)"
+                )
+
+        for inicio_rango in rangos:
+            futuro = pool.submit(rotar_rango, etiqueta, campos, inicio_rango, inicio_rango + lote)
+            pendientes[futuro] = inicio_rango
+            if len(pendientes) >= procesos * 2:
+                listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                recoger(listos)
+
+        if pendientes:
+            recoger(wait(list(pendientes)).done)
+
+        return revisadas, actualizadas
+
+    def _leer_checkpoint(self):
+        try:
+            with open(self.ruta_checkpoint, encoding="utf-8") as archivo:
+                guardado = json.load(archivo)
+        except FileNotFoundError:
+            return {}
+        # El avance solo vale para la misma llave nueva: con otra hay que revisar todo
+        if guardado.get("llave") != self.huella_llave:
+            self.stdout.write(
+                self.style.WARNING("El avance guardado es de otra llave: se empieza de cero.")
+            )
+            return {}
+        return guardado.get("avance", {})
+
+    def _guardar_checkpoint(self):
+        temporal = f"{self.ruta_checkpoint}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"llave": self.huella_llave, "avance": self.checkpoint}, archivo)
+        os.replace(temporal, self.ruta_checkpoint)
@@ -5,6 +5,7 @@ from django_softdelete.models import SoftDeleteModel
 from encrypted_model_fields.fields import EncryptedCharField, EncryptedDateField, EncryptedEmailField
 from simple_history.models import HistoricalRecords
 from core.choices import Generos
+from core.utils import normalizar_texto
 from localidades.models import Localidad
 from usuarios.models import Usuario
 
@@ -16,6 +17,10 @@ class Ciudadano(SoftDeleteModel):
     nombre = models.CharField(max_length=200)
     apellido_paterno = models.CharField(max_length=200)
     apellido_materno = models.CharField(max_length=200, blank=True, null=True)
+    nombre_busqueda = models.CharField(
+        max_length=610, blank=True, default="", editable=False,
+        help_text="Nombre completo normalizado (mayúsculas, sin acentos) para búsquedas",
+    )
     fecha_nacimiento = EncryptedDateField()
     sexo = models.CharField(
         max_length=1,
@@ -58,4 +63,7 @@ class Ciudadano(SoftDeleteModel):
             self.curp_hash = hashlib.sha256(self.curp.upper().encode()).hexdigest()
         if self.correo:
             self.correo_hash = hashlib.sha256(self.correo.lower().encode()).hexdigest()
+        self.nombre_busqueda = normalizar_texto(self.nombre_completo)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "nombre_busqueda"}
         super().save(*args, **kwargs)
@@ -0,0 +1,90 @@
+"""
+Rotación de la llave de cifrado de campos (``FIELD_ENCRYPTION_KEY``).
+
+Durante la transición la configuración tiene varias llaves separadas por coma
+(la nueva primero). ``encrypted_model_fields`` usa ``MultiFernet``: descifra con
+cualquiera de ellas y cifra siempre con la primera, así que basta con volver a
+guardar las columnas cifradas de cada fila para que queden con la llave nueva.
+"""
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.apps import apps
+from django.conf import settings
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from encrypted_model_fields.fields import EncryptedMixin
+
+
+def llaves_configuradas() -> list:
+    llaves = settings.FIELD_ENCRYPTION_KEY
+    if isinstance(llaves, (list, tuple)):
+        return list(llaves)
+    return [llaves]
+
+
+def modelos_cifrados() -> list[tuple[str, list[str]]]:
+    """Modelos (incluye los históricos) con campos cifrados y sus nombres de campo."""
+    resultado = []
+    for modelo in apps.get_models():
+        campos = [
+            campo.name
+            for campo in modelo._meta.concrete_fields
+            if isinstance(campo, EncryptedMixin)
+        ]
+        if campos:
+            resultado.append((modelo._meta.label, campos))
+    return resultado
+
+
+def rotar_rango(etiqueta: str, campos: list[str], desde: int, hasta: int) -> tuple[int, int]:
+    """
+    Vuelve a cifrar con la llave primaria las filas con ``desde <= pk < hasta``.
+    Se ejecuta en un proceso del pool.
+
+    Returns:
+        (filas revisadas, filas actualizadas)
+    """
+    from django.db import transaction
+
+    modelo = apps.get_model(etiqueta)
+    manager = modelo._base_manager
+    nombre_pk = modelo._meta.pk.name
+    primaria = Fernet(llaves_configuradas()[0])
+
+    def cifrado_con_primaria(token):
+        if token is None:
+            return True
+        try:
+            primaria.decrypt(token.encode("utf-8"))
+            return True
+        except InvalidToken:
+            return False
+
+    rango = manager.filter(**{f"{nombre_pk}__gte": desde, f"{nombre_pk}__lt": hasta})
+    columnas = [Cast(campo, output_field=TextField()) for campo in campos]
+
+    def sin_rotar(filas) -> set:
+        return {
+            pk
+            for pk, *tokens in filas
+            if not all(cifrado_con_primaria(token) for token in tokens)
+        }
+
+    # Lectura de los tokens sin descifrar para saltar filas ya rotadas
+    filas = list(rango.values_list(nombre_pk, *columnas))
+    revisadas = len(filas)
+    pendientes = sin_rotar(filas)
+
+    if not pendientes:
+        return revisadas, 0
+
+    with transaction.atomic():
+        # Bloqueadas hasta escribir: una edición concurrente no se pisa con
+        # datos viejos. Se revisan otra vez porque pudieron cambiar mientras tanto
+        bloqueadas = manager.select_for_update().filter(pk__in=pendientes)
+        pendientes = sin_rotar(bloqueadas.values_list(nombre_pk, *columnas))
+        objetos = list(manager.filter(pk__in=pendientes).only(nombre_pk, *campos))
+        # Al guardar, los campos se cifran de nuevo con la primera llave
+        manager.bulk_update(objetos, campos, batch_size=500)
+
+    return revisadas, len(objetos)
@@ -0,0 +1,160 @@
+"""
+Exportación del padrón de ciudadanos en CSV o JSONL con memoria constante.
+
+Las filas se leen con un cursor del lado del servidor (``iterator``) y las
+columnas cifradas se leen sin descifrar (``Cast`` a texto evita el convertidor
+del campo). El descifrado se hace por lotes, opcionalmente en un pool de
+procesos, y cada lote se convierte en un fragmento de texto listo para escribir
+o para enviarse en una respuesta HTTP por partes.
+"""
+
+import csv
+import io
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db.models import TextField
+from django.db.models.functions import Cast
+
+from ciudadanos.services.importacion import inicializar_worker
+
+CAMPOS_PLANOS = [
+    "id",
+    "nombre",
+    "apellido_paterno",
+    "apellido_materno",
+    "sexo",
+    "numero_interior",
+    "localidad__codigo_postal",
+    "localidad__colonia",
+    "localidad__municipio",
+]
+
+CAMPOS_CIFRADOS = [
+    "curp",
+    "fecha_nacimiento",
+    "correo",
+    "telefono",
+    "calle",
+    "numero_exterior",
+]
+
+COLUMNAS = [
+    "id",
+    "nombre",
+    "apellido_paterno",
+    "apellido_materno",
+    "sexo",
+    "numero_interior",
+    "codigo_postal",
+    "colonia",
+    "municipio",
+    *CAMPOS_CIFRADOS,
+]
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+def descifrar_lote(filas: list[tuple]) -> list[tuple]:
+    """Descifra las columnas cifradas (al final de cada fila). Se ejecuta en el pool."""
+    import cryptography.fernet
+    from encrypted_model_fields.fields import decrypt_str
+
+    inicio_cifrados = len(CAMPOS_PLANOS)
+    resultado = []
+    for fila in filas:
+        valores = list(fila[:inicio_cifrados])
+        for valor in fila[inicio_cifrados:]:
+            if valor is not None:
+                try:
+                    valor = decrypt_str(valor)
+                except cryptography.fernet.InvalidToken:
+                    pass
+            valores.append(valor)
+        resultado.append(tuple(valores))
+    return resultado
+
+
+def _leer_lotes_cifrados(tam_lote: int):
+    from ciudadanos.models import Ciudadano
+
+    filas = (
+        Ciudadano.objects.order_by("id")
+        .values_list(
+            *CAMPOS_PLANOS,
+            *[Cast(campo, output_field=TextField()) for campo in CAMPOS_CIFRADOS],
+        )
+        .iterator(chunk_size=tam_lote)
+    )
+
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tam_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def iterar_lotes_descifrados(procesos: int = 0, tam_lote: int = 2000):
+    """
+    Produce lotes de filas descifradas en el orden del padrón.
+
+    Args:
+        procesos: Tamaño del pool de descifrado (0 = en el mismo proceso)
+        tam_lote: Filas por lote (y por viaje al cursor del servidor)
+    """
+    lotes = _leer_lotes_cifrados(tam_lote)
+
+    if procesos <= 0:
+        for lote in lotes:
+            yield descifrar_lote(lote)
+        return
+
+    pool = ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=inicializar_worker,
+    )
+    try:
+        # Ventana acotada de lotes en vuelo para mantener la memoria constante
+        en_vuelo = deque()
+        for lote in lotes:
+            en_vuelo.append(pool.submit(descifrar_lote, lote))
+            if len(en_vuelo) >= procesos * 2:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def cabecera(formato: str) -> str:
+    if formato == "csv":
+        return formatear_lote([COLUMNAS], formato)
+    return ""
+
+
+def formatear_lote(filas: list[tuple], formato: str) -> str:
+    if formato == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(filas)
+        return buffer.getvalue()
+
+    return "".join(
+        json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False, default=str) + "\n"
+        for fila in filas
+    )
+
+
+def exportar_padron(formato: str = "csv", procesos: int = 0, tam_lote: int = 2000):
+    """Genera el padrón completo como fragmentos de texto (uno por lote)."""
+    yield cabecera(formato)
+    for lote in iterar_lotes_descifrados(procesos=procesos, tam_lote=tam_lote):
+        yield formatear_lote(lote, formato)
@@ -0,0 +1,153 @@
+"""
+Importación masiva de ciudadanos (padrones de beneficiarios).
+
+El proceso principal lee el CSV, normaliza y descarta duplicados en bloque;
+los lotes ya depurados se envían a un pool de procesos donde se calcula el hash
+de contraseña (PBKDF2), se cifran los campos (Fernet) y se escriben con
+``bulk_create``. Estas funciones viven a nivel de módulo para poder enviarse a
+los procesos del pool.
+"""
+
+import hashlib
+import re
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+from core.choices import Generos
+from core.utils import normalizar_texto, parsear_fecha
+
+REGEX_CURP = re.compile(r"^[A-Z]{4}\d{6}[HM][A-Z]{5}[A-Z0-9]\d$")
+
+SEXOS = {
+    "M": Generos.MASCULINO,
+    "H": Generos.MASCULINO,
+    "HOMBRE": Generos.MASCULINO,
+    "F": Generos.FEMENINO,
+    "MUJER": Generos.FEMENINO,
+    "O": Generos.OTRO,
+}
+
+
+class FilaInvalida(Exception):
+    """Fila del CSV que no puede importarse."""
+
+
+def hash_curp(curp: str) -> str:
+    return hashlib.sha256(curp.upper().encode()).hexdigest()
+
+
+def hash_correo(correo: str) -> str:
+    return hashlib.sha256(correo.lower().encode()).hexdigest()
+
+
+def normalizar_fila(fila: dict) -> dict:
+    """
+    Valida y normaliza una fila del CSV. Operación barata: se hace en el proceso principal.
+    """
+    curp = (fila.get("curp") or "").strip().upper()
+    if not REGEX_CURP.match(curp):
+        raise FilaInvalida(f"CURP inválida: '{curp}'")
+
+    correo = (fila.get("correo") or "").strip().lower()
+    try:
+        validate_email(correo)
+    except ValidationError:
+        raise FilaInvalida(f"Correo inválido: '{correo}'")
+
+    nombre = (fila.get("nombre") or "").strip()
+    apellido_paterno = (fila.get("apellido_paterno") or "").strip()
+    if not nombre or not apellido_paterno:
+        raise FilaInvalida("Nombre y apellido paterno son obligatorios")
+
+    fecha_texto = (fila.get("fecha_nacimiento") or "").strip()
+    try:
+        if "/" in fecha_texto:
+            fecha_texto = parsear_fecha(fecha_texto)
+        fecha_nacimiento = date.fromisoformat(fecha_texto)
+    except ValueError:
+        raise FilaInvalida(f"Fecha de nacimiento inválida: '{fecha_texto}'")
+
+    localidad_id = (fila.get("localidad_id") or "").strip()
+    if localidad_id and not localidad_id.isdigit():
+        raise FilaInvalida(f"localidad_id inválido: '{localidad_id}'")
+
+    apellido_materno = (fila.get("apellido_materno") or "").strip() or None
+    nombre_completo = " ".join(p for p in [nombre, apellido_paterno, apellido_materno] if p)
+
+    return {
+        "curp": curp,
+        "curp_hash": hash_curp(curp),
+        "correo": correo,
+        "correo_hash": hash_correo(correo),
+        "nombre": nombre,
+        "apellido_paterno": apellido_paterno,
+        "apellido_materno": apellido_materno,
+        "nombre_busqueda": normalizar_texto(nombre_completo),
+        "fecha_nacimiento": fecha_nacimiento,
+        "sexo": SEXOS.get((fila.get("sexo") or "").strip().upper(), Generos.OTRO),
+        "telefono": (fila.get("telefono") or "").strip(),
+        "calle": (fila.get("calle") or "").strip(),
+        "numero_exterior": (fila.get("numero_exterior") or "").strip(),
+        "numero_interior": (fila.get("numero_interior") or "").strip() or None,
+        "localidad_id": int(localidad_id) if localidad_id else None,
+        "password": (fila.get("password") or "").strip() or None,
+    }
+
+
+def inicializar_worker():
+    """Inicializa Django en cada proceso del pool (creado con 'spawn')."""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def guardar_lote(registros: list[dict], password_temporal: str | None = None) -> int:
+    """
+    Crea usuarios y ciudadanos de un lote ya depurado. Se ejecuta en un proceso del pool:
+    el hash de contraseña y el cifrado de campos ocurren aquí, fuera del proceso principal.
+
+    Returns:
+        Número de ciudadanos creados
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from simple_history.utils import bulk_create_with_history
+
+    from ciudadanos.models import Ciudadano
+    from core.choices import Roles
+    from notificaciones.services import NotificationManager
+    from usuarios.models import Usuario
+
+    # Hash de contraseñas (la parte más costosa) antes de abrir la transacción
+    usuarios = [
+        Usuario(
+            username=registro["curp"],
+            rol=Roles.CIUDADANO,
+            password=make_password(registro["password"] or password_temporal),
+        )
+        for registro in registros
+    ]
+
+    with transaction.atomic():
+        usuarios = bulk_create_with_history(usuarios, Usuario, batch_size=500)
+        # En motores sin RETURNING los objetos vuelven reconsultados; se enlazan por username
+        usuarios_por_curp = {usuario.username: usuario for usuario in usuarios}
+
+        ciudadanos = [
+            Ciudadano(
+                usuario=usuarios_por_curp[registro["curp"]],
+                **{k: v for k, v in registro.items() if k != "password"},
+            )
+            for registro in registros
+        ]
+        # El cifrado Fernet de los campos Encrypted* ocurre al preparar el INSERT
+        bulk_create_with_history(ciudadanos, Ciudadano, batch_size=500)
+
+        # Los correos de bienvenida se encolan; se envían con enviar_correos_pendientes
+        NotificationManager().encolar_bienvenidas(usuarios)
+
+    return len(ciudadanos)
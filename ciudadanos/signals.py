@@ -0,0 +1,27 @@
+from core.search import crear_indice_trigram
+from core.utils import normalizar_texto
+
+
+def preparar_busqueda_nombre(sender, using="default", **kwargs):
+    """
+    Después de migrar: crea el índice de trigramas (solo PostgreSQL) y rellena
+    ``nombre_busqueda`` de los ciudadanos registrados antes de existir la columna.
+    """
+    from ciudadanos.models import Ciudadano
+
+    crear_indice_trigram(Ciudadano._meta.db_table, "nombre_busqueda", using=using)
+
+    pendientes = (
+        Ciudadano.global_objects.using(using)
+        .filter(nombre_busqueda="")
+        .only("id", "nombre", "apellido_paterno", "apellido_materno")
+    )
+    lote = []
+    for ciudadano in pendientes.iterator(chunk_size=2000):
+        ciudadano.nombre_busqueda = normalizar_texto(ciudadano.nombre_completo)
+        lote.append(ciudadano)
+        if len(lote) >= 2000:
+            Ciudadano.global_objects.using(using).bulk_update(lote, ["nombre_busqueda"])
+            lote = []
+    if lote:
+        Ciudadano.global_objects.using(using).bulk_update(lote, ["nombre_busqueda"])
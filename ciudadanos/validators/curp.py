@@ -1,16 +1,21 @@
 import re
 import hashlib
+from django.db.models import Q
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from ciudadanos.models import Ciudadano
 
 
-def validate_curp_format(value: str):
+def validate_curp_format(value: str, comprobar_unicidad: bool = True):
     # 1. Formato
     regex = r'^[A-Z]{4}\d{6}[HM][A-Z]{5}[A-Z0-9]\d$'
     curp_upper = value.upper()
     if not re.match(regex, curp_upper):
         raise serializers.ValidationError("Formato de CURP inválido.")
 
+    if not comprobar_unicidad:
+        return curp_upper
+
     # 2. Unicidad usando el Hash
     c_hash = hashlib.sha256(curp_upper.encode()).hexdigest()
     if Ciudadano.objects.filter(curp_hash=c_hash).exists():
@@ -19,10 +24,22 @@ def validate_curp_format(value: str):
     return curp_upper
 
 
-def check_curp_unica(value: str):
-    curp_upper = value.upper()
-    # Generamos el hash para comparar
-    hash_curp = hashlib.sha256(curp_upper.encode()).hexdigest()
+def check_registro_unico(curp: str, correo: str) -> dict:
+    """
+    Verifica en una sola consulta que la CURP y el correo no estén registrados.
+    Devuelve un diccionario de errores (vacío si ambos están libres).
+    """
+    hash_curp = hashlib.sha256(curp.upper().encode()).hexdigest()
+    hash_correo = hashlib.sha256(correo.lower().encode()).hexdigest()
+
+    existentes = Ciudadano.global_objects.filter(
+        Q(curp_hash=hash_curp) | Q(correo_hash=hash_correo)
+    ).values_list("curp_hash", "correo_hash")
 
-    if Ciudadano.objects.filter(curp_hash=hash_curp).exists():
-        raise serializers.ValidationError("La CURP ya está registrada.")
+    errores = {}
+    for curp_hash, correo_hash in existentes:
+        if curp_hash == hash_curp:
+            errores[api_settings.NON_FIELD_ERRORS_KEY] = ["Esta CURP ya está registrada."]
+        if correo_hash == hash_correo:
+            errores["correo"] = ["Este correo electrónico ya se encuentra registrado."]
+    return errores
@@ -14,11 +14,15 @@ environ.Env.read_env(BASE_DIR / ".env")
 
 # Secrets keys
 SECRET_KEY = env("DJANGO_SECRET_KEY")
-FIELD_ENCRYPTION_KEY = env("FIELD_ENCRYPTION_KEY")
+# Lista separada por comas: la primera llave cifra, todas descifran (rotación de llaves)
+FIELD_ENCRYPTION_KEY = env.list("FIELD_ENCRYPTION_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = env("DJANGO_DEBUG")
 
+# Procesos para descifrar la exportación del padrón desde la API (0 = en el worker web)
+EXPORTACION_PROCESOS = env.int("EXPORTACION_PROCESOS", default=0)
+
 # Externals API URLs
 CURP_API_URL = env("CURP_API_URL")
 WEB_URL = env("WEB_URL")
@@ -110,6 +114,8 @@ else:
             "NAME": env("DATABASE_NAME", default="db_name"),
         }
     }
+    # Lookups de trigramas (pg_trgm) para la búsqueda de nombres
+    INSTALLED_APPS.append("django.contrib.postgres")
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -152,6 +158,39 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Entrega de documentos privados (core.descargas): "django" los envía desde el
+# worker (con Range); "nginx" usa X-Accel-Redirect hacia una location internal
+# con alias a MEDIA_ROOT; "sendfile" usa X-Sendfile (Apache/lighttpd)
+DESCARGAS_MODO = env("DESCARGAS_MODO", default="django")
+DESCARGAS_PREFIJO_INTERNO = env("DESCARGAS_PREFIJO_INTERNO", default="/media-interna/")
+
+# Segundos de validez de las URLs firmadas de documentos (core.firmas)
+URLS_FIRMADAS_VIGENCIA = env.int("URLS_FIRMADAS_VIGENCIA", default=300)
+# Exigir el JWT del mismo usuario al abrir una URL firmada. Sin esto, una URL
+# filtrada sirve a cualquiera hasta que vence (los <img src> no envían el token)
+URLS_FIRMADAS_REQUIEREN_TOKEN = env.bool("URLS_FIRMADAS_REQUIEREN_TOKEN", default=False)
+
+# Temporales de las subidas reanudables de documentos (tramites.services.subidas)
+SUBIDAS_TEMPORALES_DIR = env("SUBIDAS_TEMPORALES_DIR", default=str(BASE_DIR / "subidas"))
+
+# Optimiza en segundo plano las fotos de documentos (sin metadatos, orientadas,
+# reducidas y re-codificadas) y genera su miniatura (tramites.services.optimizacion)
+DOCUMENTOS_OPTIMIZAR_IMAGENES = env.bool("DOCUMENTOS_OPTIMIZAR_IMAGENES", default=True)
+
+# Volumen de archivo para los documentos de solicitudes cerradas hace más de
+# un año (manage.py archivar_documentos). Puede estar en un disco más lento
+DOCUMENTOS_ARCHIVO_ROOT = env("DOCUMENTOS_ARCHIVO_ROOT", default=str(BASE_DIR / "archivo"))
+
+# Snapshot binario del catálogo de localidades (lo escribe cargar_localidades y
+# los workers lo abren con mmap). Vacío = el índice se construye desde la BD
+LOCALIDADES_SNAPSHOT = env("LOCALIDADES_SNAPSHOT", default=str(BASE_DIR / "localidades.snapshot"))
+
+# Catálogo público pre-renderizado (publicar_catalogo). El servidor estático puede
+# servir este directorio directamente; con la publicación automática se regenera
+# unos segundos después de cada cambio al catálogo
+CATALOGO_PUBLICADO_DIR = env("CATALOGO_PUBLICADO_DIR", default=str(BASE_DIR / "publicado"))
+CATALOGO_PUBLICACION_AUTOMATICA = env.bool("CATALOGO_PUBLICACION_AUTOMATICA", default=True)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -169,7 +208,8 @@ SIMPLE_JWT = {
 REST_FRAMEWORK = {
     # "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication que además trae el perfil de funcionario por JOIN
+        "core.autenticacion.JWTAuthenticationFuncionario",
         # "rest_framework.authentication.TokenAuthentication",
         # "rest_framework.authentication.BasicAuthentication",
     ],
@@ -181,11 +221,12 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
 }
 
+# Usar una caché compartida (filecache://, redis://, memcache://) en producción.
+# Los sellos de versión de catálogos (core.versiones) deben ser comunes a todos
+# los workers y procesos: por omisión van a una tabla que se crea al migrar
 CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
-    }
+    "default": env.cache("CACHE_URL", default="locmemcache://unique-snowflake"),
+    "versiones": env.cache("CACHE_VERSIONES_URL", default="dbcache://versiones_catalogo"),
 }
 
 
@@ -0,0 +1,129 @@
+"""
+Almacenamiento direccionado por contenido.
+
+Cada archivo se guarda una sola vez en ``<prefijo>/<aa>/<bb>/<sha256><ext>``,
+sin importar su nombre original: si el mismo contenido se sube de nuevo se
+reutiliza el archivo existente. Cuántos registros usan cada contenido lo
+lleva el modelo que usa el storage (p. ej. ``tramites.ArchivoDocumento``).
+
+Los contenidos poco consultados pueden moverse a un segundo volumen (el
+archivo, ``settings.DOCUMENTOS_ARCHIVO_ROOT``). Su ruta queda como
+``archivado/<ruta original>``, con ``.gz`` al final si se guardó comprimido, y
+el storage los sigue abriendo de forma transparente (ya descomprimidos).
+"""
+
+import gzip
+import os
+import posixpath
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils._os import safe_join
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+from core.utils import calcular_sha256
+
+
+class _ContenidoExistente(Exception):
+    pass
+
+
+@deconstructible(path="core.almacenamiento.AlmacenamientoPorContenido")
+class AlmacenamientoPorContenido(FileSystemStorage):
+    PREFIJO_ARCHIVADO = "archivado"
+    EXTENSION_COMPRIMIDA = ".gz"
+
+    def __init__(self, prefijo="contenido", ubicacion_archivo=None, **kwargs):
+        super().__init__(**kwargs)
+        self.prefijo = prefijo
+        self._ubicacion_archivo = ubicacion_archivo
+        self._patron_ruta = re.compile(
+            rf"(?:{self.PREFIJO_ARCHIVADO}/)?{re.escape(prefijo)}"
+            rf"/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.\w+)?(\.gz)?"
+        )
+
+    @cached_property
+    def ubicacion_archivo(self):
+        return os.path.abspath(self._ubicacion_archivo or settings.DOCUMENTOS_ARCHIVO_ROOT)
+
+    def es_ruta_contenido(self, name: str) -> bool:
+        return bool(self._patron_ruta.fullmatch(name))
+
+    def ruta_contenido(self, sha256: str, name: str = "") -> str:
+        extension = posixpath.splitext(name)[1].lower()
+        return f"{self.prefijo}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+    def es_archivada(self, name: str) -> bool:
+        return name.startswith(f"{self.PREFIJO_ARCHIVADO}/")
+
+    def es_comprimida(self, name: str) -> bool:
+        return self.es_archivada(name) and name.endswith(self.EXTENSION_COMPRIMIDA)
+
+    def ruta_archivada(self, name: str, comprimida: bool = False) -> str:
+        sufijo = self.EXTENSION_COMPRIMIDA if comprimida else ""
+        return f"{self.PREFIJO_ARCHIVADO}/{name}{sufijo}"
+
+    def ruta_activa(self, name: str) -> str:
+        """Ruta que tenía el contenido antes de archivarse."""
+        if not self.es_archivada(name):
+            return name
+        if self.es_comprimida(name):
+            name = name[: -len(self.EXTENSION_COMPRIMIDA)]
+        return name[len(self.PREFIJO_ARCHIVADO) + 1 :]
+
+    def path(self, name):
+        if self.es_archivada(name):
+            return safe_join(self.ubicacion_archivo, name[len(self.PREFIJO_ARCHIVADO) + 1 :])
+        return super().path(name)
+
+    def _open(self, name, mode="rb"):
+        if not self.es_comprimida(name):
+            return super()._open(name, mode)
+        archivo = File(gzip.open(self.path(name), "rb"), name)
+        archivo.size = self.size(name)
+        return archivo
+
+    def size(self, name):
+        if not self.es_comprimida(name):
+            return super().size(name)
+        # Tamaño sin comprimir: últimos 4 bytes del gzip (ISIZE, módulo 2**32)
+        with open(self.path(name), "rb") as archivo:
+            archivo.seek(-4, os.SEEK_END)
+            return int.from_bytes(archivo.read(4), "little")
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final lo decide _save a partir del contenido. Si otro
+        # proceso acaba de escribir el mismo contenido, no hay que renombrar.
+        if self.es_ruta_contenido(name) and self.exists(name):
+            raise _ContenidoExistente(name)
+        return name
+
+    def _save(self, name, content):
+        destino = self.ruta_contenido(calcular_sha256(content), name)
+        if self.exists(destino):
+            return destino
+        try:
+            return super()._save(destino, content)
+        except _ContenidoExistente:
+            return destino
+
+    def guardar_derivado(self, name: str, contenido: bytes) -> str:
+        """
+        Guarda con nombre fijo un archivo derivado de un contenido (p. ej. su
+        vista previa). Al ser determinista, se reemplaza si ya existe.
+        """
+        ruta = self.path(name)
+        directorio = os.path.dirname(ruta)
+        os.makedirs(directorio, exist_ok=True)
+        # Temporal con nombre único: dos procesos pueden generar el mismo derivado
+        with tempfile.NamedTemporaryFile(
+            dir=directorio, prefix=f".{os.path.basename(ruta)}.", suffix=".tmp", delete=False
+        ) as temporal:
+            temporal.write(contenido)
+        os.chmod(temporal.name, 0o644)
+        os.replace(temporal.name, ruta)
+        return name
@@ -0,0 +1,62 @@
+"""
+Autenticación JWT con el contexto del funcionario resuelto una sola vez.
+
+``JWTAuthentication`` carga el usuario con una consulta; aquí esa misma
+consulta trae por JOIN el perfil de funcionario y su dependencia, de modo que
+``request.user.funcionario.dependencia`` no cuesta consultas adicionales en
+ninguna vista.
+"""
+
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.choices import Roles
+
+
+class JWTAuthenticationFuncionario(JWTAuthentication):
+    def get_user(self, validated_token):
+        """
+        Igual que ``JWTAuthentication.get_user`` (mismos errores y códigos),
+        con el perfil de funcionario y su dependencia en la misma consulta.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = (
+                get_user_model()
+                .objects.select_related("funcionario__dependencia")
+                .get(**{api_settings.USER_ID_FIELD: user_id})
+            )
+        except get_user_model().DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(
+                user.password
+            ):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+def dependencia_id_de(user) -> int | None:
+    """
+    Id de la dependencia del funcionario autenticado, o ``None`` si el usuario
+    no es funcionario o no tiene perfil asociado.
+    """
+    if getattr(user, "rol", None) != Roles.FUNCIONARIO:
+        return None
+    funcionario = getattr(user, "funcionario", None)
+    return funcionario.dependencia_id if funcionario else None
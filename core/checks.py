@@ -0,0 +1,27 @@
+"""
+Verificaciones de configuración (``manage.py check``) del proyecto.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from core.versiones import ALIAS_CACHE
+
+
+@register(Tags.caches)
+def revisar_cache_versiones(app_configs, **kwargs):
+    """Los sellos de versión de catálogos no pueden vivir en la memoria de cada worker."""
+    backend = settings.CACHES.get(ALIAS_CACHE, {}).get("BACKEND", "")
+    if settings.DEBUG or not backend.endswith("LocMemCache"):
+        return []
+    return [
+        Error(
+            f"La caché '{ALIAS_CACHE}' (sellos de versión de catálogos) es local a cada proceso.",
+            hint=(
+                "Configure CACHE_VERSIONES_URL con una caché compartida (dbcache://, "
+                "redis://, memcache://): si no, los workers siguen respondiendo 304 y "
+                "catálogos en caché después de un cambio."
+            ),
+            id="core.E001",
+        )
+    ]
@@ -0,0 +1,74 @@
+"""
+ZIP generado en streaming.
+
+``zip_en_streaming`` produce los bytes del archivo ZIP conforme lee cada
+archivo de origen, sin archivo temporal y sin tener el ZIP completo en
+memoria: ``zipfile`` escribe sobre una salida no posicionable (usa
+descriptores de datos) y cada bloque escrito se entrega de inmediato.
+"""
+
+import io
+import logging
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Formatos que ya vienen comprimidos: se guardan tal cual (comprimirlos solo gasta CPU)
+EXTENSIONES_SIN_COMPRESION = (".jpg", ".jpeg", ".png", ".webp", ".zip", ".gz")
+
+
+class _Salida(io.RawIOBase):
+    """Acumula lo que escribe ``zipfile`` hasta que el generador lo entrega."""
+
+    def __init__(self):
+        self.partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def zip_en_streaming(entradas):
+    """
+    Args:
+        entradas: Tuplas ``(nombre_en_zip, abrir, fecha)``: ``abrir()`` devuelve
+            el archivo de origen en modo binario y ``fecha`` es un datetime
+
+    Yields:
+        Bloques de bytes del archivo ZIP
+    """
+    salida = _Salida()
+    with zipfile.ZipFile(salida, mode="w") as archivo_zip:
+        for nombre, abrir, fecha in entradas:
+            info = zipfile.ZipInfo(nombre, date_time=fecha.timetuple()[:6])
+            if nombre.lower().endswith(EXTENSIONES_SIN_COMPRESION):
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+
+            # Se abre antes de escribir la cabecera: si falla, la entrada se omite
+            # y el ZIP sigue siendo válido (la respuesta ya se envió con 200)
+            try:
+                origen = abrir()
+            except OSError:
+                logger.exception("No se pudo abrir %s para el ZIP", nombre)
+                continue
+
+            with origen, archivo_zip.open(info, mode="w") as destino:
+                while bloque := origen.read(TAMANO_BLOQUE):
+                    destino.write(bloque)
+                    if datos := salida.vaciar():
+                        yield datos
+            yield salida.vaciar()
+    # Directorio central
+    yield salida.vaciar()
@@ -0,0 +1,163 @@
+"""
+GET condicional para catálogos públicos.
+
+Los catálogos (trámites, programas, localidades) cambian poco y tienen sellos de
+versión (``core.versiones``). Con ellos se calculan ``ETag`` y
+``Last-Modified`` antes de consultar la base de datos: si el cliente ya tiene la
+versión vigente se responde ``304 Not Modified`` sin serializar nada.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.autenticacion import dependencia_id_de
+from core.choices import Roles
+from core.versiones import obtener_version
+
+# Segundos que navegadores y proxies pueden reutilizar una respuesta pública sin revalidar
+MAX_AGE_CATALOGO = 300
+
+# Las claves incluyen la versión del catálogo: un cambio las deja huérfanas y expiran solas
+TIMEOUT_CACHE_CATALOGO = 60 * 60
+
+
+def etag_coincide(request, etag: str) -> bool:
+    """Comparación débil de ``If-None-Match`` contra ``etag``."""
+    cabecera = request.headers.get("If-None-Match")
+    if not cabecera:
+        return False
+    if cabecera.strip() == "*":
+        return True
+    propio = etag.removeprefix("W/")
+    return any(valor.strip().removeprefix("W/") == propio for valor in cabecera.split(","))
+
+
+def no_modificado(request, etag: str, ultima_modificacion: int | None = None) -> bool:
+    """
+    Según RFC 9110: si viene ``If-None-Match`` decide solo el ETag; si no,
+    ``If-Modified-Since`` contra ``ultima_modificacion`` (segundos epoch).
+    """
+    if "If-None-Match" in request.headers:
+        return etag_coincide(request, etag)
+    desde = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return desde is not None and ultima_modificacion is not None and ultima_modificacion <= desde
+
+
+def aplicar_validadores(
+    response,
+    etag: str,
+    ultima_modificacion: int | None = None,
+    publico: bool = True,
+    max_age: int = MAX_AGE_CATALOGO,
+):
+    """
+    Agrega ``ETag``, ``Last-Modified``, ``Cache-Control`` y ``Vary``.
+    Las respuestas de usuarios autenticados son privadas y se revalidan siempre.
+    """
+    response["ETag"] = etag
+    if ultima_modificacion is not None:
+        response["Last-Modified"] = http_date(ultima_modificacion)
+    if publico:
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    # La respuesta depende del usuario (JWT) y del formato negociado
+    patch_vary_headers(response, ("Authorization", "Accept"))
+    return response
+
+
+class CatalogoCondicionalMixin:
+    """
+    Para ViewSets de catálogo: ``list`` y ``retrieve`` responden 304 cuando el
+    cliente tiene la versión vigente de ``versiones_catalogo``.
+    """
+
+    versiones_catalogo: tuple[str, ...] = ()
+    max_age_catalogo = MAX_AGE_CATALOGO
+
+    def alcance_catalogo(self, request) -> str:
+        """Parte del ETag que distingue respuestas que varían por usuario."""
+        if request.user and request.user.is_authenticated:
+            return f"usuario-{request.user.pk}"
+        return "publico"
+
+    def validadores_catalogo(self, request) -> tuple[str, int]:
+        versiones = [obtener_version(nombre) for nombre in self.versiones_catalogo]
+        clave = "|".join(
+            [*map(str, versiones), self.alcance_catalogo(request), request.get_full_path()]
+        )
+        etag = f'W/"{hashlib.md5(clave.encode()).hexdigest()}"'
+        # Los sellos son milisegundos desde epoch
+        ultima_modificacion = max(versiones) // 1000 if versiones else None
+        return etag, ultima_modificacion
+
+    def _responder_condicional(self, request, generar):
+        etag, ultima_modificacion = self.validadores_catalogo(request)
+        publico = not (request.user and request.user.is_authenticated)
+
+        if no_modificado(request, etag, ultima_modificacion):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = generar()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        return aplicar_validadores(
+            response, etag, ultima_modificacion, publico, self.max_age_catalogo
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self._responder_condicional(
+            request, lambda: super(CatalogoCondicionalMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._responder_condicional(
+            request,
+            lambda: super(CatalogoCondicionalMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+
+class CatalogoEnCacheMixin:
+    """
+    Guarda en la caché compartida la respuesta serializada de ``list`` por
+    alcance (p. ej. la dependencia del funcionario) y versión del catálogo.
+    Los listados repetidos no consultan la base de datos.
+    """
+
+    versiones_catalogo: tuple[str, ...] = ()
+    timeout_cache_catalogo = TIMEOUT_CACHE_CATALOGO
+
+    def alcance_cache_catalogo(self, request) -> str | None:
+        """
+        Grupo de usuarios que ven exactamente el mismo listado; ``None`` para
+        no usar la caché.
+        """
+        if getattr(request.user, "rol", None) == Roles.FUNCIONARIO:
+            dependencia_id = dependencia_id_de(request.user)
+            return f"dependencia-{dependencia_id}" if dependencia_id else None
+        return "todos"
+
+    def list(self, request, *args, **kwargs):
+        alcance = self.alcance_cache_catalogo(request)
+        if alcance is None:
+            return super().list(request, *args, **kwargs)
+
+        versiones = ".".join(str(obtener_version(nombre)) for nombre in self.versiones_catalogo)
+        # La URL absoluta incluye filtros, paginación y el host de los enlaces
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        clave = f"catalogo:{self.basename}:{versiones}:{alcance}:{url}"
+
+        datos = cache.get(clave)
+        if datos is not None:
+            return Response(datos)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(clave, response.data, self.timeout_cache_catalogo)
+        return response
@@ -0,0 +1,143 @@
+"""
+Entrega de archivos privados (documentos de solicitudes).
+
+La vista decide si el usuario puede ver el archivo y este módulo arma la
+respuesta según ``settings.DESCARGAS_MODO``:
+
+- ``nginx``: cabecera ``X-Accel-Redirect`` hacia una ``location internal``
+  (``DESCARGAS_PREFIJO_INTERNO``) que apunta a ``MEDIA_ROOT``.
+- ``sendfile``: cabecera ``X-Sendfile`` con la ruta absoluta (Apache
+  mod_xsendfile, lighttpd).
+- ``django`` (por omisión): el worker entrega el archivo con soporte de
+  ``Range``/``If-Range``, ``ETag`` y ``Last-Modified``, para que una descarga
+  interrumpida continúe donde se quedó. Los documentos archivados
+  (``core.almacenamiento``) siempre se entregan así.
+
+En los dos primeros modos el servidor web hace la transferencia (y atiende los
+rangos) y el worker queda libre en cuanto responde.
+"""
+
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from core.condicional import etag_coincide
+
+TAMANO_BLOQUE = 64 * 1024
+
+RANGO_BYTES = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _leer_rango(archivo, inicio: int, largo: int):
+    try:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def _rango_solicitado(request, tamano: int, etag: str, ultima_modificacion: int):
+    """
+    ``(inicio, fin)`` del rango pedido, ``None`` si se debe enviar el archivo
+    completo, o ``False`` si el rango no es satisfacible.
+    """
+    cabecera = request.headers.get("Range")
+    if not cabecera:
+        return None
+
+    # If-Range: el rango solo vale si el cliente tiene exactamente esta versión
+    condicion = request.headers.get("If-Range")
+    if condicion:
+        if condicion.startswith(("W/", '"')):
+            if condicion != etag or etag.startswith("W/"):
+                return None
+        elif parse_http_date_safe(condicion) != ultima_modificacion:
+            return None
+
+    # Solo un rango; con varios se envía el archivo completo (permitido por RFC 9110)
+    coincidencia = RANGO_BYTES.fullmatch(cabecera.strip())
+    if not coincidencia or coincidencia.group(1) == coincidencia.group(2) == "":
+        return None
+    inicio, fin = coincidencia.groups()
+    if inicio == "":
+        # bytes=-N: los últimos N bytes
+        sufijo = int(fin)
+        if sufijo == 0:
+            return False
+        return max(tamano - sufijo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return False
+    return inicio, fin
+
+
+def respuesta_archivo(request, storage, nombre: str, nombre_descarga: str, etag: str | None = None):
+    """
+    Respuesta de descarga para el archivo ``nombre`` de ``storage``.
+
+    Args:
+        nombre_descarga: Nombre con el que se guarda en el equipo del usuario
+        etag: ETag fuerte si ya se conoce (p. ej. el SHA-256 del contenido);
+            si no, se deriva de tamaño y fecha de modificación
+    """
+    tipo = mimetypes.guess_type(nombre_descarga)[0] or "application/octet-stream"
+    disposicion = content_disposition_header(True, nombre_descarga)
+    modo = getattr(settings, "DESCARGAS_MODO", "django")
+
+    # Los archivados (otro volumen, quizá comprimidos) se entregan desde aquí
+    archivado = getattr(storage, "es_archivada", None)
+    if modo in ("nginx", "sendfile") and not (archivado and archivado(nombre)):
+        response = HttpResponse(content_type=tipo)
+        if modo == "nginx":
+            prefijo = settings.DESCARGAS_PREFIJO_INTERNO.rstrip("/")
+            response["X-Accel-Redirect"] = f"{prefijo}/{quote(nombre)}"
+        else:
+            response["X-Sendfile"] = storage.path(nombre)
+        response["Content-Disposition"] = disposicion
+        return response
+
+    tamano = storage.size(nombre)
+    ultima_modificacion = int(storage.get_modified_time(nombre).timestamp())
+    etag = f'"{etag}"' if etag else f'"{tamano:x}-{ultima_modificacion:x}"'
+
+    if "If-None-Match" in request.headers:
+        no_modificado = etag_coincide(request, etag)
+    else:
+        desde = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        no_modificado = desde is not None and ultima_modificacion <= desde
+
+    rango = None if no_modificado else _rango_solicitado(request, tamano, etag, ultima_modificacion)
+    if no_modificado:
+        response = HttpResponse(status=304)
+    elif rango is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{tamano}"
+    else:
+        inicio, fin = rango or (0, tamano - 1)
+        largo = max(fin - inicio + 1, 0)
+        response = StreamingHttpResponse(
+            _leer_rango(storage.open(nombre, "rb"), inicio, largo),
+            status=206 if rango else 200,
+            content_type=tipo,
+        )
+        response["Content-Length"] = str(largo)
+        if rango:
+            response["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+        response["Content-Disposition"] = disposicion
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(ultima_modificacion)
+    # Documentos personales: nunca en cachés compartidas
+    response["Cache-Control"] = "private, no-cache"
+    return response
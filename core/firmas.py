@@ -0,0 +1,58 @@
+"""
+URLs firmadas con vencimiento para archivos privados.
+
+La URL lleva la ruta del archivo, el usuario al que se emitió, el vencimiento
+y una firma HMAC-SHA256 (derivada de ``SECRET_KEY``) sobre todo lo anterior::
+
+    /tramites/archivos/documentos/ab/cd/<sha256>.pdf?u=15&e=1767225600&n=INE.pdf&s=...
+
+Verificarla no requiere consultas a la base de datos: basta recalcular la firma
+y comparar el vencimiento.
+"""
+
+import hmac
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.crypto import salted_hmac
+
+SAL_FIRMA = "core.firmas.archivo"
+
+
+def _firma(ruta: str, usuario_id, expira: int, nombre: str) -> str:
+    valor = "\x1f".join((ruta, str(usuario_id), str(expira), nombre))
+    return salted_hmac(SAL_FIRMA, valor, algorithm="sha256").hexdigest()[:32]
+
+
+def url_firmada(request, ruta: str, nombre: str, usuario_id, vigencia: int | None = None) -> str:
+    """
+    URL absoluta (o relativa si no hay ``request``) de ``ArchivoFirmadoView``
+    válida por ``vigencia`` segundos (``settings.URLS_FIRMADAS_VIGENCIA``).
+    """
+    if vigencia is None:
+        vigencia = settings.URLS_FIRMADAS_VIGENCIA
+    expira = int(time.time()) + vigencia
+    parametros = {
+        "u": usuario_id,
+        "e": expira,
+        "n": nombre,
+        "s": _firma(ruta, usuario_id, expira, nombre),
+    }
+    url = f"{reverse('documento-archivo-firmado', kwargs={'ruta': ruta})}?{urlencode(parametros)}"
+    return request.build_absolute_uri(url) if request else url
+
+
+def verificar_firma(ruta: str, parametros) -> bool:
+    """Valida firma y vencimiento de los parámetros ``u``, ``e``, ``n`` y ``s`` de la URL."""
+    try:
+        usuario_id = parametros["u"]
+        expira = int(parametros["e"])
+        nombre = parametros["n"]
+        firma = parametros["s"]
+    except (KeyError, ValueError):
+        return False
+    if expira < time.time():
+        return False
+    return hmac.compare_digest(firma, _firma(ruta, usuario_id, expira, nombre))
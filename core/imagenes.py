@@ -0,0 +1,138 @@
+"""
+Variantes responsivas de las imágenes del catálogo (trámites y programas).
+
+Cada imagen se re-codifica en WebP y JPEG a unos cuantos anchos. Las variantes
+se guardan en el mismo storage bajo ``variantes/`` y se generan al subir la
+imagen (en segundo plano) o, si faltan, en la primera petición.
+
+Ejemplo: ``tramites/2025/01/10/banner.png`` a 640 px en WebP queda en
+``variantes/tramites/2025/01/10/banner.640w.webp``.
+"""
+
+import io
+import logging
+import posixpath
+import threading
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+ANCHOS = (320, 640, 1280)
+
+# formato -> (formato de Pillow, extensión, tipo MIME, opciones de guardado)
+FORMATOS = {
+    "webp": ("WEBP", "webp", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+PREFIJO_VARIANTES = "variantes"
+
+# Solo las imágenes públicas del catálogo tienen variantes (nunca documentos de solicitudes)
+PREFIJOS_PUBLICOS = ("tramites/", "programas/")
+
+# Orientaciones EXIF que giran la imagen 90°: el ancho final es el alto original
+ORIENTACIONES_GIRADAS = {5, 6, 7, 8}
+
+
+def es_imagen_publica(nombre: str) -> bool:
+    normalizado = posixpath.normpath(nombre)
+    return (
+        normalizado == nombre
+        and not normalizado.startswith(("/", ".."))
+        and normalizado.startswith(PREFIJOS_PUBLICOS)
+    )
+
+
+def ruta_variante(nombre: str, ancho: int, formato: str) -> str:
+    base, _ = posixpath.splitext(nombre)
+    return f"{PREFIJO_VARIANTES}/{base}.{ancho}w.{FORMATOS[formato][1]}"
+
+
+def _preparar_modo(imagen: Image.Image, formato: str) -> Image.Image:
+    tiene_alfa = imagen.mode in ("RGBA", "LA", "PA") or (
+        imagen.mode == "P" and "transparency" in imagen.info
+    )
+    if formato == "jpeg":
+        if tiene_alfa:
+            fondo = Image.new("RGB", imagen.size, (255, 255, 255))
+            fondo.paste(imagen.convert("RGBA"), mask=imagen.convert("RGBA").getchannel("A"))
+            return fondo
+        return imagen if imagen.mode in ("RGB", "L") else imagen.convert("RGB")
+    modo = "RGBA" if tiene_alfa else "RGB"
+    return imagen if imagen.mode == modo else imagen.convert(modo)
+
+
+def generar_variante(nombre: str, ancho: int, formato: str) -> str:
+    """
+    Genera (si no existe) la variante de ``nombre`` y devuelve su ruta en el storage.
+    Nunca amplía: si la original es más angosta se conserva su ancho.
+    """
+    destino = ruta_variante(nombre, ancho, formato)
+    if default_storage.exists(destino):
+        return destino
+
+    formato_pil, _, _, opciones = FORMATOS[formato]
+    with default_storage.open(nombre, "rb") as archivo:
+        imagen = Image.open(archivo)
+        if imagen.getexif().get(0x0112, 1) not in ORIENTACIONES_GIRADAS:
+            # JPEG: decodifica directamente a una escala reducida (mucho más rápido)
+            imagen.draft("RGB", (ancho, 1))
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.width > ancho:
+            alto = max(1, round(imagen.height * ancho / imagen.width))
+            imagen = imagen.resize((ancho, alto), Image.Resampling.LANCZOS)
+        else:
+            imagen.load()
+        imagen = _preparar_modo(imagen, formato)
+
+        buffer = io.BytesIO()
+        imagen.save(buffer, format=formato_pil, **opciones)
+
+    if not default_storage.exists(destino):
+        default_storage.save(destino, ContentFile(buffer.getvalue()))
+    return destino
+
+
+def generar_variantes(nombre: str) -> None:
+    for formato in FORMATOS:
+        for ancho in ANCHOS:
+            try:
+                generar_variante(nombre, ancho, formato)
+            except Exception:
+                logger.exception("No se pudo generar la variante %s %s de %s", ancho, formato, nombre)
+
+
+def generar_variantes_en_segundo_plano(nombre: str) -> None:
+    def generar():
+        try:
+            generar_variantes(nombre)
+        finally:
+            connection.close()
+
+    threading.Thread(target=generar, daemon=True).start()
+
+
+def srcset_imagen(imagen, request=None) -> dict | None:
+    """
+    Mapa ``formato -> srcset`` para ``<picture>``/``<img srcset>``, ej.::
+
+        {"webp": "https://.../320/webp/tramites/... 320w, ... 1280w", "jpeg": "..."}
+    """
+    if not imagen or not es_imagen_publica(imagen.name):
+        return None
+
+    def url(ancho, formato):
+        ruta = reverse(
+            "imagen-variante", kwargs={"ancho": ancho, "formato": formato, "ruta": imagen.name}
+        )
+        return request.build_absolute_uri(ruta) if request else ruta
+
+    return {
+        formato: ", ".join(f"{url(ancho, formato)} {ancho}w" for ancho in ANCHOS)
+        for formato in FORMATOS
+    }
@@ -0,0 +1,99 @@
+"""
+Búsqueda de archivos huérfanos (sin registro que los use) con memoria acotada.
+
+En lugar de cargar en memoria todas las rutas del disco o de la base de datos,
+ambos lados se recorren en el mismo orden y se comparan como en un merge:
+
+- ``recorrer`` lista el árbol con ``os.scandir`` en profundidad, con los
+  nombres de cada directorio ordenados; eso produce las rutas en orden de
+  ``clave`` (por componentes).
+- ``ordenar_externo`` ordena las rutas referenciadas (que vienen de la base de
+  datos en cualquier orden) por tramos guardados en archivos temporales y los
+  mezcla con ``heapq.merge``.
+- ``huerfanos`` avanza por las dos secuencias y devuelve los archivos que no
+  aparecen en las referencias.
+
+No se usa el ``ORDER BY`` de la base de datos: la collation (p. ej. en
+Postgres) no necesariamente ordena igual que Python.
+"""
+
+import heapq
+import itertools
+import os
+import tempfile
+
+# Rutas referenciadas que se ordenan en memoria antes de pasar a un temporal
+TAMANO_TRAMO = 200_000
+
+
+def clave(ruta: str) -> list[str]:
+    return ruta.split("/")
+
+
+def recorrer(directorio, prefijo: str = "", excluir=frozenset(), montajes=None):
+    """
+    Genera ``(ruta relativa, os.DirEntry)`` de los archivos bajo ``directorio``
+    en orden de ``clave``.
+
+    Args:
+        excluir: Directorios (rutas reales) que no se recorren
+        montajes: ``{nombre: directorio}`` que se recorren como si fueran
+            subdirectorios de ``directorio`` con ese nombre
+    """
+    entradas = dict(montajes or {})
+    try:
+        with os.scandir(directorio) as iterador:
+            for entrada in iterador:
+                entradas.setdefault(entrada.name, entrada)
+    except FileNotFoundError:
+        return
+
+    for nombre in sorted(entradas):
+        entrada = entradas[nombre]
+        ruta = f"{prefijo}{nombre}"
+        if not isinstance(entrada, os.DirEntry):
+            yield from recorrer(entrada, f"{ruta}/", excluir)
+        elif entrada.is_dir(follow_symlinks=False):
+            if os.path.realpath(entrada.path) not in excluir:
+                yield from recorrer(entrada.path, f"{ruta}/", excluir)
+        elif entrada.is_file(follow_symlinks=False):
+            yield ruta, entrada
+
+
+def ordenar_externo(rutas, tamano_tramo: int = TAMANO_TRAMO):
+    """Genera ``rutas`` sin repetir y en orden de ``clave``, con memoria acotada."""
+    tramos = []
+    try:
+        rutas = iter(rutas)
+        while tramo := list(itertools.islice(rutas, tamano_tramo)):
+            archivo = tempfile.TemporaryFile("w+", encoding="utf-8")
+            archivo.writelines(
+                f"{ruta}\n" for ruta in sorted(set(tramo), key=clave) if "\n" not in ruta
+            )
+            archivo.seek(0)
+            tramos.append(archivo)
+
+        lectores = [(linea[:-1] for linea in archivo) for archivo in tramos]
+        anterior = None
+        for ruta in heapq.merge(*lectores, key=clave):
+            if ruta != anterior:
+                yield ruta
+                anterior = ruta
+    finally:
+        for archivo in tramos:
+            archivo.close()
+
+
+def huerfanos(archivos, referenciadas):
+    """
+    Archivos de ``archivos`` (salida de ``recorrer``) que no están en
+    ``referenciadas`` (salida de ``ordenar_externo``).
+    """
+    referenciadas = iter(referenciadas)
+    referencia = next(referenciadas, None)
+    for ruta, entrada in archivos:
+        actual = clave(ruta)
+        while referencia is not None and clave(referencia) < actual:
+            referencia = next(referenciadas, None)
+        if referencia != ruta:
+            yield ruta, entrada
@@ -0,0 +1,169 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apoyos.models import ProgramaSocial
+from core.imagenes import ANCHOS, FORMATOS, ruta_variante
+from core.limpieza import huerfanos, ordenar_externo, recorrer
+from servicios.models import TramiteCatalogo
+from tramites.models import (
+    ArchivoDocumento,
+    DocumentoSolicitud,
+    SubidaDocumento,
+    almacenamiento_documentos,
+    ruta_vista_previa,
+)
+
+# Antes de borrar, los candidatos se vuelven a consultar en lotes de este tamaño
+LOTE_VERIFICACION = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Busca en MEDIA_ROOT (y en el volumen de archivo) archivos que ningún registro '
+        'usa: documentos, imágenes del catálogo con sus variantes y vistas previas. '
+        'Compara el disco contra la base de datos con memoria acotada'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=24,
+            help='Solo considera huérfanos los archivos sin modificar en estas horas',
+        )
+        parser.add_argument(
+            '--borrar',
+            action='store_true',
+            help='Borra los huérfanos (sin esta opción solo se reportan)',
+        )
+        parser.add_argument(
+            '--lote', type=int, default=5000, help='Filas leídas por consulta'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        limite = time.time() - options['horas'] * 3600
+        borrar = options['borrar']
+        self.lote = options['lote']
+
+        archivo_root = almacenamiento_documentos.ubicacion_archivo
+        excluir = {
+            os.path.realpath(directorio)
+            for directorio in (
+                settings.SUBIDAS_TEMPORALES_DIR,
+                settings.CATALOGO_PUBLICADO_DIR,
+                archivo_root,
+            )
+        }
+        self.revisados = 0
+        archivos = self._contar(
+            recorrer(
+                settings.MEDIA_ROOT,
+                excluir=excluir,
+                montajes={almacenamiento_documentos.PREFIJO_ARCHIVADO: archivo_root},
+            )
+        )
+
+        encontrados = recientes = liberados = 0
+        candidatos = []
+        for ruta, entrada in huerfanos(archivos, ordenar_externo(self._referenciadas())):
+            estado = entrada.stat(follow_symlinks=False)
+            if estado.st_mtime > limite:
+                # Puede ser una subida cuyo registro aún no se confirma
+                recientes += 1
+                continue
+            encontrados += 1
+            liberados += estado.st_size
+            if self.verbosity > 1:
+                self.stdout.write(f'  {ruta}')
+            if borrar:
+                candidatos.append((ruta, entrada.path))
+                if len(candidatos) >= LOTE_VERIFICACION:
+                    self._borrar(candidatos)
+                    candidatos = []
+        if candidatos:
+            self._borrar(candidatos)
+
+        partes = self._partes_huerfanas(limite, borrar)
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(f'Archivos revisados: {self.revisados} en {segundos:.1f} s')
+        self.stdout.write(f'Huérfanos: {encontrados} ({liberados / 1024 / 1024:.1f} MB)')
+        if recientes:
+            self.stdout.write(f"Sin referencia pero recientes (< {options['horas']} h): {recientes}")
+        if partes:
+            self.stdout.write(f'Subidas reanudables sin registro: {partes}')
+        if borrar:
+            self.stdout.write(self.style.SUCCESS('✅ Huérfanos borrados.'))
+        else:
+            self.stdout.write(self.style.WARNING('Solo reporte: usa --borrar para eliminarlos'))
+
+    def _contar(self, archivos):
+        for archivo in archivos:
+            self.revisados += 1
+            yield archivo
+
+    def _valores(self, queryset, campo):
+        return queryset.exclude(**{campo: ''}).values_list(campo, flat=True).iterator(
+            chunk_size=self.lote
+        )
+
+    def _referenciadas(self):
+        """Todas las rutas del storage que algún registro usa (con repetidos)."""
+        yield from self._valores(DocumentoSolicitud.objects.all(), 'archivo')
+        yield from ArchivoDocumento.objects.values_list('ruta', flat=True).iterator(
+            chunk_size=self.lote
+        )
+        for sha256 in self._valores(DocumentoSolicitud.objects.all(), 'sha256'):
+            yield ruta_vista_previa(sha256)
+
+        # Trámites eliminados (soft delete) incluidos: se pueden restaurar
+        imagenes = (
+            TramiteCatalogo.global_objects.filter(imagen__isnull=False),
+            ProgramaSocial.objects.filter(imagen__isnull=False),
+        )
+        for queryset in imagenes:
+            for nombre in self._valores(queryset, 'imagen'):
+                yield nombre
+                for formato in FORMATOS:
+                    for ancho in ANCHOS:
+                        yield ruta_variante(nombre, ancho, formato)
+
+    def _borrar(self, candidatos):
+        # Un registro pudo empezar a usar el archivo después de leer las referencias
+        # (p. ej. se volvió a subir el mismo contenido)
+        rutas = [ruta for ruta, _ in candidatos]
+        en_uso = {
+            *DocumentoSolicitud.objects.filter(archivo__in=rutas).values_list('archivo', flat=True),
+            *ArchivoDocumento.objects.filter(ruta__in=rutas).values_list('ruta', flat=True),
+            *TramiteCatalogo.global_objects.filter(imagen__in=rutas).values_list('imagen', flat=True),
+            *ProgramaSocial.objects.filter(imagen__in=rutas).values_list('imagen', flat=True),
+        }
+        for ruta, ruta_absoluta in candidatos:
+            if ruta in en_uso:
+                continue
+            try:
+                os.remove(ruta_absoluta)
+            except FileNotFoundError:
+                pass
+
+    def _partes_huerfanas(self, limite, borrar):
+        """``.part`` de subidas reanudables cuyo registro ya no existe."""
+        vigentes = {str(pk) for pk in SubidaDocumento.objects.values_list('pk', flat=True)}
+        total = 0
+        for _, entrada in recorrer(settings.SUBIDAS_TEMPORALES_DIR):
+            nombre, extension = os.path.splitext(entrada.name)
+            if extension != '.part' or nombre in vigentes:
+                continue
+            if entrada.stat(follow_symlinks=False).st_mtime > limite:
+                continue
+            total += 1
+            if borrar:
+                try:
+                    os.remove(entrada.path)
+                except FileNotFoundError:
+                    pass
+        return total
@@ -0,0 +1,105 @@
+"""
+Búsqueda por nombre tolerante a acentos y errores de captura.
+
+Los modelos guardan una columna ``nombre_busqueda`` normalizada (ver
+``core.utils.normalizar_texto``). En PostgreSQL se indexa con ``pg_trgm`` (GIN)
+y se ordena por similitud de trigramas; en SQLite se usa una búsqueda por
+palabras sobre la misma columna normalizada.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import Q, FloatField, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from core.utils import normalizar_texto
+
+# Umbral mínimo de similitud para considerar un resultado como coincidencia
+UMBRAL_SIMILITUD = 0.3
+
+
+def usa_trigramas() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def filtrar_por_nombre(queryset, campos, termino, extra=None):
+    """
+    Filtra un queryset por similitud de nombre sobre columnas normalizadas.
+
+    Args:
+        queryset: Queryset base
+        campos: Rutas a columnas ``nombre_busqueda`` (ej: "ciudadano__nombre_busqueda")
+        termino: Texto capturado por el usuario
+        extra: Condición adicional (Q) que se combina con OR (ej: búsqueda por hash)
+
+    Returns:
+        Queryset filtrado; en PostgreSQL anotado con ``similitud`` y ordenado por ella
+    """
+    termino_normalizado = normalizar_texto(termino)
+    if not termino_normalizado:
+        return queryset.filter(extra) if extra is not None else queryset
+
+    if usa_trigramas():
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        similitudes = [
+            Coalesce(
+                TrigramWordSimilarity(termino_normalizado, campo),
+                Value(0.0),
+                output_field=FloatField(),
+            )
+            for campo in campos
+        ]
+        similitud = similitudes[0] if len(similitudes) == 1 else Greatest(*similitudes)
+
+        condicion = reduce(
+            or_,
+            [Q(**{f"{campo}__contains": termino_normalizado}) for campo in campos]
+            + [Q(**{f"{campo}__trigram_word_similar": termino_normalizado}) for campo in campos],
+        )
+        if extra is not None:
+            condicion |= extra
+
+        ordenamiento = ["-similitud", *queryset.query.order_by]
+        return (
+            queryset.annotate(similitud=similitud)
+            .filter(condicion)
+            .order_by(*ordenamiento)
+        )
+
+    # SQLite: cada palabra del término debe aparecer en la columna normalizada
+    condicion = reduce(
+        or_,
+        [
+            reduce(
+                lambda a, b: a & b,
+                [Q(**{f"{campo}__contains": palabra}) for palabra in termino_normalizado.split()],
+            )
+            for campo in campos
+        ],
+    )
+    if extra is not None:
+        condicion |= extra
+    return queryset.filter(condicion)
+
+
+def crear_indice_trigram(tabla: str, columna: str, using: str = "default") -> None:
+    """
+    Crea la extensión pg_trgm y un índice GIN de trigramas sobre ``tabla.columna``.
+    En otros motores no hace nada (el índice B-tree del campo es el respaldo).
+    """
+    from django.db import connections
+
+    conexion = connections[using]
+    if conexion.vendor != "postgresql":
+        return
+
+    nombre_indice = f"{tabla}_{columna}_trgm"
+    with conexion.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{nombre_indice}" '
+            f'ON "{tabla}" USING gin ("{columna}" gin_trgm_ops)'
+        )
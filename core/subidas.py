@@ -0,0 +1,62 @@
+"""
+Recepción de documentos de solicitudes en una sola pasada.
+
+``DocumentoUploadHandler`` escribe cada archivo a un temporal en disco mientras
+llega y, sobre los mismos bloques:
+
+- corta la petición en cuanto el archivo supera ``TAMANO_MAXIMO_DOCUMENTO``
+  (sin terminar de recibirlo ni guardarlo),
+- detecta el tipo real por sus primeros bytes (PDF, JPG, PNG),
+- calcula su SHA-256.
+
+El archivo resultante lleva ``sha256`` y ``tipo_detectado``, que usan
+``validar_archivo_documento`` y ``DocumentoSolicitud.save`` sin volver a
+leerlo. Como queda en un temporal, ``FileSystemStorage`` lo mueve en vez de
+copiarlo.
+"""
+
+import hashlib
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework.exceptions import ValidationError
+
+from core.utils import LARGO_FIRMA, TAMANO_MAXIMO_DOCUMENTO, detectar_tipo_documento
+
+
+class DocumentoUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.cabecera = b""
+        self.recibidos = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.recibidos += len(raw_data)
+        if self.recibidos > TAMANO_MAXIMO_DOCUMENTO:
+            self.upload_interrupted()
+            raise ValidationError(
+                {self.field_name: ["El archivo no debe exceder 5MB."]}
+            )
+
+        if len(self.cabecera) < LARGO_FIRMA:
+            self.cabecera += raw_data[: LARGO_FIRMA - len(self.cabecera)]
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        archivo = super().file_complete(file_size)
+        archivo.sha256 = self.digest.hexdigest()
+        archivo.tipo_detectado = detectar_tipo_documento(self.cabecera)
+        return archivo
+
+
+class SubidaDocumentosMixin:
+    """
+    Para vistas que reciben documentos: reemplaza los upload handlers de la
+    petición antes de que DRF lea el cuerpo.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        if request.method in ("POST", "PUT", "PATCH"):
+            request._request.upload_handlers = [DocumentoUploadHandler(request._request)]
+        super().initial(request, *args, **kwargs)
@@ -0,0 +1,44 @@
+"""
+Medición de tiempos por fase de una petición.
+
+Las duraciones se registran en el log y se exponen en la cabecera estándar
+``Server-Timing`` para que el frontend o el proxy puedan graficar la latencia.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("sac.timing")
+
+
+class MedidorFases:
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.fases: dict[str, float] = {}
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def fase(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nombre] = (time.perf_counter() - inicio) * 1000
+
+    @property
+    def total(self) -> float:
+        return (time.perf_counter() - self._inicio) * 1000
+
+    def server_timing(self) -> str:
+        partes = [f"{nombre};dur={ms:.1f}" for nombre, ms in self.fases.items()]
+        partes.append(f"total;dur={self.total:.1f}")
+        return ", ".join(partes)
+
+    def registrar(self, response=None):
+        """Escribe las duraciones en el log y, si se indica, en la respuesta."""
+        valor = self.server_timing()
+        logger.info("%s %s", self.nombre, valor)
+        if response is not None:
+            response["Server-Timing"] = valor
+        return response
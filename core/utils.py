@@ -1,5 +1,6 @@
+import hashlib
 import os
-import mimetypes
+import unicodedata
 from datetime import datetime
 from django.core.exceptions import ValidationError
 
@@ -8,13 +9,53 @@ def parsear_fecha(fecha: str):
     return datetime.strptime(fecha, "%d/%m/%Y").date().isoformat()
 
 
+def normalizar_texto(valor) -> str:
+    """
+    Normaliza un texto para búsquedas: mayúsculas, sin acentos y con espacios colapsados.
+    Ej: "  José   Pérez " -> "JOSE PEREZ"
+    """
+    if not valor:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(valor))
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.upper().split())
+
+
+# Tamaño máximo de un documento de solicitud: 5MB
+TAMANO_MAXIMO_DOCUMENTO = 5 * 1024 * 1024
+
+# Firmas (magic bytes) de los formatos de documento permitidos
+FIRMAS_DOCUMENTO = [
+    (b"%PDF-", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+]
+LARGO_FIRMA = max(len(firma) for firma, _ in FIRMAS_DOCUMENTO)
+
+
+def detectar_tipo_documento(cabecera: bytes) -> str | None:
+    """Tipo MIME según los primeros bytes del archivo, o None si no es PDF/JPG/PNG."""
+    for firma, tipo in FIRMAS_DOCUMENTO:
+        if cabecera.startswith(firma):
+            return tipo
+    return None
+
+
+def _dato_de_subida(archivo, nombre):
+    """Atributo que DocumentoUploadHandler deja en el archivo subido (directo o envuelto en FieldFile)."""
+    valor = getattr(archivo, nombre, None)
+    if valor is None:
+        valor = getattr(getattr(archivo, "file", None), nombre, None)
+    return valor
+
+
 def validar_archivo_documento(archivo):
     """
-    Valida que el archivo sea PDF, JPG o PNG y no exceda 5MB
+    Valida que el archivo sea PDF, JPG o PNG y no exceda 5MB.
+    El tipo se detecta por el contenido, no por el nombre.
     """
     # Validar tamaño máximo: 5MB
-    max_size = 5 * 1024 * 1024  # 5MB en bytes
-    if archivo.size > max_size:
+    if archivo.size > TAMANO_MAXIMO_DOCUMENTO:
         raise ValidationError(
             f"El archivo no debe exceder 5MB. Tamaño actual: {archivo.size / 1024 / 1024:.2f}MB"
         )
@@ -27,9 +68,27 @@ def validar_archivo_documento(archivo):
             f"Formato de archivo no permitido. Solo se permiten: PDF, JPG, PNG"
         )
 
-    # Validar tipo MIME
-    mime_type, _ = mimetypes.guess_type(archivo.name)
-    tipos_mime_permitidos = ["application/pdf", "image/jpeg", "image/png"]
+    # Validar tipo real: DocumentoUploadHandler ya lo detectó al recibir el archivo
+    mime_type = _dato_de_subida(archivo, "tipo_detectado")
+    if mime_type is None:
+        archivo.seek(0)
+        mime_type = detectar_tipo_documento(archivo.read(LARGO_FIRMA))
+        archivo.seek(0)
+
+    if mime_type is None:
+        raise ValidationError(
+            "Tipo de archivo no válido. El contenido no corresponde a un PDF, JPG o PNG"
+        )
+
 
-    if mime_type not in tipos_mime_permitidos:
-        raise ValidationError(f"Tipo de archivo no válido. Se detectó: {mime_type}")
+def calcular_sha256(archivo) -> str:
+    """SHA-256 del archivo leyendo por bloques (para archivos que no pasaron por el handler)."""
+    sha256 = _dato_de_subida(archivo, "sha256")
+    if sha256:
+        return sha256
+    digest = hashlib.sha256()
+    archivo.seek(0)
+    for bloque in archivo.chunks():
+        digest.update(bloque)
+    archivo.seek(0)
+    return digest.hexdigest()
@@ -0,0 +1,89 @@
+"""
+Sellos de versión de catálogos.
+
+Cada catálogo (localidades, trámites, programas) tiene un sello que cambia
+cada vez que su contenido cambia. Los sellos sirven para invalidar estructuras
+en memoria y para calcular ETag/Last-Modified.
+
+Se guardan en la caché ``versiones`` (por omisión una tabla de la base de
+datos que se crea al migrar), común a todos los workers y procesos:
+un cambio hecho en uno (p. ej. ``cargar_localidades``) lo ven los demás. La
+verificación ``core.E001`` impide usar una caché local en producción.
+"""
+
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+ALIAS_CACHE = "versiones"
+
+PREFIJO = "version_catalogo:"
+
+# Nombres de los catálogos versionados
+LOCALIDADES = "localidades"
+TRAMITES = "tramites"
+PROGRAMAS = "programas"
+
+
+# Segundos que un proceso reutiliza un sello ya leído (evita una consulta por petición)
+VIGENCIA_LOCAL = 1.0
+
+# nombre -> (momento de la lectura, sello)
+_leidos = {}
+
+
+def _nuevo_sello() -> int:
+    # Milisegundos desde epoch: sirve como versión y como fecha de modificación
+    return int(time.time() * 1000)
+
+
+def obtener_version(nombre: str) -> int:
+    ahora = time.monotonic()
+    leido = _leidos.get(nombre)
+    if leido is not None and ahora - leido[0] < VIGENCIA_LOCAL:
+        return leido[1]
+
+    cache = caches[ALIAS_CACHE]
+    clave = f"{PREFIJO}{nombre}"
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _nuevo_sello(), None)
+        version = cache.get(clave)
+    _leidos[nombre] = (ahora, version)
+    return version
+
+
+def incrementar_version(nombre: str) -> int:
+    # Sin leer el sello anterior: un get/set no es atómico entre procesos y el
+    # reloj ya da un valor nuevo en cada cambio
+    version = _nuevo_sello()
+    caches[ALIAS_CACHE].set(f"{PREFIJO}{nombre}", version, None)
+    _leidos[nombre] = (time.monotonic(), version)
+    return version
+
+
+def crear_tabla_cache(sender=None, using="default", **kwargs):
+    """
+    Después de migrar: crea la tabla de la caché de sellos si es
+    ``DatabaseCache`` (lo mismo que ``manage.py createcachetable``).
+    """
+    from django.conf import settings
+    from django.core.management import call_command
+
+    backend = settings.CACHES.get(ALIAS_CACHE, {}).get("BACKEND", "")
+    if backend.endswith("DatabaseCache"):
+        call_command("createcachetable", database=using, verbosity=0)
+
+
+def incrementar_al_confirmar(*nombres: str) -> None:
+    """
+    Incrementa los sellos cuando se confirme la transacción actual. Así ninguna
+    petición concurrente guarda en caché datos viejos bajo el sello nuevo.
+    """
+
+    def incrementar():
+        for nombre in nombres:
+            incrementar_version(nombre)
+
+    transaction.on_commit(incrementar)
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class DependenciasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dependencias'
+
+    def ready(self):
+        from dependencias.signals import preparar_busqueda_nombre
+
+        post_migrate.connect(preparar_busqueda_nombre, sender=self)
@@ -6,6 +6,7 @@ from django.contrib.auth.hashers import make_password
 from dependencias.models import Dependencia, Funcionario
 from usuarios.models import Usuario
 from core.choices import Roles
+from core.utils import normalizar_texto
 
 
 class Command(BaseCommand):
@@ -72,6 +73,7 @@ class Command(BaseCommand):
 
                 funcionarios_a_crear.append(Funcionario(
                     nombre_completo=nom_comp,
+                    nombre_busqueda=normalizar_texto(nom_comp),
                     correo=correo,
                     telefono=row['telefono'],
                     cargo="TITULAR",
@@ -3,6 +3,7 @@ from django_softdelete.models import SoftDeleteModel
 from simple_history.models import HistoricalRecords
 
 from core.choices import Generos, TipoDependencia
+from core.utils import normalizar_texto
 from usuarios.models import Usuario
 
 
@@ -23,6 +24,10 @@ class Dependencia(SoftDeleteModel):
 
 class Funcionario(SoftDeleteModel):
     nombre_completo = models.CharField(max_length=255)
+    nombre_busqueda = models.CharField(
+        max_length=255, blank=True, default="", editable=False,
+        help_text="Nombre completo normalizado (mayúsculas, sin acentos) para búsquedas",
+    )
     correo = models.EmailField()
     telefono = models.CharField(max_length=15, blank=True, null=True)
     cargo = models.CharField(max_length=100)
@@ -36,3 +41,9 @@ class Funcionario(SoftDeleteModel):
     usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, related_name='funcionario')
 
     history = HistoricalRecords()
+
+    def save(self, *args, **kwargs):
+        self.nombre_busqueda = normalizar_texto(self.nombre_completo)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "nombre_busqueda"}
+        super().save(*args, **kwargs)
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.search import crear_indice_trigram
+from core.utils import normalizar_texto
+from core.versiones import PROGRAMAS, TRAMITES, incrementar_al_confirmar
+from dependencias.models import Dependencia, Funcionario
+from servicios.services.publicacion import programar_publicacion
+
+
+def preparar_busqueda_nombre(sender, using="default", **kwargs):
+    """
+    Después de migrar: crea el índice de trigramas (solo PostgreSQL) y rellena
+    ``nombre_busqueda`` de los funcionarios existentes.
+    """
+    crear_indice_trigram(Funcionario._meta.db_table, "nombre_busqueda", using=using)
+
+    pendientes = (
+        Funcionario.global_objects.using(using)
+        .filter(nombre_busqueda="")
+        .only("id", "nombre_completo")
+    )
+    lote = []
+    for funcionario in pendientes.iterator(chunk_size=2000):
+        funcionario.nombre_busqueda = normalizar_texto(funcionario.nombre_completo)
+        lote.append(funcionario)
+        if len(lote) >= 2000:
+            Funcionario.global_objects.using(using).bulk_update(lote, ["nombre_busqueda"])
+            lote = []
+    if lote:
+        Funcionario.global_objects.using(using).bulk_update(lote, ["nombre_busqueda"])
+
+
+@receiver([post_save, post_delete], sender=Dependencia)
+def versionar_catalogos(sender, **kwargs):
+    """El nombre de la dependencia aparece en los catálogos de trámites y programas."""
+    incrementar_al_confirmar(TRAMITES, PROGRAMAS)
+    transaction.on_commit(programar_publicacion)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import LocalidadApiView
+from .views import LocalidadApiView, LocalidadAutocompletarView
 
 urlpatterns = [
-    path('', LocalidadApiView.as_view(), name='localidades')
+    path('', LocalidadApiView.as_view(), name='localidades'),
+    path('autocompletar/', LocalidadAutocompletarView.as_view(), name='localidades-autocompletar'),
 ]
\ No newline at end of file
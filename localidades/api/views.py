@@ -1,27 +1,89 @@
+from rest_framework import status
 from rest_framework.generics import ListAPIView
+from core.condicional import aplicar_validadores, no_modificado
+from localidades.indice import obtener_indice
 from localidades.models import Localidad
 from localidades.api.serializers import LocalidadSerializer
-from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.exceptions import ValidationError
 from rest_framework.request import Request
+from rest_framework.response import Response
+
+# Los códigos postales cambian solo al recargar el catálogo; el ETag cambia con él
+MAX_AGE_LOCALIDADES = 86400
 
 
 class LocalidadApiView(ListAPIView):
+    """
+    Colonias de un código postal. Se responde desde el índice en memoria del
+    worker (``localidades.indice``), sin consultas a la base de datos.
+    """
     queryset = Localidad.objects.all()
     serializer_class = LocalidadSerializer
-    filter_backends = [DjangoFilterBackend]
     pagination_class = None
-    filterset_fields = ['codigo_postal']
     permission_classes = []
     authentication_classes = []
 
-    def get_queryset(self):
-        queryset = Localidad.objects.all()
-
-        assert isinstance(self.request, Request)
-        codigo_postal = self.request.query_params.get('codigo_postal', None)
+    def list(self, request, *args, **kwargs):
+        assert isinstance(request, Request)
+        codigo_postal = (request.query_params.get('codigo_postal', None) or '').strip()
 
         if not codigo_postal:
             raise ValidationError({'detail': 'El parámetro codigo_postal es obligatorio.'})
 
-        return queryset
+        indice = obtener_indice()
+        etag = f'"{indice.version}-{codigo_postal}"'
+        # El sello de versión son milisegundos desde epoch
+        ultima_modificacion = indice.version // 1000
+
+        if no_modificado(request, etag, ultima_modificacion):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(indice.buscar(codigo_postal))
+        return aplicar_validadores(
+            response, etag, ultima_modificacion, max_age=MAX_AGE_LOCALIDADES
+        )
+
+
+class LocalidadAutocompletarView(ListAPIView):
+    """
+    Autocompletado de localidades desde el índice en memoria.
+
+    - ``?cp=866``: códigos postales que empiezan con el prefijo.
+    - ``?q=centro``: colonia o municipio, sin distinguir acentos.
+    - ``?limite=``: máximo de resultados (por defecto 20, tope 50).
+    """
+    queryset = Localidad.objects.all()
+    serializer_class = LocalidadSerializer
+    pagination_class = None
+    permission_classes = []
+    authentication_classes = []
+
+    LIMITE_DEFECTO = 20
+    LIMITE_MAXIMO = 50
+
+    def list(self, request, *args, **kwargs):
+        assert isinstance(request, Request)
+        prefijo = (request.query_params.get('cp', None) or '').strip()
+        termino = (request.query_params.get('q', None) or '').strip()
+
+        if not prefijo and not termino:
+            raise ValidationError({'detail': 'Se requiere el parámetro cp o q.'})
+
+        try:
+            limite = int(request.query_params.get('limite', self.LIMITE_DEFECTO))
+        except ValueError:
+            raise ValidationError({'limite': 'Debe ser un número entero.'})
+        limite = max(1, min(limite, self.LIMITE_MAXIMO))
+
+        indice = obtener_indice()
+        if prefijo:
+            resultados = indice.buscar_prefijo_codigo(prefijo, limite)
+        else:
+            resultados = indice.buscar_nombre(termino, limite)
+
+        return aplicar_validadores(
+            Response(resultados),
+            f'"{indice.version}"',
+            indice.version // 1000,
+            max_age=MAX_AGE_LOCALIDADES,
+        )
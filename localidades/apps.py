@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LocalidadesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'localidades'
+
+    def ready(self):
+        import localidades.signals  # noqa
@@ -0,0 +1,522 @@
+"""
+Índice en memoria de códigos postales → colonias.
+
+El catálogo SEPOMEX se carga una vez por worker en arreglos compactos:
+códigos postales ordenados con desplazamientos hacia las filas, y las columnas
+de texto como índices a tablas de cadenas sin repetir. Las consultas se
+resuelven con ``bisect`` sin tocar la base de datos.
+
+Para el autocompletado hay dos búsquedas: por prefijo de código postal (rango
+de ``bisect`` sobre los códigos ordenados) y por nombre de colonia/municipio
+sin acentos (índice de prefijos: palabras normalizadas ordenadas con la lista
+de filas donde aparecen).
+
+Origen del índice:
+
+- Si existe el snapshot binario (``settings.LOCALIDADES_SNAPSHOT``, lo escribe
+  ``cargar_localidades``), se abre con ``mmap``: arranque O(1) y las páginas se
+  comparten entre todos los workers del servidor.
+- Si no, o si el snapshot es de otra versión (p. ej. se editó una localidad
+  desde el admin después del último ``cargar_localidades``), se construye desde
+  la base de datos.
+
+En ambos casos el índice se vuelve a cargar cuando cambia el sello de versión
+del catálogo.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+
+from core.utils import normalizar_texto
+from core.versiones import LOCALIDADES, obtener_version
+
+VERSION_CATALOGO = LOCALIDADES
+
+# Cada cuántos segundos un worker revisa si cambió la versión del catálogo
+INTERVALO_VERIFICACION = 5.0
+
+# Longitud mínima de una búsqueda por nombre (evita recorrer medio catálogo)
+MINIMO_CARACTERES_NOMBRE = 3
+
+# Tope de filas revisadas por búsqueda: acota la latencia de términos muy comunes
+# cuya combinación de palabras casi no tiene coincidencias
+MAXIMO_REVISADAS = 5000
+
+# Formato del snapshot: MAGIA + longitud de la cabecera (uint32) + cabecera JSON,
+# después cada sección alineada a 8 bytes
+MAGIA = b"SACLOC01"
+ALINEACION = 8
+
+# Arreglos numéricos del índice y su tipo (códigos de ``array``)
+ARREGLOS = {
+    "codigos": "I",
+    "desplazamientos": "I",
+    "ids": "Q",
+    "colonias": "I",
+    "municipios": "H",
+    "estados": "H",
+    "tipos": "H",
+    "fila_por_rango": "I",
+    "colonia_rangos": "I",
+    "colonia_acumulado": "I",
+    "municipio_rangos": "I",
+    "municipio_acumulado": "I",
+}
+
+# Tablas de cadenas del índice
+TABLAS = (
+    "t_colonias",
+    "t_municipios",
+    "t_estados",
+    "t_tipos",
+    "colonias_normalizadas",
+    "municipios_normalizados",
+    "colonia_palabras",
+    "municipio_palabras",
+)
+
+
+class _TablaCadenas:
+    """Cadenas sin repetir; cada fila guarda solo el índice."""
+
+    def __init__(self):
+        self.valores: list[str] = []
+        self._posiciones: dict[str, int] = {}
+
+    def indice(self, valor: str) -> int:
+        posicion = self._posiciones.get(valor)
+        if posicion is None:
+            posicion = len(self.valores)
+            self._posiciones[valor] = posicion
+            self.valores.append(valor)
+        return posicion
+
+    def congelar(self) -> tuple:
+        self._posiciones = None
+        return tuple(self.valores)
+
+
+class _TablaMapeada:
+    """Tabla de cadenas dentro del snapshot: desplazamientos + bytes UTF-8."""
+
+    def __init__(self, desplazamientos: memoryview, datos: memoryview):
+        self.desplazamientos = desplazamientos
+        self.datos = datos
+
+    def __len__(self):
+        return len(self.desplazamientos) - 1
+
+    def __getitem__(self, k: int) -> str:
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        return str(self.datos[self.desplazamientos[k]:self.desplazamientos[k + 1]], "utf-8")
+
+
+class _IndicePalabras:
+    """
+    Palabras ordenadas → rangos de filas (ascendentes). Un prefijo corresponde a
+    un intervalo contiguo de palabras, que se localiza con ``bisect``. Los rangos
+    de todas las palabras van en un solo arreglo; ``acumulado[k]`` marca dónde
+    empiezan los de la palabra ``k``.
+    """
+
+    def __init__(self, palabras, rangos, acumulado, fila_por_rango):
+        self.palabras = palabras
+        self.rangos = memoryview(rangos)
+        self.acumulado = acumulado
+        self.fila_por_rango = fila_por_rango
+
+    @staticmethod
+    def construir(fila_por_rango, palabras_de_fila) -> tuple:
+        """Returns: (palabras ordenadas, rangos, acumulado)"""
+        rangos_por_palabra: dict[str, array] = {}
+        for rango, fila in enumerate(fila_por_rango):
+            for palabra in set(palabras_de_fila(fila)):
+                rangos = rangos_por_palabra.get(palabra)
+                if rangos is None:
+                    rangos = rangos_por_palabra[palabra] = array("I")
+                rangos.append(rango)
+
+        palabras = sorted(rangos_por_palabra)
+        rangos = array("I")
+        acumulado = array("I", [0])
+        for palabra in palabras:
+            rangos.extend(rangos_por_palabra[palabra])
+            acumulado.append(len(rangos))
+        return tuple(palabras), rangos, acumulado
+
+    def _intervalo(self, prefijo: str) -> tuple[int, int]:
+        desde = bisect_left(self.palabras, prefijo)
+        hasta = bisect_left(self.palabras, prefijo + "\uffff")
+        return desde, hasta
+
+    def filas(self, prefijos: list[str], todos: bool = True):
+        """
+        Filas (en orden de rango) con alguna palabra que empiece por el prefijo
+        más selectivo de ``prefijos``; los demás los comprueba quien llama.
+
+        Args:
+            todos: Si todos los prefijos deben estar en este índice. Con False
+                basta uno (p. ej. "atasta macus": colonia + municipio).
+        """
+        intervalos = [self._intervalo(prefijo) for prefijo in prefijos]
+        con_filas = [(desde, hasta) for desde, hasta in intervalos if desde < hasta]
+        if not con_filas or (todos and len(con_filas) < len(intervalos)):
+            return
+        desde, hasta = min(
+            con_filas, key=lambda i: self.acumulado[i[1]] - self.acumulado[i[0]]
+        )
+
+        listas = [
+            self.rangos[self.acumulado[k]:self.acumulado[k + 1]] for k in range(desde, hasta)
+        ]
+        anterior = None
+        for revisadas, rango in enumerate(merge(*listas)):
+            if revisadas >= MAXIMO_REVISADAS:
+                return
+            if rango != anterior:
+                anterior = rango
+                yield self.fila_por_rango[rango]
+
+
+class IndiceCodigosPostales:
+    def __init__(self, version: int, arreglos: dict, tablas: dict, origen=None):
+        """
+        Usar ``construir`` (desde filas) o ``abrir`` (desde un snapshot).
+
+        Args:
+            version: Sello de versión del catálogo con el que se construyó
+            arreglos: Secuencias numéricas de ``ARREGLOS`` (array o memoryview)
+            tablas: Secuencias de cadenas de ``TABLAS``
+            origen: Objeto que respalda las vistas (el mmap del snapshot)
+        """
+        self.version = version
+        self._origen = origen
+        for nombre in ARREGLOS:
+            setattr(self, nombre, arreglos[nombre])
+        for nombre in TABLAS:
+            setattr(self, nombre, tablas[nombre])
+
+        self.por_colonia = _IndicePalabras(
+            self.colonia_palabras, self.colonia_rangos, self.colonia_acumulado, self.fila_por_rango
+        )
+        self.por_municipio = _IndicePalabras(
+            self.municipio_palabras,
+            self.municipio_rangos,
+            self.municipio_acumulado,
+            self.fila_por_rango,
+        )
+
+    @classmethod
+    def construir(cls, version: int, filas) -> "IndiceCodigosPostales":
+        """
+        Args:
+            version: Sello de versión del catálogo
+            filas: Iterable de (id, codigo_postal, colonia, municipio, estado, tipo)
+                ordenado por codigo_postal
+        """
+        arreglos = {nombre: array(tipo) for nombre, tipo in ARREGLOS.items()}
+        codigos = arreglos["codigos"]
+        desplazamientos = arreglos["desplazamientos"]
+        ids = arreglos["ids"]
+        t_colonias, t_municipios = _TablaCadenas(), _TablaCadenas()
+        t_estados, t_tipos = _TablaCadenas(), _TablaCadenas()
+
+        for pk, codigo_postal, colonia, municipio, estado, tipo in filas:
+            codigo = int(codigo_postal)
+            if not codigos or codigos[-1] != codigo:
+                codigos.append(codigo)
+                desplazamientos.append(len(ids))
+            ids.append(pk)
+            arreglos["colonias"].append(t_colonias.indice(colonia))
+            arreglos["municipios"].append(t_municipios.indice(municipio))
+            arreglos["estados"].append(t_estados.indice(estado))
+            arreglos["tipos"].append(t_tipos.indice(tipo))
+        desplazamientos.append(len(ids))
+
+        tablas = {
+            "t_colonias": t_colonias.congelar(),
+            "t_municipios": t_municipios.congelar(),
+            "t_estados": t_estados.congelar(),
+            "t_tipos": t_tipos.congelar(),
+        }
+        tablas["colonias_normalizadas"] = tuple(normalizar_texto(c) for c in tablas["t_colonias"])
+        tablas["municipios_normalizados"] = tuple(
+            normalizar_texto(m) for m in tablas["t_municipios"]
+        )
+
+        # Rango estático de cada fila: colonias más cortas primero, luego código postal.
+        # Las listas de filas por palabra quedan en ese orden, así una búsqueda
+        # puede detenerse en cuanto junta suficientes resultados.
+        colonias = arreglos["colonias"]
+        municipios = arreglos["municipios"]
+        longitudes = [len(c) for c in tablas["colonias_normalizadas"]]
+        arreglos["fila_por_rango"] = array(
+            "I", sorted(range(len(ids)), key=lambda i: (longitudes[colonias[i]], i))
+        )
+
+        palabras_colonia = [c.split() for c in tablas["colonias_normalizadas"]]
+        palabras_municipio = [m.split() for m in tablas["municipios_normalizados"]]
+        (
+            tablas["colonia_palabras"],
+            arreglos["colonia_rangos"],
+            arreglos["colonia_acumulado"],
+        ) = _IndicePalabras.construir(
+            arreglos["fila_por_rango"], lambda i: palabras_colonia[colonias[i]]
+        )
+        (
+            tablas["municipio_palabras"],
+            arreglos["municipio_rangos"],
+            arreglos["municipio_acumulado"],
+        ) = _IndicePalabras.construir(
+            arreglos["fila_por_rango"], lambda i: palabras_municipio[municipios[i]]
+        )
+
+        return cls(version, arreglos, tablas)
+
+    def guardar(self, ruta) -> None:
+        """
+        Escribe el snapshot binario en un archivo temporal y lo reemplaza de
+        forma atómica: los workers con el snapshot anterior abierto siguen
+        leyendo su copia hasta que detectan el cambio.
+        """
+        secciones = []
+        for nombre in ARREGLOS:
+            secciones.append((nombre, memoryview(getattr(self, nombre)).cast("B")))
+        for nombre in TABLAS:
+            codificadas = [cadena.encode("utf-8") for cadena in getattr(self, nombre)]
+            desplazamientos = array("I", [0])
+            for cadena in codificadas:
+                desplazamientos.append(desplazamientos[-1] + len(cadena))
+            secciones.append((f"{nombre}.desplazamientos", memoryview(desplazamientos).cast("B")))
+            secciones.append((f"{nombre}.datos", memoryview(b"".join(codificadas))))
+
+        # Posición de cada sección relativa al inicio de los datos: [posición, bytes, tamaño de elemento]
+        cabecera = {"version": self.version, "secciones": {}}
+        posicion = 0
+        for nombre, datos in secciones:
+            cabecera["secciones"][nombre] = [posicion, datos.nbytes]
+            posicion += datos.nbytes + _relleno(datos.nbytes)
+        for nombre, tipo in ARREGLOS.items():
+            cabecera["secciones"][nombre].append(array(tipo).itemsize)
+
+        cabecera_bytes = json.dumps(cabecera).encode("utf-8")
+        inicio = len(MAGIA) + 4 + len(cabecera_bytes)
+        inicio += _relleno(inicio)
+
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(MAGIA)
+            archivo.write(struct.pack("<I", len(cabecera_bytes)))
+            archivo.write(cabecera_bytes)
+            for nombre, datos in secciones:
+                archivo.write(b"\0" * (inicio + cabecera["secciones"][nombre][0] - archivo.tell()))
+                archivo.write(datos)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def abrir(cls, ruta) -> "IndiceCodigosPostales":
+        """Abre un snapshot con ``mmap`` (solo lectura). No copia los datos."""
+        with open(ruta, "rb") as archivo:
+            mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if mapa[:len(MAGIA)] != MAGIA:
+            mapa.close()
+            raise ValueError(f"{ruta} no es un snapshot de localidades")
+        (longitud,) = struct.unpack_from("<I", mapa, len(MAGIA))
+        cabecera_inicio = len(MAGIA) + 4
+        cabecera = json.loads(mapa[cabecera_inicio:cabecera_inicio + longitud])
+        inicio = cabecera_inicio + longitud
+        inicio += _relleno(inicio)
+
+        vista = memoryview(mapa)
+        secciones = cabecera["secciones"]
+
+        def seccion(nombre):
+            posicion, tamano = secciones[nombre][:2]
+            return vista[inicio + posicion:inicio + posicion + tamano]
+
+        arreglos = {}
+        for nombre, tipo in ARREGLOS.items():
+            if secciones[nombre][2] != array(tipo).itemsize:
+                raise ValueError(f"{ruta} se generó en una plataforma incompatible")
+            arreglos[nombre] = seccion(nombre).cast(tipo)
+        tablas = {
+            nombre: _TablaMapeada(
+                seccion(f"{nombre}.desplazamientos").cast("I"), seccion(f"{nombre}.datos")
+            )
+            for nombre in TABLAS
+        }
+        return cls(cabecera["version"], arreglos, tablas, origen=mapa)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _posicion(self, codigo_postal: str):
+        if len(codigo_postal) != 5 or not codigo_postal.isdigit():
+            return None
+        codigo = int(codigo_postal)
+        posicion = bisect_left(self.codigos, codigo)
+        if posicion < len(self.codigos) and self.codigos[posicion] == codigo:
+            return posicion
+        return None
+
+    def _codigo_de_fila(self, i: int) -> int:
+        return self.codigos[bisect_right(self.desplazamientos, i) - 1]
+
+    def fila(self, i: int, codigo: int | None = None) -> dict:
+        if codigo is None:
+            codigo = self._codigo_de_fila(i)
+        return {
+            "id": self.ids[i],
+            "codigo_postal": f"{codigo:05d}",
+            "colonia": self.t_colonias[self.colonias[i]],
+            "municipio": self.t_municipios[self.municipios[i]],
+            "estado": self.t_estados[self.estados[i]],
+            "tipo": self.t_tipos[self.tipos[i]],
+        }
+
+    def buscar(self, codigo_postal: str) -> list[dict]:
+        """Localidades de un código postal exacto (mismo formato que LocalidadSerializer)."""
+        posicion = self._posicion(codigo_postal)
+        if posicion is None:
+            return []
+        codigo = self.codigos[posicion]
+        inicio, fin = self.desplazamientos[posicion], self.desplazamientos[posicion + 1]
+        return [self.fila(i, codigo) for i in range(inicio, fin)]
+
+    def buscar_prefijo_codigo(self, prefijo: str, limite: int = 20) -> list[dict]:
+        """
+        Localidades cuyos códigos postales empiezan con ``prefijo``, en orden de
+        código postal. El prefijo "866" equivale al rango [86600, 86700).
+        """
+        if not prefijo or len(prefijo) > 5 or not prefijo.isdigit():
+            return []
+        escala = 10 ** (5 - len(prefijo))
+        desde = bisect_left(self.codigos, int(prefijo) * escala)
+        hasta = bisect_left(self.codigos, (int(prefijo) + 1) * escala)
+        if desde >= hasta:
+            return []
+
+        resultado = []
+        for posicion in range(desde, hasta):
+            codigo = self.codigos[posicion]
+            for i in range(self.desplazamientos[posicion], self.desplazamientos[posicion + 1]):
+                resultado.append(self.fila(i, codigo))
+                if len(resultado) >= limite:
+                    return resultado
+        return resultado
+
+    def buscar_nombre(self, termino: str, limite: int = 20) -> list[dict]:
+        """
+        Búsqueda sin acentos por colonia o municipio. Cada palabra del término
+        se toma como prefijo de alguna palabra del nombre.
+
+        Primero las colonias que contienen todas las palabras (las que empiezan
+        con el término completo antes que el resto; después las más cortas), y
+        si faltan resultados, las localidades cuyo municipio coincide.
+        """
+        normalizado = normalizar_texto(termino)
+        if len(normalizado) < MINIMO_CARACTERES_NOMBRE:
+            return []
+        palabras = normalizado.split()
+
+        def coincide(nombre: list, palabra: str) -> bool:
+            return any(p.startswith(palabra) for p in nombre)
+
+        # Candidatos extra para reordenar por "empieza con el término"
+        margen = limite * 4
+        por_colonia = []
+        for i in self.por_colonia.filas(palabras):
+            nombre = self.colonias_normalizadas[self.colonias[i]].split()
+            if all(coincide(nombre, palabra) for palabra in palabras):
+                por_colonia.append(i)
+                if len(por_colonia) >= margen:
+                    break
+        por_colonia.sort(
+            key=lambda i: not self.colonias_normalizadas[self.colonias[i]].startswith(normalizado)
+        )
+        resultado = por_colonia[:limite]
+
+        if len(resultado) < limite:
+            vistas = set(resultado)
+            for i in self.por_municipio.filas(palabras, todos=False):
+                if i in vistas:
+                    continue
+                nombre = (
+                    self.colonias_normalizadas[self.colonias[i]].split()
+                    + self.municipios_normalizados[self.municipios[i]].split()
+                )
+                if all(coincide(nombre, palabra) for palabra in palabras):
+                    resultado.append(i)
+                    if len(resultado) >= limite:
+                        break
+
+        return [self.fila(i) for i in resultado]
+
+
+def _relleno(posicion: int) -> int:
+    return -posicion % ALINEACION
+
+
+def construir_desde_bd(version: int) -> IndiceCodigosPostales:
+    from localidades.models import Localidad
+
+    filas = (
+        Localidad.objects.order_by("codigo_postal", "id")
+        .values_list("id", "codigo_postal", "colonia", "municipio", "estado", "tipo")
+        .iterator(chunk_size=5000)
+    )
+    return IndiceCodigosPostales.construir(version, filas)
+
+
+def ruta_snapshot():
+    from django.conf import settings
+
+    return getattr(settings, "LOCALIDADES_SNAPSHOT", None)
+
+
+_indice = None
+_ultima_verificacion = 0.0
+_candado = threading.Lock()
+
+
+def _cargar_indice(version: int) -> IndiceCodigosPostales:
+    ruta = ruta_snapshot()
+    if ruta and os.path.exists(ruta):
+        snapshot = IndiceCodigosPostales.abrir(ruta)
+        if snapshot.version == version:
+            return snapshot
+    return construir_desde_bd(version)
+
+
+def obtener_indice() -> IndiceCodigosPostales:
+    """
+    Índice del proceso actual. Cada pocos segundos se revisa el sello de
+    versión del catálogo y, si cambió, se vuelve a cargar (del snapshot si es
+    de esa versión, si no desde la base de datos).
+    """
+    global _indice, _ultima_verificacion
+
+    ahora = time.monotonic()
+    if _indice is not None and ahora - _ultima_verificacion < INTERVALO_VERIFICACION:
+        return _indice
+    _ultima_verificacion = ahora
+
+    version = obtener_version(VERSION_CATALOGO)
+    if _indice is not None and _indice.version == version:
+        return _indice
+
+    with _candado:
+        if _indice is None or _indice.version != version:
+            _indice = _cargar_indice(version)
+    return _indice
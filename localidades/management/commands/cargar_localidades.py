@@ -1,57 +1,128 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connection
+
+from core.versiones import incrementar_version
+from localidades.indice import VERSION_CATALOGO, construir_desde_bd, ruta_snapshot
 from localidades.models import Localidad
+from localidades.services.sepomex import (
+    cargar_catalogo,
+    en_lotes,
+    leer_sepomex,
+    sincronizar_catalogo,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def memoria_pico_mb():
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
 
 class Command(BaseCommand):
-    help = 'Carga optimizada de localidades (Compatible con SQLite y Postgres)'
+    help = (
+        'Carga el catálogo SEPOMEX. Si la tabla ya tiene datos, sincroniza solo los '
+        'cambios (altas, cambios de tipo y bajas); con --reemplazar o con la tabla '
+        'vacía hace una carga completa en streaming (COPY en Postgres, executemany en SQLite)'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument('ruta', type=str)
+        parser.add_argument('--lote', type=int, default=20000, help='Filas por lote')
+        parser.add_argument('--encoding', type=str, default='latin-1')
+        parser.add_argument('--delimitador', type=str, default='|')
+        parser.add_argument(
+            '--reemplazar',
+            action='store_true',
+            help='Vacía y recarga la tabla completa (renumera las localidades)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo muestra el resumen de la sincronización, sin escribir',
+        )
 
     def handle(self, *args, **options):
-        # 1. Detección de motor para evitar errores en SQLite
-        # SQLite tiene un límite de 999 variables por consulta
         vendor = connection.vendor
-        batch_size = 900 if vendor == 'sqlite' else 5000
-
-        self.stdout.write(f"Detectado motor: {vendor}. Usando batch_size: {batch_size}")
-
-        # 2. Lectura selectiva del CSV
-        cols_sepomex = ['d_codigo', 'd_asenta', 'd_tipo_asenta', 'D_mnpio', 'd_estado']
-        df = pd.read_csv(
-            options['ruta'],
-            encoding='latin1',
-            sep='|',
-            dtype=str,
-            usecols=cols_sepomex
-        )
-
-        df = df[['d_codigo', 'd_asenta', 'D_mnpio', 'd_estado', 'd_tipo_asenta']]
+        self.stdout.write(f"Detectado motor: {vendor}. Lotes de {options['lote']} filas")
 
-        df.columns = ['codigo_postal', 'colonia', 'municipio', 'estado', 'tipo']
-        # df = df.drop_duplicates()
+        inicio = time.perf_counter()
+        self.leidas = 0
+        filas = leer_sepomex(options['ruta'], options['encoding'], options['delimitador'])
 
-        # 3. Limpieza atómica (Más segura)
-        Localidad.objects.all().delete()
+        completa = options['reemplazar'] or not Localidad.objects.exists()
+        if completa and options['dry_run']:
+            raise CommandError('--dry-run solo aplica a la sincronización incremental')
 
-        # 4. Generador para no saturar la RAM
-        def localidad_generator():
-            for row in df.itertuples(index=False):
-                yield Localidad(
-                    codigo_postal=row.codigo_postal,
-                    colonia=row.colonia,
-                    municipio=row.municipio,
-                    estado=row.estado,
-                    tipo=row.tipo
+        try:
+            if completa:
+                # 1. Lectura en streaming del archivo y escritura por lotes
+                insertadas = cargar_catalogo(en_lotes(filas, options['lote']), self._avanzar)
+            else:
+                # 1. Diferencias contra la tabla actual por clave natural
+                resumen = sincronizar_catalogo(
+                    self._contar(filas),
+                    tam_lote=900 if vendor == 'sqlite' else 5000,
+                    aplicar=not options['dry_run'],
                 )
+        except ValueError as e:
+            raise CommandError(str(e))
+        segundos = time.perf_counter() - inicio
+
+        if completa:
+            self.stdout.write(f"Filas leídas: {self.leidas} (duplicadas: {self.leidas - insertadas})")
+            self._reportar_rendimiento(segundos)
+            self.stdout.write(self.style.SUCCESS(f'✅ {insertadas} localidades cargadas.'))
+        else:
+            self._reportar_sincronizacion(resumen, options['dry_run'], segundos)
+            hubo_cambios = resumen['altas'] or resumen['cambios'] or resumen['bajas']
+            if options['dry_run'] or not hubo_cambios:
+                return
+
+        # 2. Invalida los índices en memoria de los workers
+        version = incrementar_version(VERSION_CATALOGO)
+
+        # 3. Snapshot binario que los workers abren con mmap
+        ruta = ruta_snapshot()
+        if ruta:
+            indice = construir_desde_bd(version)
+            indice.guardar(ruta)
+            self.stdout.write(f"Snapshot escrito en {ruta} ({len(indice)} localidades)")
+
+    def _avanzar(self, filas):
+        self.leidas += filas
+
+    def _contar(self, filas):
+        for fila in filas:
+            self.leidas += 1
+            yield fila
 
-        # 5. Inserción masiva
-        Localidad.objects.bulk_create(
-            localidad_generator(),
-            batch_size=batch_size,
-            ignore_conflicts=True
+    def _reportar_rendimiento(self, segundos):
+        self.stdout.write(
+            f"Tiempo: {segundos:.1f} s "
+            f"({self.leidas / segundos if segundos else 0:.0f} filas/s)"
         )
+        pico = memoria_pico_mb()
+        if pico is not None:
+            self.stdout.write(f"Memoria pico: {pico:.0f} MB")
 
-        self.stdout.write(self.style.SUCCESS(f'✅ {len(df)} registros procesados.'))
+    def _reportar_sincronizacion(self, resumen, simulacion, segundos):
+        if simulacion:
+            self.stdout.write(self.style.WARNING("Simulación (--dry-run): no se escribió nada"))
+        self.stdout.write(f"Filas leídas: {self.leidas} (duplicadas: {resumen['duplicadas']})")
+        self.stdout.write(f"Sin cambios: {resumen['sin_cambios']}")
+        titulos = [('altas', 'Altas'), ('cambios', 'Cambios de tipo'), ('bajas', 'Bajas')]
+        for tipo_cambio, titulo in titulos:
+            self.stdout.write(f"{titulo}: {resumen[tipo_cambio]}")
+            for muestra in resumen['muestras'][tipo_cambio]:
+                self.stdout.write(f"    {muestra}")
+        self._reportar_rendimiento(segundos)
+        if not simulacion:
+            self.stdout.write(self.style.SUCCESS('✅ Catálogo sincronizado.'))
@@ -0,0 +1,280 @@
+"""
+Carga del catálogo de códigos postales de SEPOMEX.
+
+El archivo (texto separado por ``|``, latin-1) se lee en streaming y se escribe
+por lotes, así la memoria no depende del tamaño del catálogo:
+
+- PostgreSQL: ``COPY FROM STDIN`` a una tabla temporal y, en la misma
+  transacción, reemplazo del contenido de la tabla real.
+- SQLite: ``executemany`` en una sola transacción con pragmas de escritura
+  rápida.
+
+Para las actualizaciones mensuales está ``sincronizar_catalogo``: compara el
+archivo contra la tabla por clave natural y aplica solo las altas, cambios y
+bajas, sin renumerar las localidades que no cambiaron.
+"""
+
+import csv
+import hashlib
+import io
+from itertools import islice
+
+from django.db import connection, models, transaction
+
+from localidades.models import Localidad
+
+# Columnas del archivo SEPOMEX en el orden de COLUMNAS
+COLUMNAS_SEPOMEX = ["d_codigo", "d_asenta", "D_mnpio", "d_estado", "d_tipo_asenta"]
+COLUMNAS = ["codigo_postal", "colonia", "municipio", "estado", "tipo"]
+
+# Columnas que identifican una localidad (igual que la restricción unique_localidad)
+CLAVE_NATURAL = ["codigo_postal", "colonia", "municipio", "estado"]
+
+# Pragmas de SQLite durante la carga (se restauran al terminar)
+PRAGMAS_CARGA = {
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",
+}
+
+
+def leer_sepomex(ruta: str, encoding: str = "latin-1", delimitador: str = "|"):
+    """
+    Produce tuplas (codigo_postal, colonia, municipio, estado, tipo).
+    Se salta la nota de copyright que precede al encabezado en el archivo oficial.
+    """
+    with open(ruta, encoding=encoding, newline="") as archivo:
+        lector = csv.reader(archivo, delimiter=delimitador, quoting=csv.QUOTE_NONE)
+        for encabezado in lector:
+            if "d_codigo" in encabezado:
+                break
+        else:
+            raise ValueError(f"No se encontró el encabezado d_codigo en {ruta}")
+
+        posiciones = [encabezado.index(columna) for columna in COLUMNAS_SEPOMEX]
+        ultima = max(posiciones)
+        for fila in lector:
+            if len(fila) <= ultima:
+                continue
+            yield tuple(fila[posicion].strip() for posicion in posiciones)
+
+
+def en_lotes(filas, tam_lote: int):
+    filas = iter(filas)
+    while lote := list(islice(filas, tam_lote)):
+        yield lote
+
+
+def liberar_referencias() -> None:
+    """
+    Pone en NULL las referencias con ``on_delete=SET_NULL`` (p. ej.
+    ``Ciudadano.localidad``) antes de vaciar la tabla con SQL directo, como lo
+    haría ``Localidad.objects.all().delete()`` pero sin cargar cada fila.
+    """
+    for relacion in Localidad._meta.related_objects:
+        if relacion.on_delete is models.SET_NULL:
+            nombre = relacion.field.name
+            relacion.related_model._base_manager.filter(
+                **{f"{nombre}__isnull": False}
+            ).update(**{nombre: None})
+
+
+def _tabla_y_columnas() -> tuple[str, str]:
+    qn = connection.ops.quote_name
+    return qn(Localidad._meta.db_table), ", ".join(qn(c) for c in COLUMNAS)
+
+
+def _copiar(cursor, sql: str, lote: list[tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(lote)
+    crudo = cursor.cursor
+    if hasattr(crudo, "copy"):
+        # psycopg 3
+        with crudo.copy(sql) as copia:
+            copia.write(buffer.getvalue())
+    else:
+        # psycopg2
+        buffer.seek(0)
+        crudo.copy_expert(sql, buffer)
+
+
+def cargar_postgres(lotes, al_avanzar=None) -> int:
+    """
+    Copia los lotes a una tabla temporal y reemplaza el catálogo en una sola
+    transacción: las lecturas concurrentes ven el catálogo anterior o el nuevo,
+    nunca la tabla vacía.
+
+    Returns:
+        Filas insertadas en la tabla real
+    """
+    tabla, columnas = _tabla_y_columnas()
+    sql_copy = (
+        f"COPY localidades_carga ({columnas}) FROM STDIN "
+        f"WITH (FORMAT csv, FORCE_NOT_NULL ({columnas}))"
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE localidades_carga "
+            f"(LIKE {tabla} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        cursor.execute("ALTER TABLE localidades_carga DROP COLUMN id")
+        for lote in lotes:
+            _copiar(cursor, sql_copy, lote)
+            if al_avanzar:
+                al_avanzar(len(lote))
+
+        liberar_referencias()
+        cursor.execute(f"DELETE FROM {tabla}")
+        cursor.execute(
+            f"INSERT INTO {tabla} ({columnas}) SELECT {columnas} FROM localidades_carga "
+            f"ON CONFLICT DO NOTHING"
+        )
+        return cursor.rowcount
+
+
+def cargar_sqlite(lotes, al_avanzar=None) -> int:
+    """
+    Inserta los lotes con ``executemany`` en una sola transacción.
+
+    Returns:
+        Filas insertadas
+    """
+    tabla, columnas = _tabla_y_columnas()
+    sql_insert = f"INSERT OR IGNORE INTO {tabla} ({columnas}) VALUES (%s, %s, %s, %s, %s)"
+
+    with connection.cursor() as cursor:
+        anteriores = {}
+        for pragma, valor in PRAGMAS_CARGA.items():
+            cursor.execute(f"PRAGMA {pragma}")
+            anteriores[pragma] = cursor.fetchone()[0]
+            cursor.execute(f"PRAGMA {pragma} = {valor}")
+
+        try:
+            insertadas = 0
+            with transaction.atomic():
+                liberar_referencias()
+                cursor.execute(f"DELETE FROM {tabla}")
+                for lote in lotes:
+                    cursor.executemany(sql_insert, lote)
+                    insertadas += max(cursor.rowcount, 0)
+                    if al_avanzar:
+                        al_avanzar(len(lote))
+            return insertadas
+        finally:
+            for pragma, valor in anteriores.items():
+                cursor.execute(f"PRAGMA {pragma} = {valor}")
+
+
+def cargar_catalogo(lotes, al_avanzar=None) -> int:
+    """Reemplaza el catálogo con el método más rápido del motor actual."""
+    if connection.vendor == "postgresql":
+        return cargar_postgres(lotes, al_avanzar)
+    return cargar_sqlite(lotes, al_avanzar)
+
+
+def clave_natural(codigo_postal: str, colonia: str, municipio: str, estado: str) -> bytes:
+    """Hash de 16 bytes de la clave natural (mantiene chico el mapa en memoria)."""
+    texto = "\x1f".join((codigo_postal, colonia, municipio, estado))
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).digest()
+
+
+def sincronizar_catalogo(
+    filas, tam_lote: int = 5000, aplicar: bool = True, muestras: int = 10
+) -> dict:
+    """
+    Sincroniza la tabla con el archivo por clave natural:
+
+    - altas: claves del archivo que no están en la tabla
+    - cambios: claves existentes cuyo ``tipo`` cambió
+    - bajas: claves de la tabla que ya no vienen en el archivo (se borran;
+      los ciudadanos que las referían quedan con ``localidad`` en NULL)
+
+    Las localidades sin cambios conservan su id.
+
+    Args:
+        filas: Tuplas (codigo_postal, colonia, municipio, estado, tipo)
+        tam_lote: Filas por operación de escritura
+        aplicar: Con False solo calcula el resumen (simulación)
+        muestras: Ejemplos de cada tipo de cambio incluidos en el resumen
+
+    Returns:
+        Resumen con conteos (altas, cambios, bajas, sin_cambios, duplicadas) y muestras
+    """
+    resumen = {
+        "altas": 0,
+        "cambios": 0,
+        "bajas": 0,
+        "sin_cambios": 0,
+        "duplicadas": 0,
+        "muestras": {"altas": [], "cambios": [], "bajas": []},
+    }
+
+    def anotar(tipo_cambio, descripcion):
+        resumen[tipo_cambio] += 1
+        if len(resumen["muestras"][tipo_cambio]) < muestras:
+            resumen["muestras"][tipo_cambio].append(descripcion)
+
+    with transaction.atomic():
+        # Estado actual: clave natural → (id, tipo)
+        existentes = {
+            clave_natural(cp, colonia, municipio, estado): (pk, tipo)
+            for pk, cp, colonia, municipio, estado, tipo in Localidad.objects.values_list(
+                "id", *CLAVE_NATURAL, "tipo"
+            ).iterator(chunk_size=tam_lote)
+        }
+        vistas = set()
+        altas, cambios = [], []
+
+        for codigo_postal, colonia, municipio, estado, tipo in filas:
+            clave = clave_natural(codigo_postal, colonia, municipio, estado)
+            if clave in vistas:
+                resumen["duplicadas"] += 1
+                continue
+            vistas.add(clave)
+            descripcion = f"{codigo_postal} {colonia}, {municipio}, {estado}"
+
+            actual = existentes.pop(clave, None)
+            if actual is None:
+                anotar("altas", descripcion)
+                if aplicar:
+                    altas.append(
+                        Localidad(
+                            codigo_postal=codigo_postal,
+                            colonia=colonia,
+                            municipio=municipio,
+                            estado=estado,
+                            tipo=tipo,
+                        )
+                    )
+            elif actual[1] != tipo:
+                anotar("cambios", f"{descripcion}: {actual[1]} → {tipo}")
+                if aplicar:
+                    cambios.append(Localidad(id=actual[0], tipo=tipo))
+            else:
+                resumen["sin_cambios"] += 1
+
+            if len(altas) >= tam_lote:
+                Localidad.objects.bulk_create(altas, ignore_conflicts=True)
+                altas = []
+            if len(cambios) >= tam_lote:
+                Localidad.objects.bulk_update(cambios, ["tipo"])
+                cambios = []
+
+        # Lo que queda en el mapa ya no viene en el archivo
+        bajas = [pk for pk, _ in existentes.values()]
+        resumen["muestras"]["bajas"] = [
+            str(localidad) for localidad in Localidad.objects.filter(pk__in=bajas[:muestras])
+        ]
+        resumen["bajas"] = len(bajas)
+
+        if aplicar:
+            if altas:
+                Localidad.objects.bulk_create(altas, ignore_conflicts=True)
+            if cambios:
+                Localidad.objects.bulk_update(cambios, ["tipo"])
+            for lote in en_lotes(bajas, tam_lote):
+                # delete() del ORM aplica SET_NULL en Ciudadano.localidad
+                Localidad.objects.filter(id__in=lote).delete()
+
+    return resumen
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.versiones import LOCALIDADES, incrementar_al_confirmar
+from localidades.models import Localidad
+
+
+@receiver([post_save, post_delete], sender=Localidad)
+def versionar_localidades(sender, **kwargs):
+    """
+    Ediciones sueltas (admin). Las cargas masivas de cargar_localidades no
+    emiten señales; el comando incrementa el sello por su cuenta.
+    """
+    incrementar_al_confirmar(LOCALIDADES)
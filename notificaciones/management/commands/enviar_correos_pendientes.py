@@ -0,0 +1,36 @@
+"""
+Comando para enviar los correos pendientes de la bandeja de salida
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from notificaciones.services import NotificationManager
+
+
+class Command(BaseCommand):
+    help = "Envía los correos de notificaciones pendientes (bienvenidas, cambios de estado)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limite", type=int, default=500, help="Correos por ronda")
+        parser.add_argument(
+            "--continuo",
+            action="store_true",
+            help="Repite el envío hasta vaciar la bandeja",
+        )
+
+    def handle(self, *args, **options):
+        manager = NotificationManager()
+        total = 0
+
+        while True:
+            enviados, revisados = manager.enviar_correos_pendientes(limite=options["limite"])
+            total += enviados
+            self.stdout.write(f"Enviados en esta ronda: {enviados} de {revisados}")
+            # Los fallidos quedan en espera de reintento: la ronda no se repite con ellos
+            if not options["continuo"] or revisados < options["limite"]:
+                break
+            time.sleep(1)
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Total de correos enviados: {total}"))
@@ -14,6 +14,7 @@ class TipoNotificacion(models.TextChoices):
     SOLICITUD_RECHAZADA = "SOLICITUD_RECHAZADA", "Solicitud Rechazada"
     SOLICITUD_ASIGNADA = "SOLICITUD_ASIGNADA", "Solicitud Asignada"
     DOCUMENTO_RECIBIDO = "DOCUMENTO_RECIBIDO", "Documento Recibido"
+    BIENVENIDA = "BIENVENIDA", "Bienvenida"
     SISTEMA = "SISTEMA", "Notificación del Sistema"
 
 
@@ -56,12 +57,19 @@ class Notificacion(models.Model):
         default=False,
         help_text="Indica si debe enviarse email (depende del rol del usuario)",
     )
+    intentos_email = models.PositiveSmallIntegerField(
+        default=0, help_text="Envíos de correo fallidos"
+    )
+    fecha_error_email = models.DateTimeField(
+        null=True, blank=True, help_text="Último envío de correo fallido"
+    )
 
     class Meta:
         ordering = ["-fecha_creacion"]
         indexes = [
             models.Index(fields=["usuario", "-fecha_creacion"]),
             models.Index(fields=["usuario", "leida"]),
+            models.Index(fields=["requiere_email", "email_enviado"]),
         ]
 
     def __str__(self):
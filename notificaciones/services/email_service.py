@@ -7,6 +7,7 @@ from typing import Dict, Any
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
+from django.utils.html import strip_tags
 
 
 class EmailService:
@@ -115,3 +116,30 @@ H. Ayuntamiento de Macuspana
         return self.enviar_notificacion(
             destinatario=destinatario, asunto=asunto, mensaje=mensaje, metadata=metadata
         )
+
+    def enviar_bienvenida(self, destinatario: str, nombre: str, curp: str) -> bool:
+        """
+        Envía el correo institucional de bienvenida al registro ciudadano.
+        """
+        try:
+            contexto = {"nombre": nombre, "curp": curp, "web": settings.WEB_URL}
+
+            # Renderiza el HTML con los datos del ciudadano
+            html_message = render_to_string("bienvenida_email.html", contexto)
+            # Versión en texto plano para clientes que no soportan HTML
+            text_message = strip_tags(html_message)
+
+            send_mail(
+                subject="Bienvenido al Registro Ciudadano - Macuspana",
+                message=text_message,
+                from_email=None,
+                recipient_list=[destinatario],
+                html_message=html_message,
+                fail_silently=False,
+            )
+
+            return True
+
+        except Exception as e:
+            print(f"Error enviando bienvenida a {destinatario}: {e}")
+            return False
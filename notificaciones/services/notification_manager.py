@@ -3,7 +3,11 @@ Servicio centralizado para gestión de notificaciones.
 Maneja la lógica de despacho condicional según el rol del usuario.
 """
 
+import threading
+from datetime import timedelta
 from typing import Optional, Dict, Any
+from django.db import connection
+from django.db.models import F, Q
 from django.utils import timezone
 
 from core.choices import Roles
@@ -12,6 +16,10 @@ from tramites.models import Solicitud
 from usuarios.models import Usuario
 from .email_service import EmailService
 
+# Reintentos de correos fallidos en la bandeja de salida
+MAX_INTENTOS_EMAIL = 5
+ESPERA_REINTENTO_EMAIL = timedelta(minutes=15)
+
 
 class NotificationManager:
     """
@@ -96,6 +104,122 @@ class NotificationManager:
             # Log del error pero no falla la creación de la notificación
             print(f"Error enviando email para notificación {notificacion.id}: {e}")
 
+    def encolar_bienvenidas(self, usuarios: list[Usuario]) -> list[Notificacion]:
+        """
+        Registra en bloque el correo de bienvenida de ciudadanos recién creados.
+        El envío real lo hace ``enviar_correos_pendientes`` (fuera de la petición).
+        """
+        return Notificacion.objects.bulk_create(
+            [
+                Notificacion(
+                    usuario=usuario,
+                    tipo=TipoNotificacion.BIENVENIDA,
+                    titulo="Bienvenido al Registro Ciudadano - Macuspana",
+                    mensaje="Tu registro en el Sistema de Atención Ciudadana se realizó correctamente.",
+                    requiere_email=True,
+                    email_enviado=False,
+                )
+                for usuario in usuarios
+            ]
+        )
+
+    def enviar_correos_pendientes(self, limite: int = 500) -> tuple[int, int]:
+        """
+        Envía los correos de notificaciones pendientes (bandeja de salida).
+
+        Un envío fallido suma un intento y la notificación espera
+        ``ESPERA_REINTENTO_EMAIL`` antes de volver a la cola; tras
+        ``MAX_INTENTOS_EMAIL`` se deja de intentar. Las notificaciones de
+        usuarios sin ciudadano (sin correo) se marcan como que no requieren email.
+
+        Returns:
+            ``(enviados, revisados)``: correos enviados y notificaciones tomadas de la cola
+        """
+        reintento = timezone.now() - ESPERA_REINTENTO_EMAIL
+        pendientes = list(
+            Notificacion.objects.filter(
+                requiere_email=True,
+                email_enviado=False,
+                intentos_email__lt=MAX_INTENTOS_EMAIL,
+            )
+            .filter(Q(fecha_error_email__isnull=True) | Q(fecha_error_email__lt=reintento))
+            .select_related("usuario__ciudadano")
+            .order_by("fecha_creacion")[:limite]
+        )
+
+        enviados, fallidos, sin_correo = [], [], []
+        for notificacion in pendientes:
+            if getattr(notificacion.usuario, "ciudadano", None) is None:
+                sin_correo.append(notificacion.id)
+                continue
+            try:
+                exito = self.enviar_correo(notificacion)
+            except Exception as e:
+                print(f"Error enviando email para notificación {notificacion.id}: {e}")
+                exito = False
+            (enviados if exito else fallidos).append(notificacion.id)
+
+        Notificacion.objects.filter(id__in=enviados).update(email_enviado=True)
+        Notificacion.objects.filter(id__in=sin_correo).update(requiere_email=False)
+        self._registrar_fallos(fallidos)
+        return len(enviados), len(pendientes)
+
+    def _registrar_fallos(self, notificacion_ids: list[int]) -> None:
+        Notificacion.objects.filter(id__in=notificacion_ids).update(
+            intentos_email=F("intentos_email") + 1, fecha_error_email=timezone.now()
+        )
+
+    def enviar_correo(self, notificacion: Notificacion) -> bool:
+        """
+        Envía el correo de una notificación al ciudadano (no actualiza ``email_enviado``).
+        """
+        ciudadano = getattr(notificacion.usuario, "ciudadano", None)
+        if ciudadano is None:
+            return False
+
+        if notificacion.tipo == TipoNotificacion.BIENVENIDA:
+            return self.email_service.enviar_bienvenida(
+                destinatario=str(ciudadano.correo),
+                nombre=ciudadano.nombre,
+                curp=ciudadano.curp,
+            )
+
+        return self.email_service.enviar_notificacion(
+            destinatario=str(ciudadano.correo),
+            asunto=notificacion.titulo,
+            mensaje=notificacion.mensaje,
+            metadata=notificacion.metadata,
+        )
+
+    def enviar_correo_en_segundo_plano(self, notificacion_id: int) -> None:
+        """
+        Envía el correo de una notificación en un hilo aparte para no bloquear la respuesta.
+        Si el proceso termina antes, el correo sigue pendiente para ``enviar_correos_pendientes``.
+        """
+
+        def enviar():
+            try:
+                notificacion = (
+                    Notificacion.objects.select_related("usuario__ciudadano")
+                    .filter(id=notificacion_id, email_enviado=False)
+                    .first()
+                )
+                if notificacion is None:
+                    return
+                if self.enviar_correo(notificacion):
+                    Notificacion.objects.filter(id=notificacion_id).update(
+                        email_enviado=True
+                    )
+                else:
+                    self._registrar_fallos([notificacion_id])
+            except Exception as e:
+                print(f"Error enviando email para notificación {notificacion_id}: {e}")
+                self._registrar_fallos([notificacion_id])
+            finally:
+                connection.close()
+
+        threading.Thread(target=enviar, daemon=True).start()
+
     def notificar_cambio_estado_solicitud(
         self, solicitud: Solicitud, nuevo_estado: str, comentario: Optional[str] = None
     ) -> Notificacion:
@@ -248,6 +372,60 @@ class NotificationManager:
 
         return notificaciones
 
+    def notificar_documentos_recibidos(
+        self, solicitud: Solicitud, requisitos: list
+    ) -> list[Notificacion]:
+        """
+        Una sola notificación por destinatario (ciudadano y funcionarios con
+        asignación activa) para todos los documentos agregados a la vez.
+        Solo bandeja interna (sin email para evitar spam).
+        """
+        folio = f"SOL-{solicitud.id:06d}"
+        nombres = [requisito.nombre for requisito in requisitos]
+        metadata = {"folio": folio}
+
+        if len(nombres) == 1:
+            metadata["requisito"] = nombres[0]
+            titulo_ciudadano = "Documento Recibido"
+            mensaje_ciudadano = f"Se ha agregado el documento para el requisito '{nombres[0]}' a su solicitud."
+            titulo_funcionario = "Nuevo Documento en Solicitud"
+            mensaje_funcionario = f"Se ha agregado un nuevo documento a la solicitud {solicitud.ciudadano.nombre_completo}."
+        else:
+            metadata["requisitos"] = nombres
+            listado = ", ".join(f"'{nombre}'" for nombre in nombres)
+            titulo_ciudadano = "Documentos Recibidos"
+            mensaje_ciudadano = f"Se agregaron {len(nombres)} documentos a su solicitud: {listado}."
+            titulo_funcionario = "Nuevos Documentos en Solicitud"
+            mensaje_funcionario = (
+                f"Se agregaron {len(nombres)} documentos a la solicitud "
+                f"{solicitud.ciudadano.nombre_completo}: {listado}."
+            )
+
+        notificaciones = [
+            Notificacion(
+                usuario=solicitud.ciudadano.usuario,
+                tipo=TipoNotificacion.DOCUMENTO_RECIBIDO,
+                titulo=titulo_ciudadano,
+                mensaje=mensaje_ciudadano,
+                referencia_solicitud=solicitud,
+                metadata=metadata,
+                requiere_email=False,
+            )
+        ]
+        for asignacion in solicitud.asignaciones.filter(activo=True).select_related("funcionario"):
+            notificaciones.append(
+                Notificacion(
+                    usuario=asignacion.funcionario,
+                    tipo=TipoNotificacion.DOCUMENTO_RECIBIDO,
+                    titulo=titulo_funcionario,
+                    mensaje=mensaje_funcionario,
+                    referencia_solicitud=solicitud,
+                    metadata=metadata,
+                    requiere_email=False,
+                )
+            )
+        return Notificacion.objects.bulk_create(notificaciones)
+
     def marcar_como_leida(self, notificacion: Notificacion) -> None:
         """Marca una notificación como leída."""
         if not notificacion.leida:
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from core.imagenes import srcset_imagen
 from servicios.models import TramiteCatalogo, Requisito
 
 
@@ -62,6 +63,7 @@ class TramiteCatalogoSerializer(serializers.ModelSerializer):
         source="dependencia.nombre", read_only=True, allow_null=True
     )
     cantidad_requisitos = serializers.SerializerMethodField()
+    imagen_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = TramiteCatalogo
@@ -71,6 +73,7 @@ class TramiteCatalogoSerializer(serializers.ModelSerializer):
             "tipo",
             "descripcion",
             "imagen",
+            "imagen_srcset",
             "dependencia",
             "nombre_dependencia",
             "requisitos",
@@ -83,8 +86,10 @@ class TramiteCatalogoSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
+        request = self.context.get("request")
+        # Sin request (catálogo publicado con publicar_catalogo) la URL queda relativa
         representation["imagen"] = (
-            self.context["request"].build_absolute_uri(instance.imagen.url)
+            (request.build_absolute_uri(instance.imagen.url) if request else instance.imagen.url)
             if instance.imagen
             else None
         )
@@ -104,9 +109,13 @@ class TramiteCatalogoSerializer(serializers.ModelSerializer):
         return representation
 
     def get_cantidad_requisitos(self, obj):
-        return obj.requisitos.count()
+        # Anotado por el ViewSet; en create/update se cuenta de los requisitos
+        if hasattr(obj, "total_requisitos"):
+            return obj.total_requisitos
+        return len(obj.requisitos.all())
 
-        return representation
+    def get_imagen_srcset(self, obj):
+        return srcset_imagen(obj.imagen, self.context.get("request"))
 
 
 class TramiteCatalogoListSerializer(serializers.ModelSerializer):
@@ -118,6 +127,7 @@ class TramiteCatalogoListSerializer(serializers.ModelSerializer):
         source="dependencia.nombre", read_only=True
     )
     cantidad_requisitos = serializers.SerializerMethodField()
+    imagen_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = TramiteCatalogo
@@ -127,6 +137,7 @@ class TramiteCatalogoListSerializer(serializers.ModelSerializer):
             "tipo",
             "descripcion",
             "imagen",
+            "imagen_srcset",
             "nombre_dependencia",
             "cantidad_requisitos",
             "destacado",
@@ -142,4 +153,10 @@ class TramiteCatalogoListSerializer(serializers.ModelSerializer):
         return representation
 
     def get_cantidad_requisitos(self, obj):
+        # Anotado por el ViewSet con Count("requisitos")
+        if hasattr(obj, "total_requisitos"):
+            return obj.total_requisitos
         return obj.requisitos.count()
+
+    def get_imagen_srcset(self, obj):
+        return srcset_imagen(obj.imagen, self.context.get("request"))
@@ -1,12 +1,28 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from .views import TramiteCatalogoViewSet, RequisitoViewSet
+from .views import (
+    TramiteCatalogoViewSet,
+    RequisitoViewSet,
+    CatalogoPublicadoView,
+    ImagenVarianteView,
+)
 
 router = routers.DefaultRouter()
 router.register("catalogo", TramiteCatalogoViewSet)
 router.register("requisitos", RequisitoViewSet)
 
 urlpatterns = [
+    path("catalogo-publico/", CatalogoPublicadoView.as_view(), name="catalogo-publico"),
+    path(
+        "catalogo-publico/<str:version>/",
+        CatalogoPublicadoView.as_view(),
+        name="catalogo-publico-version",
+    ),
+    path(
+        "imagenes/<int:ancho>/<str:formato>/<path:ruta>",
+        ImagenVarianteView.as_view(),
+        name="imagen-variante",
+    ),
     path("", include(router.urls)),
 ]
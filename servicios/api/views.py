@@ -1,8 +1,21 @@
+import re
+
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from django.http import FileResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from servicios.models import TramiteCatalogo, Requisito
+from core.condicional import CatalogoCondicionalMixin, CatalogoEnCacheMixin, etag_coincide
+from core.autenticacion import dependencia_id_de
+from core.imagenes import ANCHOS, FORMATOS, es_imagen_publica, generar_variante
+from core.versiones import TRAMITES
 from core.permissions import (
     IsAdministradorOrFuncionario,
     ReadOnlyOrStaff,
@@ -15,9 +28,14 @@ from .serializers import (
     RequisitoCreateSerializer,
 )
 from ..filters import TramiteCatalogoFilter
+from ..services.publicacion import CODIFICACIONES, leer_manifiesto, ruta_version
+
+VERSION_PUBLICADA = re.compile(r"[0-9a-f]{16}")
 
 
-class TramiteCatalogoViewSet(viewsets.ModelViewSet):
+class TramiteCatalogoViewSet(
+    CatalogoCondicionalMixin, CatalogoEnCacheMixin, viewsets.ModelViewSet
+):
     queryset = TramiteCatalogo.objects.all()
     serializer_class = TramiteCatalogoSerializer
     permission_classes = [ReadOnlyPublicOrStaff]
@@ -30,6 +48,7 @@ class TramiteCatalogoViewSet(viewsets.ModelViewSet):
     search_fields = ["nombre", "descripcion"]
     ordering_fields = ["nombre", "id"]
     ordering = ["nombre"]
+    versiones_catalogo = (TRAMITES,)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -42,28 +61,34 @@ class TramiteCatalogoViewSet(viewsets.ModelViewSet):
         - Funcionarios: solo trámites de su dependencia
         - Administradores y otros: todos los trámites
         """
-        queryset = super().get_queryset()
+        queryset = self._queryset_por_accion(super().get_queryset())
         user = self.request.user
 
         # Si es funcionario, solo mostrar trámites de su dependencia
+        # (el perfil ya viene cargado por JWTAuthenticationFuncionario)
         if hasattr(user, "rol") and user.rol == "FUNCIONARIO":
-            # Asegurar que se carga la relación funcionario
-            if (
-                not hasattr(user, "_prefetched_objects_cache")
-                or "funcionario" not in user.__dict__
-            ):
-                user = self.request.user.__class__.objects.select_related(
-                    "funcionario"
-                ).get(pk=user.pk)
-
-            if hasattr(user, "funcionario") and user.funcionario:
-                queryset = queryset.filter(dependencia=user.funcionario.dependencia)
+            dependencia_id = dependencia_id_de(user)
+            if dependencia_id:
+                queryset = queryset.filter(dependencia_id=dependencia_id)
             else:
                 # Si no tiene perfil de funcionario asociado, no mostrar nada
                 queryset = queryset.none()
 
         return queryset
 
+    def _queryset_por_accion(self, queryset):
+        """
+        Carga en bloque lo que usan los serializers: la dependencia por JOIN,
+        el conteo de requisitos anotado y, en el detalle, los requisitos en
+        una sola consulta adicional.
+        """
+        queryset = queryset.select_related("dependencia").annotate(
+            total_requisitos=Count("requisitos")
+        )
+        if self.action != "list":
+            queryset = queryset.prefetch_related("requisitos")
+        return queryset
+
     def perform_create(self, serializer):
         """
         Validar que el funcionario solo cree trámites para su dependencia
@@ -204,3 +229,77 @@ class RequisitoViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         self._validar_propiedad_dependencia(instance.tramite, instance.programa)
         instance.delete()
+
+
+class CatalogoPublicadoView(APIView):
+    """
+    Catálogo público pre-renderizado por ``publicar_catalogo``. Entrega el
+    archivo precomprimido que acepte el cliente, sin serializar nada.
+
+    - ``catalogo-publico/``: versión vigente, se revalida con ETag.
+    - ``catalogo-publico/<version>/``: contenido inmutable, caché de un año.
+    """
+
+    permission_classes = []
+    authentication_classes = []
+
+    def get(self, request, version=None):
+        manifiesto = leer_manifiesto()
+        if manifiesto is None:
+            raise NotFound("El catálogo aún no se ha publicado.")
+
+        inmutable = version is not None
+        if not inmutable:
+            version = manifiesto["version"]
+        elif not VERSION_PUBLICADA.fullmatch(version) or not ruta_version(version).exists():
+            raise NotFound("Versión de catálogo no disponible.")
+
+        etag = f'"{version}"'
+        if etag_coincide(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self._archivo(request, version)
+
+        response["ETag"] = etag
+        response["X-Catalogo-Version"] = version
+        if inmutable:
+            patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=60)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+    def _archivo(self, request, version):
+        aceptadas = {
+            parte.split(";")[0].strip().lower()
+            for parte in request.headers.get("Accept-Encoding", "").split(",")
+        }
+        for codificacion, extension in CODIFICACIONES:
+            ruta = ruta_version(version, extension)
+            if codificacion in aceptadas and ruta.exists():
+                response = FileResponse(open(ruta, "rb"), content_type="application/json")
+                response["Content-Encoding"] = codificacion
+                return response
+        return FileResponse(open(ruta_version(version), "rb"), content_type="application/json")
+
+
+class ImagenVarianteView(APIView):
+    """
+    Variante redimensionada de una imagen del catálogo. Si aún no existe se
+    genera y queda en disco para las siguientes peticiones.
+    """
+
+    permission_classes = []
+    authentication_classes = []
+
+    def get(self, request, ancho, formato, ruta):
+        if ancho not in ANCHOS or formato not in FORMATOS or not es_imagen_publica(ruta):
+            raise NotFound("Variante de imagen no disponible.")
+        if not default_storage.exists(ruta):
+            raise NotFound("Imagen no encontrada.")
+
+        destino = generar_variante(ruta, ancho, formato)
+        response = FileResponse(default_storage.open(destino, "rb"), content_type=FORMATOS[formato][2])
+        # El nombre de la original nunca se reutiliza (el storage agrega sufijos)
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+        return response
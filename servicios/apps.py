@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ServiciosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'servicios'
+
+    def ready(self):
+        import core.checks  # noqa
+        import servicios.signals  # noqa
+        from core.versiones import crear_tabla_cache
+
+        post_migrate.connect(crear_tabla_cache, sender=self)
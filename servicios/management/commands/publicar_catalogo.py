@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from servicios.services.publicacion import directorio_publicacion, publicar_catalogo
+
+
+class Command(BaseCommand):
+    help = (
+        "Renderiza el catálogo público (trámites y programas activos con requisitos) "
+        "a archivos JSON versionados y precomprimidos (gzip/brotli)"
+    )
+
+    def handle(self, *args, **options):
+        manifiesto = publicar_catalogo()
+
+        self.stdout.write(f"Directorio: {directorio_publicacion()}")
+        for codificacion, tamano in manifiesto["variantes"].items():
+            self.stdout.write(f"  {codificacion}: {tamano / 1024:.1f} KB")
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Catálogo publicado (versión {manifiesto['version']}).")
+        )
@@ -0,0 +1,195 @@
+"""
+Catálogo público pre-renderizado.
+
+El catálogo completo (trámites y programas activos con sus requisitos) se
+serializa una vez a JSON y se guarda en ``settings.CATALOGO_PUBLICADO_DIR`` con
+nombre versionado por contenido y en variantes precomprimidas::
+
+    catalogo.<version>.json
+    catalogo.<version>.json.gz
+    catalogo.<version>.json.br   (si está instalado ``brotli``)
+    actual.json                  (manifiesto con la versión vigente)
+
+La vista ``CatalogoPublicadoView`` (o el servidor estático, apuntando al mismo
+directorio) entrega esos archivos sin pasar por la serialización de DRF.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFIESTO = "actual.json"
+
+# Versiones anteriores que se conservan para clientes con la URL vieja en caché
+VERSIONES_CONSERVADAS = 3
+
+# Segundos de espera tras un cambio antes de publicar (agrupa ráfagas de cambios)
+ESPERA_PUBLICACION = 2.0
+
+# Codificaciones disponibles en orden de preferencia: (Content-Encoding, extensión)
+CODIFICACIONES = [("br", ".br"), ("gzip", ".gz")]
+
+
+def directorio_publicacion() -> Path:
+    return Path(settings.CATALOGO_PUBLICADO_DIR)
+
+
+def ruta_version(version: str, extension: str = "") -> Path:
+    return directorio_publicacion() / f"catalogo.{version}.json{extension}"
+
+
+def renderizar_catalogo() -> bytes:
+    """JSON del catálogo público: mismos serializers de detalle que la API."""
+    from apoyos.api.serializers import ProgramaSocialSerializer
+    from apoyos.models import ProgramaSocial
+    from servicios.api.serializers import TramiteCatalogoSerializer
+    from servicios.models import TramiteCatalogo
+
+    tramites = (
+        TramiteCatalogo.objects.filter(esta_activo=True)
+        .select_related("dependencia")
+        .prefetch_related("requisitos")
+        .annotate(total_requisitos=Count("requisitos"))
+        .order_by("nombre")
+    )
+    programas = (
+        ProgramaSocial.objects.filter(esta_activo=True)
+        .select_related("dependencia")
+        .prefetch_related("requisitos_especificos")
+        .order_by("nombre")
+    )
+    datos = {
+        "tramites": TramiteCatalogoSerializer(tramites, many=True).data,
+        "programas": ProgramaSocialSerializer(programas, many=True).data,
+    }
+    return JSONRenderer().render(datos)
+
+
+def _escribir(ruta: Path, contenido: bytes) -> None:
+    # Temporal con nombre único: varios workers pueden publicar a la vez
+    with tempfile.NamedTemporaryFile(
+        dir=ruta.parent, prefix=f".{ruta.name}.", suffix=".tmp", delete=False
+    ) as temporal:
+        temporal.write(contenido)
+    try:
+        # mkstemp crea 0600; el servidor estático debe poder leerlos
+        os.chmod(temporal.name, 0o644)
+        os.replace(temporal.name, ruta)
+    except OSError:
+        os.unlink(temporal.name)
+        raise
+
+
+def publicar_catalogo() -> dict:
+    """
+    Renderiza y escribe el catálogo. Si el contenido no cambió, solo se
+    reescribe el manifiesto.
+
+    Returns:
+        Manifiesto publicado (version, publicado, bytes, variantes)
+    """
+    directorio = directorio_publicacion()
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    contenido = renderizar_catalogo()
+    version = hashlib.sha256(contenido).hexdigest()[:16]
+
+    variantes = {"identity": len(contenido)}
+    if not ruta_version(version).exists():
+        _escribir(ruta_version(version, ".gz"), gzip.compress(contenido, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _escribir(ruta_version(version, ".br"), brotli.compress(contenido, quality=11))
+        # El archivo sin comprimir va al final: su existencia marca la versión como completa
+        _escribir(ruta_version(version), contenido)
+    for codificacion, extension in CODIFICACIONES:
+        ruta = ruta_version(version, extension)
+        if ruta.exists():
+            variantes[codificacion] = ruta.stat().st_size
+
+    manifiesto = {
+        "version": version,
+        "publicado": timezone.now().isoformat(),
+        "variantes": variantes,
+    }
+    _escribir(directorio / MANIFIESTO, json.dumps(manifiesto).encode("utf-8"))
+    _limpiar_versiones(version)
+    return manifiesto
+
+
+def _limpiar_versiones(vigente: str) -> None:
+    publicadas = sorted(
+        directorio_publicacion().glob("catalogo.*.json"),
+        key=lambda ruta: ruta.stat().st_mtime,
+        reverse=True,
+    )
+    for ruta in publicadas[VERSIONES_CONSERVADAS:]:
+        version = ruta.name.split(".")[1]
+        if version == vigente:
+            continue
+        for _, extension in [("identity", ""), *CODIFICACIONES]:
+            ruta_version(version, extension).unlink(missing_ok=True)
+
+
+_manifiesto_cache = {"firma": None, "datos": None}
+
+
+def leer_manifiesto() -> dict | None:
+    """Manifiesto vigente; se vuelve a leer solo si el archivo cambió."""
+    ruta = directorio_publicacion() / MANIFIESTO
+    try:
+        estado = ruta.stat()
+    except FileNotFoundError:
+        return None
+    firma = (estado.st_ino, estado.st_mtime_ns)
+    if _manifiesto_cache["firma"] != firma:
+        _manifiesto_cache["datos"] = json.loads(ruta.read_bytes())
+        _manifiesto_cache["firma"] = firma
+    return _manifiesto_cache["datos"]
+
+
+_temporizador = None
+_candado = threading.Lock()
+
+
+def programar_publicacion() -> None:
+    """
+    Publica el catálogo en segundo plano unos segundos después del último
+    cambio. Se llama al confirmar transacciones que modifican el catálogo.
+    """
+    global _temporizador
+
+    if not getattr(settings, "CATALOGO_PUBLICACION_AUTOMATICA", False):
+        return
+
+    def publicar():
+        try:
+            publicar_catalogo()
+        except Exception:
+            logger.exception("Error publicando el catálogo")
+        finally:
+            connection.close()
+
+    with _candado:
+        if _temporizador is not None:
+            _temporizador.cancel()
+        _temporizador = threading.Timer(ESPERA_PUBLICACION, publicar)
+        _temporizador.daemon = True
+        _temporizador.start()
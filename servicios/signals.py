@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.imagenes import generar_variantes_en_segundo_plano
+from core.versiones import PROGRAMAS, TRAMITES, incrementar_al_confirmar
+from servicios.models import Requisito, TramiteCatalogo
+from servicios.services.publicacion import programar_publicacion
+
+
+@receiver([post_save, post_delete], sender=TramiteCatalogo)
+def versionar_tramites(sender, **kwargs):
+    """Invalida ETag y cachés del catálogo de trámites (el borrado lógico también guarda)."""
+    incrementar_al_confirmar(TRAMITES)
+    transaction.on_commit(programar_publicacion)
+
+
+@receiver([post_save, post_delete], sender=Requisito)
+def versionar_requisitos(sender, **kwargs):
+    # Un requisito puede moverse entre trámite y programa: se invalidan ambos catálogos
+    incrementar_al_confirmar(TRAMITES, PROGRAMAS)
+    transaction.on_commit(programar_publicacion)
+
+
+@receiver(post_save, sender=TramiteCatalogo)
+def generar_variantes_tramite(sender, instance, **kwargs):
+    """Pre-genera las variantes responsivas de la imagen al guardar el trámite."""
+    if kwargs.get("raw") or not instance.imagen:
+        return
+    nombre = instance.imagen.name
+    transaction.on_commit(lambda: generar_variantes_en_segundo_plano(nombre))
@@ -4,8 +4,13 @@ from tramites.models import (
     DocumentoSolicitud,
     SolicitudAsignacion,
     SolicitudReasignacion,
+    SubidaDocumento,
+    ruta_vista_previa,
 )
+from tramites.services.documentos import adjuntar_documentos, archivos_por_requisito
+from tramites.services.subidas import bytes_recibidos
 from core.choices import EstatusSolicitud, Roles
+from core.firmas import url_firmada
 from ciudadanos.api.serializers import CiudadanoSerializer
 
 
@@ -71,6 +76,22 @@ class TramiteSimpleSerializer(serializers.Serializer):
         return obj.imagen.url if obj.imagen else None
 
 
+def validar_requisito_de_solicitud(solicitud, requisito):
+    """
+    Validar que el requisito corresponda al trámite o programa de la solicitud
+    """
+    if solicitud.programa_social:
+        if requisito.programa != solicitud.programa_social:
+            raise serializers.ValidationError(
+                "El requisito no pertenece al programa social de esta solicitud"
+            )
+    else:
+        if requisito.tramite != solicitud.tramite_tipo:
+            raise serializers.ValidationError(
+                "El requisito no pertenece al trámite de esta solicitud"
+            )
+
+
 class DocumentoSolicitudSerializer(serializers.ModelSerializer):
     """
     Serializer para documentos de solicitudes
@@ -79,6 +100,7 @@ class DocumentoSolicitudSerializer(serializers.ModelSerializer):
     requisito = RequisitoSimpleSerializer(read_only=True)
     nombre_requisito = serializers.CharField(source="requisito.nombre", read_only=True)
     url_archivo = serializers.SerializerMethodField()
+    url_vista_previa = serializers.SerializerMethodField()
 
     class Meta:
         model = DocumentoSolicitud
@@ -89,16 +111,33 @@ class DocumentoSolicitudSerializer(serializers.ModelSerializer):
             "nombre_requisito",
             "archivo",
             "url_archivo",
+            "url_vista_previa",
+            "sha256",
             "fecha_subida",
         ]
-        read_only_fields = ["id", "fecha_subida"]
+        read_only_fields = ["id", "sha256", "fecha_subida"]
+        # La ruta del storage no se publica: el archivo solo se entrega por url_archivo
+        extra_kwargs = {"archivo": {"write_only": True}}
 
     def get_url_archivo(self, obj):
+        """URL firmada y con vencimiento, emitida para el usuario que consulta."""
         request = self.context.get("request")
-        if obj.archivo and request:
-            return request.build_absolute_uri(obj.archivo.url)
+        if obj.archivo and request and request.user.is_authenticated:
+            return url_firmada(
+                request, obj.archivo.name, obj.nombre_descarga(), request.user.pk
+            )
         return None
 
+    def get_url_vista_previa(self, obj):
+        """Miniatura de documentos de imagen (se genera en segundo plano tras subirlos)."""
+        request = self.context.get("request")
+        if not (obj.sha256 and request and request.user.is_authenticated):
+            return None
+        ruta = ruta_vista_previa(obj.sha256)
+        if not obj.archivo.storage.exists(ruta):
+            return None
+        return url_firmada(request, ruta, f"vista_previa_{obj.pk}.jpg", request.user.pk)
+
 
 class DocumentoSolicitudCreateSerializer(serializers.ModelSerializer):
     """
@@ -113,21 +152,36 @@ class DocumentoSolicitudCreateSerializer(serializers.ModelSerializer):
         """
         Validar que el requisito corresponda al trámite o programa de la solicitud
         """
-        solicitud = data.get("solicitud")
-        requisito = data.get("requisito")
-
-        # Verificar que el requisito pertenezca al trámite o programa de la solicitud
-        if solicitud.programa_social:
-            if requisito.programa != solicitud.programa_social:
-                raise serializers.ValidationError(
-                    "El requisito no pertenece al programa social de esta solicitud"
-                )
-        else:
-            if requisito.tramite != solicitud.tramite_tipo:
-                raise serializers.ValidationError(
-                    "El requisito no pertenece al trámite de esta solicitud"
-                )
+        validar_requisito_de_solicitud(data.get("solicitud"), data.get("requisito"))
+        return data
+
+
+class SubidaDocumentoSerializer(serializers.ModelSerializer):
+    """
+    Sesión de subida reanudable (ver tramites.services.subidas)
+    """
 
+    recibidos = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SubidaDocumento
+        fields = [
+            "id",
+            "solicitud",
+            "requisito",
+            "nombre",
+            "tamano",
+            "recibidos",
+            "expira",
+            "created_at",
+        ]
+        read_only_fields = ["id", "expira", "created_at"]
+
+    def get_recibidos(self, obj):
+        return bytes_recibidos(obj)
+
+    def validate(self, data):
+        validar_requisito_de_solicitud(data.get("solicitud"), data.get("requisito"))
         return data
 
 
@@ -313,37 +367,23 @@ class SolicitudCreateSerializer(serializers.ModelSerializer):
 
     def _crear_documentos(self, solicitud, request):
         """
-        Procesa los archivos documentos_* y crea registros de DocumentoSolicitud
+        Procesa los archivos documentos_* y crea los DocumentoSolicitud en bloque
         """
-        # Obtener requisitos que requieren documento
-        if solicitud.programa_social:
-            requisitos = solicitud.programa_social.requisitos_especificos.filter(
-                requiere_documento=True
-            )
-        else:
-            requisitos = solicitud.tramite_tipo.requisitos.filter(
-                requiere_documento=True
-            )
+        import logging
 
-        # Procesar cada archivo documentos_*
-        for requisito in requisitos:
-            file_key = f"documentos_{requisito.id}"
-            archivo = request.FILES.get(file_key)
-
-            if archivo:
-                try:
-                    DocumentoSolicitud.objects.create(
-                        solicitud=solicitud, requisito=requisito, archivo=archivo
-                    )
-                except Exception as e:
-                    # Log pero no fallar la creación de solicitud
-                    # El documento simplemente no se crea
-                    import logging
-
-                    logger = logging.getLogger(__name__)
-                    logger.error(
-                        f"Error al crear documento para requisito {requisito.id}: {str(e)}"
-                    )
+        logger = logging.getLogger(__name__)
+
+        pares, errores = archivos_por_requisito(solicitud, request.FILES)
+        # Log pero no fallar la creación de solicitud: esos documentos simplemente no se crean
+        for campo, mensajes in errores.items():
+            logger.error(f"Documento {campo} rechazado: {' '.join(mensajes)}")
+
+        try:
+            adjuntar_documentos(solicitud, pares)
+        except Exception as e:
+            logger.error(
+                f"Error al crear documentos de la solicitud {solicitud.id}: {str(e)}"
+            )
 
 
 class SolicitudListSerializer(serializers.ModelSerializer):
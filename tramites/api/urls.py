@@ -8,17 +8,25 @@ from .views import (
     SolicitudAsignacionViewSet,
     DashboardView,
     AdminDashboardViewSet,
+    ArchivoFirmadoView,
+    SubidaDocumentoViewSet,
 )
 
 router = routers.DefaultRouter()
 router.register("solicitudes", SolicitudViewSet)
 router.register("documentos", DocumentoSolicitudViewSet)
 router.register("asignaciones", SolicitudAsignacionViewSet)
+router.register("subidas", SubidaDocumentoViewSet)
 # No need to register ViewSet with actions in router if we map manually or use proper ViewSet structure for router
 # But for custom non-model viewset, actions can be mapped manually is often easier or register as basename
 router.register("dashboard/admin", AdminDashboardViewSet, basename="admin-dashboard")
 
 urlpatterns = [
     path("dashboard/", DashboardView.as_view(), name="dashboard-resumen"),
+    path(
+        "archivos/<path:ruta>",
+        ArchivoFirmadoView.as_view(),
+        name="documento-archivo-firmado",
+    ),
     path("", include(router.urls)),
 ]
@@ -1,17 +1,35 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, filters, status
+from rest_framework import mixins, viewsets, filters, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import FileResponse
-import os
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 
 from tramites.models import (
     Solicitud,
     DocumentoSolicitud,
+    almacenamiento_documentos,
     SolicitudAsignacion,
     SolicitudReasignacion,
+    SubidaDocumento,
+)
+from tramites.services.documentos import adjuntar_documentos, archivos_por_requisito
+from tramites.services.subidas import (
+    DesfaseSubida,
+    agregar_parte,
+    cancelar_subida,
+    crear_subida,
+    finalizar_subida,
 )
 from dependencias.models import Dependencia
 from core.permissions import (
@@ -21,6 +39,10 @@ from core.permissions import (
     IsFuncionarioDeDependencia,
 )
 from core.choices import Roles, EstatusSolicitud
+from core.comprimidos import zip_en_streaming
+from core.descargas import respuesta_archivo
+from core.firmas import url_firmada, verificar_firma
+from core.subidas import SubidaDocumentosMixin
 from rest_framework.views import APIView
 from django.db.models import Count
 
@@ -34,10 +56,11 @@ from .serializers import (
     SolicitudReasignacionSerializer,
     CambiarEstatusSolicitudSerializer,
     ReasignarSolicitudSerializer,
+    SubidaDocumentoSerializer,
 )
 
 
-class SolicitudViewSet(viewsets.ModelViewSet):
+class SolicitudViewSet(SubidaDocumentosMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar solicitudes de ciudadanos.
     - Ciudadanos: Solo pueden ver y crear sus propias solicitudes
@@ -183,6 +206,95 @@ class SolicitudViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK,
         )
 
+    @action(detail=True, methods=["post"], url_path="documentos")
+    def subir_documentos(self, request, pk=None):
+        """
+        Agrega varios documentos a la solicitud en una sola petición
+        POST /api/tramites/solicitudes/{id}/documentos/
+        Body (multipart): documentos_<requisito_id>=<archivo>, ...
+        Se validan todos antes de guardar: si alguno es inválido no se guarda ninguno.
+        """
+        solicitud = self.get_object()
+
+        if request.user.rol == Roles.CIUDADANO and solicitud.ciudadano.usuario != request.user:
+            from rest_framework.exceptions import PermissionDenied
+
+            raise PermissionDenied(
+                "No puede subir documentos a solicitudes de otros ciudadanos"
+            )
+
+        pares, errores = archivos_por_requisito(solicitud, request.FILES)
+        if errores:
+            return Response(errores, status=status.HTTP_400_BAD_REQUEST)
+        if not pares:
+            return Response(
+                {"error": "No se enviaron documentos (campos documentos_<requisito_id>)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        documentos = adjuntar_documentos(solicitud, pares)
+        return Response(
+            DocumentoSolicitudSerializer(
+                documentos, many=True, context={"request": request}
+            ).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=True, methods=["get"], url_path=r"expediente\.zip")
+    def expediente_zip(self, request, pk=None):
+        """
+        Descarga todos los documentos de la solicitud en un ZIP generado al vuelo
+        GET /api/tramites/solicitudes/{id}/expediente.zip/
+        """
+        solicitud = self.get_object()
+        documentos, faltantes = [], []
+        for documento in solicitud.documentos.select_related("requisito").order_by("requisito__nombre"):
+            if not documento.archivo:
+                continue
+            # Se revisa antes de responder: a mitad del streaming ya no se puede avisar
+            if documento.archivo.storage.exists(documento.archivo.name):
+                documentos.append(documento)
+            else:
+                faltantes.append(documento.requisito.nombre)
+        if not documentos:
+            return Response(
+                {"error": "La solicitud no tiene documentos"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        def entradas():
+            usados = set()
+            for documento in documentos:
+                # Requisitos con el mismo nombre no deben pisarse dentro del ZIP
+                nombre = documento.nombre_descarga()
+                if nombre in usados:
+                    base, extension = os.path.splitext(nombre)
+                    nombre = f"{base}_{documento.pk}{extension}"
+                usados.add(nombre)
+                yield (
+                    nombre,
+                    lambda archivo=documento.archivo: archivo.storage.open(archivo.name, "rb"),
+                    timezone.localtime(documento.fecha_subida or timezone.now()),
+                )
+            if faltantes:
+                texto = "Documentos no encontrados en el almacenamiento:\n" + "".join(
+                    f"- {nombre}\n" for nombre in faltantes
+                )
+                yield (
+                    "FALTANTES.txt",
+                    lambda: io.BytesIO(texto.encode("utf-8")),
+                    timezone.localtime(),
+                )
+
+        response = StreamingHttpResponse(
+            zip_en_streaming(entradas()), content_type="application/zip"
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, f"expediente_SOL-{solicitud.id:06d}.zip"
+        )
+        response["Cache-Control"] = "private, no-store"
+        return response
+
     @action(detail=True, methods=["get"])
     def verificar_documentacion(self, request, pk=None):
         """
@@ -198,7 +310,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
             requisitos = solicitud.tramite_tipo.requisitos.all()
 
         # Obtener documentos subidos como diccionario para búsqueda rápida
-        documentos_subidos = solicitud.documentos.all()
+        documentos_subidos = solicitud.documentos.select_related("requisito")
         documentos_por_requisito = {doc.requisito_id: doc for doc in documentos_subidos}
 
         # Construir respuesta detallada
@@ -209,8 +321,14 @@ class SolicitudViewSet(viewsets.ModelViewSet):
                 doc = documentos_por_requisito[req.id]
                 documento_info = {
                     "id": doc.id,
-                    "nombre_archivo": os.path.basename(doc.archivo.name),
-                    "url": doc.archivo.url if doc.archivo else None,
+                    "nombre_archivo": doc.nombre_descarga(),
+                    "url": (
+                        url_firmada(
+                            request, doc.archivo.name, doc.nombre_descarga(), request.user.pk
+                        )
+                        if doc.archivo
+                        else None
+                    ),
                     "fecha_subida": (
                         doc.fecha_subida.isoformat() if doc.fecha_subida else None
                     ),
@@ -419,7 +537,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class DocumentoSolicitudViewSet(viewsets.ModelViewSet):
+class DocumentoSolicitudViewSet(SubidaDocumentosMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar documentos de solicitudes.
     """
@@ -487,23 +605,163 @@ class DocumentoSolicitudViewSet(viewsets.ModelViewSet):
                     "No puede descargar documentos de solicitudes de otros ciudadanos"
                 )
 
-        file_path = documento.archivo.path
-
-        # Verificar que el archivo existe en el sistema de archivos
-        if not os.path.exists(file_path):
+        # Verificar que el archivo existe en el almacenamiento
+        if not documento.archivo.storage.exists(documento.archivo.name):
             return Response(
                 {"error": "Archivo no encontrado"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Abrir el archivo y retornarlo
-        file = open(file_path, "rb")
-        response = FileResponse(file, as_attachment=True)
-        response["Content-Disposition"] = (
-            f'attachment; filename="{documento.archivo.name}"'
+        # Nginx/Apache entregan el archivo si están configurados; si no, se
+        # envía desde aquí con soporte de Range para reanudar descargas
+        return respuesta_archivo(
+            request,
+            documento.archivo.storage,
+            documento.archivo.name,
+            documento.nombre_descarga(),
+            etag=documento.sha256 or None,
         )
+
+
+class SubidaDocumentoViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Subidas reanudables de documentos por partes (protocolo en
+    tramites.services.subidas).
+    """
+
+    queryset = SubidaDocumento.objects.all()
+    serializer_class = SubidaDocumentoSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Cada usuario solo ve sus propias subidas
+        return super().get_queryset().filter(usuario=self.request.user)
+
+    def perform_create(self, serializer):
+        solicitud = serializer.validated_data["solicitud"]
+
+        if self.request.user.rol == Roles.CIUDADANO:
+            if solicitud.ciudadano.usuario != self.request.user:
+                from rest_framework.exceptions import PermissionDenied
+
+                raise PermissionDenied(
+                    "No puede subir documentos a solicitudes de otros ciudadanos"
+                )
+
+        try:
+            serializer.instance = crear_subida(
+                self.request.user,
+                solicitud,
+                serializer.validated_data["requisito"],
+                serializer.validated_data["nombre"],
+                serializer.validated_data["tamano"],
+            )
+        except ValueError as e:
+            raise ValidationError({"tamano": [str(e)]})
+
+    def partial_update(self, request, *args, **kwargs):
+        """
+        Agrega una parte del archivo
+        PATCH /api/tramites/subidas/{id}/
+        Headers: Upload-Offset: <bytes ya recibidos>; cuerpo: bytes en bruto
+        """
+        subida = self.get_object()
+        try:
+            desplazamiento = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Falta la cabecera Upload-Offset"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            # Se lee el cuerpo en streaming, sin pasar por los parsers de DRF
+            recibidos = agregar_parte(subida, desplazamiento, request._request)
+        except DesfaseSubida as e:
+            response = Response(
+                {"error": str(e), "recibidos": e.recibidos},
+                status=status.HTTP_409_CONFLICT,
+            )
+            response["Upload-Offset"] = str(e.recibidos)
+            return response
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = Response({"recibidos": recibidos, "tamano": subida.tamano})
+        response["Upload-Offset"] = str(recibidos)
         return response
 
+    @action(detail=True, methods=["post"])
+    def finalizar(self, request, pk=None):
+        """
+        Adjunta el archivo completo a la solicitud
+        POST /api/tramites/subidas/{id}/finalizar/
+        """
+        subida = self.get_object()
+        try:
+            documento = finalizar_subida(subida)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except DjangoValidationError as e:
+            return Response({"error": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            DocumentoSolicitudSerializer(documento, context={"request": request}).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    def perform_destroy(self, instance):
+        cancelar_subida(instance)
+
+
+class ArchivoFirmadoView(APIView):
+    """
+    Entrega un documento a partir de una URL firmada (``core.firmas``), sin
+    consultar la base de datos: la autorización se hizo al emitir la URL.
+
+    Si la petición trae un JWT, debe ser del mismo usuario al que se emitió.
+    Sin JWT (``<img src>``, descarga directa del navegador) la URL funciona
+    para quien la tenga hasta que vence (``URLS_FIRMADAS_VIGENCIA``), salvo que
+    ``URLS_FIRMADAS_REQUIEREN_TOKEN`` esté activo.
+    """
+
+    permission_classes = []
+    authentication_classes = []
+
+    def get(self, request, ruta):
+        if not verificar_firma(ruta, request.query_params):
+            return Response(
+                {"error": "El enlace no es válido o ya expiró"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        # Validación del token sin cargar el usuario
+        autenticacion = JWTStatelessUserAuthentication().authenticate(request)
+        if autenticacion is None and settings.URLS_FIRMADAS_REQUIEREN_TOKEN:
+            return Response(
+                {"error": "Se requiere autenticación para descargar el archivo"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        if autenticacion and str(autenticacion[0].id) != request.query_params["u"]:
+            return Response(
+                {"error": "El enlace fue emitido para otro usuario"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        if not almacenamiento_documentos.exists(ruta):
+            return Response(
+                {"error": "Archivo no encontrado"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return respuesta_archivo(
+            request, almacenamiento_documentos, ruta, request.query_params["n"]
+        )
+
 
 class SolicitudAsignacionViewSet(viewsets.ModelViewSet):
     """
@@ -639,7 +897,6 @@ class DashboardView(APIView):
         return Response(data)
 
 
-from django.utils import timezone
 from datetime import timedelta
 from django.db.models.functions import TruncDate
 from django.db.models import Avg, F, ExpressionWrapper, DurationField
@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tramites.models import DocumentoSolicitud, Solicitud, almacenamiento_documentos
+from tramites.services.archivo import (
+    DIAS_ARCHIVO,
+    aplicar_archivado,
+    archivar_contenido,
+    restaurar_contenido,
+    rutas_archivables,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve al volumen de archivo (DOCUMENTOS_ARCHIVO_ROOT) los documentos de '
+        'solicitudes aprobadas o rechazadas sin cambios en el último año, '
+        'comprimidos cuando conviene'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=DIAS_ARCHIVO,
+            help='Antigüedad mínima de la solicitud cerrada',
+        )
+        parser.add_argument('--lote', type=int, default=200, help='Archivos por lote')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta los archivos y bytes que se archivarían',
+        )
+        parser.add_argument(
+            '--restaurar',
+            type=int,
+            metavar='SOLICITUD_ID',
+            help='Regresa al volumen principal los documentos archivados de una solicitud',
+        )
+
+    def handle(self, *args, **options):
+        if options['restaurar'] is not None:
+            return self._restaurar(options['restaurar'])
+
+        storage = almacenamiento_documentos
+        simulacion = options['dry_run']
+        pendientes = rutas_archivables(options['dias'])
+
+        archivados = faltantes = descartados = originales = en_archivo = 0
+        ultima = ''
+        while lote := list(pendientes.filter(archivo__gt=ultima)[: options['lote']]):
+            ultima = lote[-1]
+            cambios = []
+            for ruta in lote:
+                if not storage.exists(ruta):
+                    faltantes += 1
+                    continue
+                if simulacion:
+                    originales += storage.size(ruta)
+                    archivados += 1
+                    continue
+                nueva, tamano, tamano_archivo = archivar_contenido(ruta)
+                cambios.append((ruta, nueva, tamano))
+                originales += tamano
+                en_archivo += tamano_archivo
+
+            if cambios:
+                aplicados = aplicar_archivado(cambios, options['dias'])
+                archivados += aplicados
+                descartados += len(cambios) - aplicados
+                self.stdout.write(f'  {archivados} archivos archivados...')
+
+        mb = 1024 * 1024
+        if simulacion:
+            self.stdout.write(self.style.WARNING('Simulación (--dry-run): no se movió nada'))
+            self.stdout.write(f'Archivos archivables: {archivados} ({originales / mb:.1f} MB)')
+        else:
+            self.stdout.write(
+                f'Archivos archivados: {archivados} ({originales / mb:.1f} MB liberados '
+                f'del volumen principal, {en_archivo / mb:.1f} MB en el archivo)'
+            )
+        if faltantes:
+            self.stdout.write(self.style.WARNING(f'Archivos no encontrados: {faltantes}'))
+        if descartados:
+            self.stdout.write(f'Reutilizados por solicitudes en curso (no archivados): {descartados}')
+        if not simulacion:
+            self.stdout.write(self.style.SUCCESS('✅ Documentos archivados.'))
+
+    def _restaurar(self, solicitud_id):
+        if not Solicitud.objects.filter(pk=solicitud_id).exists():
+            raise CommandError(f'No existe la solicitud {solicitud_id}')
+
+        rutas = set(
+            DocumentoSolicitud.objects.filter(
+                solicitud_id=solicitud_id,
+                archivo__startswith=f'{almacenamiento_documentos.PREFIJO_ARCHIVADO}/',
+            ).values_list('archivo', flat=True)
+        )
+        for ruta in sorted(rutas):
+            restaurar_contenido(ruta)
+        self.stdout.write(self.style.SUCCESS(f'✅ Archivos restaurados: {len(rutas)}'))
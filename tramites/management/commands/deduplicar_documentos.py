@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.utils import calcular_sha256
+from tramites.models import ArchivoDocumento, DocumentoSolicitud, almacenamiento_documentos
+
+
+class Command(BaseCommand):
+    help = (
+        'Pasa los documentos subidos antes del almacenamiento por contenido a '
+        'documentos/<sha256> y borra las copias duplicadas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Documentos por lote')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo calcula cuánto espacio se liberaría, sin mover ni borrar nada',
+        )
+
+    def handle(self, *args, **options):
+        storage = almacenamiento_documentos
+        simulacion = options['dry_run']
+        pendientes = (
+            DocumentoSolicitud.objects.exclude(archivo='')
+            .exclude(archivo__startswith=f'{storage.prefijo}/')
+            .exclude(archivo__startswith=f'{storage.PREFIJO_ARCHIVADO}/')
+            .order_by('pk')
+        )
+
+        procesados = faltantes = duplicados = liberados = 0
+        ultimo_pk = 0
+        # Contenidos vistos en la simulación (no se escriben en disco)
+        vistos = set()
+        while lote := list(
+            pendientes.filter(pk__gt=ultimo_pk).values_list('pk', 'archivo')[: options['lote']]
+        ):
+            ultimo_pk = lote[-1][0]
+
+            if simulacion:
+                for pk, ruta in lote:
+                    if not storage.exists(ruta):
+                        faltantes += 1
+                        continue
+                    with storage.open(ruta, 'rb') as archivo:
+                        destino = storage.ruta_contenido(calcular_sha256(archivo), ruta)
+                    if destino in vistos or storage.exists(destino):
+                        duplicados += 1
+                        liberados += storage.size(ruta)
+                    vistos.add(destino)
+                    procesados += 1
+                continue
+
+            # Cada contenido se escribe (o reutiliza) con su fila bloqueada, y el
+            # documento solo cambia si sigue apuntando al archivo leído
+            with ArchivoDocumento.guardando() as guardar:
+                for pk, ruta in lote:
+                    if not storage.exists(ruta):
+                        faltantes += 1
+                        continue
+                    tamano = storage.size(ruta)
+                    with storage.open(ruta, 'rb') as archivo:
+                        sha256 = calcular_sha256(archivo)
+                        archivo.sha256 = sha256
+                        existia = storage.exists(storage.ruta_contenido(sha256, ruta))
+                        destino = guardar(ruta, archivo)
+
+                    actualizado = DocumentoSolicitud.objects.filter(pk=pk, archivo=ruta).update(
+                        archivo=destino, sha256=sha256
+                    )
+                    if not actualizado:
+                        # El usuario reemplazó el documento durante la corrida
+                        continue
+                    ArchivoDocumento.referenciar(destino, tamano)
+                    transaction.on_commit(lambda ruta=ruta: storage.delete(ruta))
+                    procesados += 1
+                    if existia:
+                        duplicados += 1
+                        liberados += tamano
+
+        if simulacion:
+            self.stdout.write(self.style.WARNING('Simulación (--dry-run): no se movió nada'))
+        self.stdout.write(f'Documentos procesados: {procesados}')
+        self.stdout.write(f'Duplicados: {duplicados} ({liberados / 1024 / 1024:.1f} MB liberados)')
+        if faltantes:
+            self.stdout.write(self.style.WARNING(f'Archivos no encontrados: {faltantes}'))
+        if not simulacion:
+            self.stdout.write(self.style.SUCCESS('✅ Documentos deduplicados.'))
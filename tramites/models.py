@@ -1,12 +1,21 @@
+import posixpath
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import models, transaction
+from django.db.models import F
+from django.utils.text import get_valid_filename
 from django_softdelete.models import SoftDeleteModel
 from simple_history.models import HistoricalRecords
 
 from apoyos.models import ProgramaSocial
 from ciudadanos.models import Ciudadano
+from core.almacenamiento import AlmacenamientoPorContenido
 from core.choices import EstatusSolicitud
-from core.utils import validar_archivo_documento
+from core.utils import calcular_sha256, validar_archivo_documento
 from servicios.models import TramiteCatalogo, Requisito
 
 
@@ -76,6 +85,153 @@ class Solicitud(SoftDeleteModel):
         return None
 
 
+# Los documentos se guardan una sola vez por contenido (los ciudadanos suben la
+# misma INE o CURP en cada solicitud)
+almacenamiento_documentos = AlmacenamientoPorContenido(prefijo="documentos")
+
+
+def obtener_almacenamiento_documentos():
+    return almacenamiento_documentos
+
+
+def ruta_vista_previa(sha256: str) -> str:
+    """Miniatura JPEG de un documento de imagen (tramites.services.optimizacion)."""
+    return f"vistas_previas/{sha256[:2]}/{sha256[2:4]}/{sha256}.jpg"
+
+
+class ArchivoDocumento(models.Model):
+    """
+    Contenido único de documentos de solicitudes y cuántos documentos lo usan.
+    Cuando el conteo llega a cero se borra el archivo.
+    """
+
+    ruta = models.CharField(max_length=255, primary_key=True)
+    tamano = models.PositiveBigIntegerField(default=0)
+    referencias = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    @contextmanager
+    def guardando(cls):
+        """
+        Transacción para escribir contenidos en el almacenamiento. Dentro,
+        ``guardar(nombre, contenido)`` bloquea la fila del contenido *antes* de
+        reutilizar o escribir el archivo, así un ``liberar`` concurrente no
+        puede borrarlo hasta que esta transacción termine. Si la transacción
+        falla se borran los archivos que se escribieron en ella; las filas
+        que al final nadie referenció se limpian al confirmar.
+
+        Ejemplo::
+
+            with ArchivoDocumento.guardando() as guardar:
+                ruta = guardar("documento.pdf", contenido)
+                ArchivoDocumento.referenciar(ruta, contenido.size)
+        """
+        reservadas, escritas = [], []
+
+        def guardar(nombre: str, contenido) -> str:
+            ruta = almacenamiento_documentos.ruta_contenido(calcular_sha256(contenido), nombre)
+            cls.objects.select_for_update().get_or_create(
+                ruta=ruta, defaults={"tamano": contenido.size, "referencias": 0}
+            )
+            reservadas.append(ruta)
+            if not almacenamiento_documentos.exists(ruta):
+                escritas.append(ruta)
+            return almacenamiento_documentos.save(nombre, contenido)
+
+        with transaction.atomic():
+            try:
+                yield guardar
+            except BaseException:
+                # Todavía con las filas bloqueadas: nadie más pudo reutilizarlos
+                for ruta in escritas:
+                    almacenamiento_documentos.delete(ruta)
+                raise
+            sin_uso = cls.objects.filter(pk__in=reservadas, referencias=0)
+            for ruta in sin_uso.values_list("ruta", flat=True):
+                cls._borrar_al_confirmar(ruta)
+
+    @classmethod
+    def referenciar(cls, ruta: str, tamano: int = 0):
+        with transaction.atomic():
+            _, creado = cls.objects.select_for_update().get_or_create(
+                ruta=ruta, defaults={"tamano": tamano, "referencias": 1}
+            )
+            if not creado:
+                cls.objects.filter(pk=ruta).update(referencias=F("referencias") + 1)
+
+    @classmethod
+    def referenciar_varios(cls, archivos: list[tuple[str, int]]):
+        """Como ``referenciar`` para varios archivos ``(ruta, tamano)`` a la vez."""
+        conteos = Counter(ruta for ruta, _ in archivos)
+        tamanos = dict(archivos)
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(ruta=ruta, tamano=tamanos[ruta], referencias=0) for ruta in conteos],
+                ignore_conflicts=True,
+            )
+            por_cantidad = {}
+            for ruta, cantidad in conteos.items():
+                por_cantidad.setdefault(cantidad, []).append(ruta)
+            for cantidad, rutas in por_cantidad.items():
+                cls.objects.filter(pk__in=rutas).update(referencias=F("referencias") + cantidad)
+
+    @classmethod
+    def liberar(cls, ruta: str):
+        """Resta una referencia; sin referencias, el archivo se borra al confirmar."""
+        if not almacenamiento_documentos.es_ruta_contenido(ruta):
+            # Archivos subidos antes del almacenamiento por contenido: uno por documento
+            transaction.on_commit(lambda: almacenamiento_documentos.delete(ruta))
+            return
+
+        with transaction.atomic():
+            archivo = cls.objects.select_for_update().filter(pk=ruta).first()
+            if archivo is None:
+                return
+            if archivo.referencias > 1:
+                cls.objects.filter(pk=ruta).update(referencias=F("referencias") - 1)
+                return
+            archivo.delete()
+
+        cls._borrar_al_confirmar(ruta)
+
+    @classmethod
+    def reemplazar(cls, anterior: str, nueva: str, tamano: int, sha256: str | None = None):
+        """
+        Cambia a ``nueva`` todos los documentos que usan el contenido
+        ``anterior`` (p. ej. tras optimizarlo o archivarlo) y mueve sus
+        referencias. Sin ``sha256`` el contenido es el mismo en otra ruta.
+        """
+        cambios = {"archivo": nueva} if sha256 is None else {"archivo": nueva, "sha256": sha256}
+        with transaction.atomic():
+            fila = cls.objects.select_for_update().filter(pk=anterior).first()
+            actualizados = DocumentoSolicitud.objects.filter(archivo=anterior).update(**cambios)
+            if actualizados and almacenamiento_documentos.es_ruta_contenido(nueva):
+                cls.referenciar_varios([(nueva, tamano)] * actualizados)
+            if fila is not None:
+                fila.delete()
+        cls._borrar_al_confirmar(anterior, vista_previa=sha256 is not None)
+
+    @classmethod
+    def _borrar_al_confirmar(cls, ruta: str, vista_previa: bool = True):
+        def borrar():
+            # Con la fila bloqueada (o creada vacía): una subida del mismo
+            # contenido espera en ``guardando`` hasta que se borre y lo vuelve a escribir
+            with transaction.atomic():
+                fila, _ = cls.objects.select_for_update().get_or_create(
+                    ruta=ruta, defaults={"referencias": 0}
+                )
+                if fila.referencias:
+                    return
+                almacenamiento_documentos.delete(ruta)
+                if vista_previa:
+                    sha256 = posixpath.basename(ruta).split(".", 1)[0]
+                    almacenamiento_documentos.delete(ruta_vista_previa(sha256))
+                fila.delete()
+
+        transaction.on_commit(borrar)
+
+
 class DocumentoSolicitud(models.Model):
     solicitud = models.ForeignKey(
         Solicitud, on_delete=models.CASCADE, related_name="documentos"
@@ -84,7 +240,13 @@ class DocumentoSolicitud(models.Model):
         Requisito, on_delete=models.PROTECT, related_name="documentos_solicitud"
     )
     archivo = models.FileField(
-        upload_to="solicitudes/%Y/%m/%d", validators=[validar_archivo_documento]
+        upload_to="solicitudes/%Y/%m/%d",
+        storage=obtener_almacenamiento_documentos,
+        validators=[validar_archivo_documento],
+    )
+    sha256 = models.CharField(
+        max_length=64, blank=True, default="", editable=False, db_index=True,
+        help_text="SHA-256 del contenido del archivo",
     )
     fecha_subida = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
@@ -92,6 +254,73 @@ class DocumentoSolicitud(models.Model):
         unique_together = ["solicitud", "requisito"]
         ordering = ["fecha_subida"]
 
+    def nombre_descarga(self) -> str:
+        """Nombre legible del archivo: el del requisito con la extensión original."""
+        ruta = almacenamiento_documentos.ruta_activa(self.archivo.name)
+        extension = posixpath.splitext(ruta)[1].lower()
+        try:
+            base = get_valid_filename(self.requisito.nombre)
+        except SuspiciousFileOperation:
+            base = f"documento_{self.pk}"
+        return f"{base}{extension}"
+
+    def save(self, *args, **kwargs):
+        nuevo_archivo = bool(self.archivo) and not self.archivo._committed
+        anterior = None
+        if nuevo_archivo:
+            # Archivo recién asignado: el hash ya viene calculado por DocumentoUploadHandler
+            self.sha256 = calcular_sha256(self.archivo)
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "sha256"}
+            if self.pk:
+                anterior = (
+                    DocumentoSolicitud.objects.filter(pk=self.pk)
+                    .values_list("archivo", flat=True)
+                    .first()
+                )
+
+        # Para las señales: el archivo cambió en este guardado
+        self.archivo_nuevo = nuevo_archivo
+        with ArchivoDocumento.guardando() as guardar:
+            if nuevo_archivo:
+                self.guardar_archivo(guardar)
+                ArchivoDocumento.referenciar(self.archivo.name, self.archivo.size)
+            super().save(*args, **kwargs)
+            if nuevo_archivo and anterior and anterior != self.archivo.name:
+                ArchivoDocumento.liberar(anterior)
+
+    def guardar_archivo(self, guardar):
+        """Escribe el archivo asignado con ``guardar`` (de ``ArchivoDocumento.guardando``)."""
+        nombre = self.archivo.field.generate_filename(self, self.archivo.name)
+        self.archivo.name = guardar(nombre, self.archivo.file)
+        self.archivo._committed = True
+
+
+class SubidaDocumento(models.Model):
+    """
+    Sesión de subida reanudable de un documento: el archivo llega por partes
+    (ver ``tramites.services.subidas``) a un temporal y al finalizar se
+    adjunta como ``DocumentoSolicitud``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="subidas_documentos"
+    )
+    solicitud = models.ForeignKey(
+        Solicitud, on_delete=models.CASCADE, related_name="subidas"
+    )
+    requisito = models.ForeignKey(
+        Requisito, on_delete=models.CASCADE, related_name="subidas"
+    )
+    nombre = models.CharField(max_length=255, help_text="Nombre original del archivo")
+    tamano = models.PositiveIntegerField(help_text="Tamaño total declarado en bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
 
 class SolicitudAsignacion(models.Model):
     """
@@ -0,0 +1,158 @@
+"""
+Archivo de documentos de solicitudes cerradas.
+
+Los documentos de solicitudes aprobadas o rechazadas hace más de un año casi no
+se consultan. ``archivar_contenido`` los copia al volumen de archivo
+(``settings.DOCUMENTOS_ARCHIVO_ROOT``), comprimidos con gzip cuando conviene, y
+``aplicar_archivado`` cambia las rutas de los documentos en la base de datos;
+la copia del volumen principal se borra al confirmar.
+
+Un contenido solo se archiva si *todos* los documentos que lo usan son de
+solicitudes archivables (la misma INE puede estar en una solicitud en curso).
+El storage abre los archivados de forma transparente, así que descargas, URLs
+firmadas y el ZIP del expediente siguen funcionando sin cambios;
+``restaurar_contenido`` los regresa al volumen principal si se reabren.
+"""
+
+import gzip
+import os
+import posixpath
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.choices import EstatusSolicitud
+from tramites.models import ArchivoDocumento, DocumentoSolicitud, almacenamiento_documentos
+
+ESTATUS_ARCHIVABLES = (EstatusSolicitud.APROBADO, EstatusSolicitud.RECHAZADO)
+
+DIAS_ARCHIVO = 365
+
+# Formatos que ya vienen comprimidos: se copian tal cual
+EXTENSIONES_COMPRIMIDAS = (".jpg", ".jpeg", ".png", ".webp", ".zip", ".gz")
+
+# El gzip se conserva solo si pesa menos de esta fracción del original
+AHORRO_MINIMO = 0.9
+
+
+def filtro_archivables(dias: int = DIAS_ARCHIVO) -> Q:
+    """Documentos de solicitudes cerradas sin cambios en los últimos ``dias``."""
+    return Q(
+        solicitud__estatus__in=ESTATUS_ARCHIVABLES,
+        solicitud__updated_at__lt=timezone.now() - timedelta(days=dias),
+    )
+
+
+def rutas_archivables(dias: int = DIAS_ARCHIVO):
+    """
+    Rutas (ordenadas, sin repetir) del volumen principal que solo usan
+    documentos archivables.
+    """
+    elegibles = filtro_archivables(dias)
+    en_uso = DocumentoSolicitud.objects.exclude(elegibles).values("archivo")
+    return (
+        DocumentoSolicitud.objects.filter(elegibles)
+        .exclude(archivo="")
+        .exclude(archivo__startswith=f"{almacenamiento_documentos.PREFIJO_ARCHIVADO}/")
+        .exclude(archivo__in=en_uso)
+        .values_list("archivo", flat=True)
+        .distinct()
+        .order_by("archivo")
+    )
+
+
+def _escribir_y_sincronizar(origen, destino: str, comprimir: bool) -> None:
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(destino), prefix=f".{os.path.basename(destino)}.",
+        suffix=".tmp", delete=False,
+    ) as salida:
+        temporal = salida.name
+        if comprimir:
+            with gzip.GzipFile(fileobj=salida, mode="wb", compresslevel=6, mtime=0) as gz:
+                shutil.copyfileobj(origen, gz)
+        else:
+            shutil.copyfileobj(origen, salida)
+        salida.flush()
+        os.fsync(salida.fileno())
+    os.replace(temporal, destino)
+
+
+def archivar_contenido(ruta: str) -> tuple[str, int, int]:
+    """
+    Copia ``ruta`` al volumen de archivo (sin tocar la base de datos).
+
+    Returns:
+        ``(ruta archivada, bytes originales, bytes en el archivo)``
+    """
+    storage = almacenamiento_documentos
+    tamano = storage.size(ruta)
+    origen = storage.path(ruta)
+    comprimir = posixpath.splitext(ruta)[1].lower() not in EXTENSIONES_COMPRIMIDAS
+
+    if comprimir:
+        nueva = storage.ruta_archivada(ruta, comprimida=True)
+        destino = storage.path(nueva)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        with open(origen, "rb") as archivo:
+            _escribir_y_sincronizar(archivo, destino, comprimir=True)
+        tamano_archivo = os.path.getsize(destino)
+        if tamano_archivo < tamano * AHORRO_MINIMO:
+            return nueva, tamano, tamano_archivo
+        # No valió la pena: se guarda sin comprimir
+        os.remove(destino)
+
+    nueva = storage.ruta_archivada(ruta)
+    destino = storage.path(nueva)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(origen, "rb") as archivo:
+        _escribir_y_sincronizar(archivo, destino, comprimir=False)
+    return nueva, tamano, tamano
+
+
+def aplicar_archivado(cambios: list[tuple[str, str, int]], dias: int = DIAS_ARCHIVO) -> int:
+    """
+    Apunta los documentos de cada ``(ruta, ruta archivada, tamaño)`` a su
+    copia archivada en una sola transacción. Los originales se borran al
+    confirmar.
+
+    Con la fila del contenido bloqueada se vuelve a revisar que todos sus
+    documentos sigan siendo archivables: si mientras se copiaba lo reutilizó
+    una solicitud en curso, se conserva en el volumen principal y se borra la
+    copia archivada.
+
+    Returns:
+        Contenidos archivados
+    """
+    elegibles = filtro_archivables(dias)
+    descartadas = []
+    with transaction.atomic():
+        for ruta, nueva, tamano in cambios:
+            # Bloqueo: una subida del mismo contenido espera en ArchivoDocumento.guardando
+            ArchivoDocumento.objects.select_for_update().filter(pk=ruta).first()
+            documentos = DocumentoSolicitud.objects.select_for_update().filter(archivo=ruta)
+            if documentos.exclude(elegibles).exists():
+                descartadas.append(nueva)
+                continue
+            ArchivoDocumento.reemplazar(ruta, nueva, tamano)
+
+    for nueva in descartadas:
+        # La misma ruta archivada pudo quedar de un archivado anterior del mismo contenido
+        if not DocumentoSolicitud.objects.filter(archivo=nueva).exists():
+            almacenamiento_documentos.delete(nueva)
+    return len(cambios) - len(descartadas)
+
+
+def restaurar_contenido(ruta: str) -> str:
+    """Regresa un contenido archivado al volumen principal; devuelve la nueva ruta."""
+    storage = almacenamiento_documentos
+    with storage.open(ruta, "rb") as archivo:
+        contenido = ContentFile(archivo.read(), name=storage.ruta_activa(ruta))
+    with ArchivoDocumento.guardando() as guardar:
+        nueva = guardar(contenido.name, contenido)
+        ArchivoDocumento.reemplazar(ruta, nueva, contenido.size)
+    return nueva
@@ -0,0 +1,106 @@
+"""
+Alta de varios documentos de una solicitud en una sola operación.
+
+En lugar de un ``DocumentoSolicitud.objects.create`` por archivo (cada uno con
+su señal y sus notificaciones), se validan todos los archivos, se guardan en el
+almacenamiento, se insertan con un solo ``bulk_create`` y se envía una única
+notificación por destinatario.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from core.utils import calcular_sha256, validar_archivo_documento
+from tramites.models import ArchivoDocumento, DocumentoSolicitud
+from tramites.services.optimizacion import es_imagen, optimizar_en_segundo_plano
+from tramites.signals import notification_manager
+
+# Prefijo de los campos multipart: documentos_<id del requisito>
+PREFIJO_CAMPO = "documentos_"
+
+
+def archivos_por_requisito(solicitud, archivos) -> tuple[list, dict]:
+    """
+    Relaciona los campos ``documentos_<requisito_id>`` de ``archivos``
+    (``request.FILES``) con los requisitos de la solicitud que piden documento.
+
+    Returns:
+        ``(pares, errores)``: pares ``(requisito, archivo)`` y errores por campo
+    """
+    if solicitud.programa_social:
+        requisitos = solicitud.programa_social.requisitos_especificos.filter(
+            requiere_documento=True
+        )
+    else:
+        requisitos = solicitud.tramite_tipo.requisitos.filter(requiere_documento=True)
+    requisitos = {f"{PREFIJO_CAMPO}{requisito.id}": requisito for requisito in requisitos}
+
+    pares, errores = [], {}
+    for campo, archivo in archivos.items():
+        if not campo.startswith(PREFIJO_CAMPO):
+            continue
+        requisito = requisitos.get(campo)
+        if requisito is None:
+            errores[campo] = ["El requisito no pertenece a esta solicitud o no requiere documento"]
+            continue
+        try:
+            validar_archivo_documento(archivo)
+        except ValidationError as e:
+            errores[campo] = e.messages
+            continue
+        pares.append((requisito, archivo))
+    return pares, errores
+
+
+def adjuntar_documentos(solicitud, pares) -> list[DocumentoSolicitud]:
+    """
+    Guarda los archivos ya validados ``(requisito, archivo)`` como documentos de
+    la solicitud. Si un requisito ya tenía documento, se reemplaza.
+
+    Returns:
+        Documentos creados o reemplazados
+    """
+    if not pares:
+        return []
+
+    documentos = []
+    with ArchivoDocumento.guardando() as guardar:
+        for requisito, archivo in pares:
+            documento = DocumentoSolicitud(solicitud=solicitud, requisito=requisito)
+            documento.sha256 = calcular_sha256(archivo)
+            documento.archivo = archivo
+            # Escribe el archivo en el almacenamiento sin guardar el registro
+            documento.guardar_archivo(guardar)
+            documentos.append(documento)
+
+        anteriores = dict(
+            DocumentoSolicitud.objects.filter(
+                solicitud=solicitud, requisito__in=[requisito for requisito, _ in pares]
+            ).values_list("requisito_id", "archivo")
+        )
+        DocumentoSolicitud.objects.bulk_create(
+            documentos,
+            update_conflicts=True,
+            unique_fields=["solicitud", "requisito"],
+            update_fields=["archivo", "sha256", "fecha_subida"],
+        )
+        ArchivoDocumento.referenciar_varios(
+            [(documento.archivo.name, documento.archivo.size) for documento in documentos]
+        )
+        for documento in documentos:
+            anterior = anteriores.get(documento.requisito_id)
+            if anterior:
+                ArchivoDocumento.liberar(anterior)
+
+        # bulk_create no dispara post_save: una notificación por destinatario
+        requisitos = [requisito for requisito, _ in pares]
+        transaction.on_commit(
+            lambda: notification_manager.notificar_documentos_recibidos(solicitud, requisitos)
+        )
+        imagenes = [
+            documento.pk
+            for documento in documentos
+            if documento.pk and es_imagen(documento.archivo.name)
+        ]
+        transaction.on_commit(lambda: optimizar_en_segundo_plano(imagenes))
+    return documentos
@@ -0,0 +1,151 @@
+"""
+Optimización de fotos de documentos (INE, comprobantes...) tras subirlas.
+
+La mayoría de los documentos son fotos de celular de varios MB. Después de
+confirmar la subida, en segundo plano:
+
+- se aplica la orientación EXIF y se descartan los metadatos (ubicación,
+  modelo del teléfono...),
+- se reduce a ``DIMENSION_MAXIMA`` (legible para revisión),
+- se re-codifica como JPEG a ``CALIDAD_JPEG``,
+- se genera una miniatura para la pantalla de revisión del funcionario.
+
+El resultado solo reemplaza al original si es claramente más chico. Se activa
+con ``settings.DOCUMENTOS_OPTIMIZAR_IMAGENES``.
+"""
+
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from PIL import Image, ImageOps
+
+from tramites.models import ArchivoDocumento, DocumentoSolicitud, ruta_vista_previa
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png")
+
+DIMENSION_MAXIMA = 2000
+CALIDAD_JPEG = 80
+
+DIMENSION_VISTA_PREVIA = 320
+CALIDAD_VISTA_PREVIA = 70
+
+# El optimizado reemplaza al original solo si pesa menos de esta fracción
+AHORRO_MINIMO = 0.9
+
+# Arriba de esto no se decodifica: un PNG de 5 MB puede ocupar ~500 MB en memoria
+PIXELES_MAXIMOS = 40_000_000
+
+# Hilos del worker web dedicados a optimizar (las demás subidas esperan en cola)
+HILOS_OPTIMIZACION = 2
+
+_ejecutor = ThreadPoolExecutor(max_workers=HILOS_OPTIMIZACION, thread_name_prefix="optimizacion")
+
+
+class ImagenDemasiadoGrande(ValueError):
+    pass
+
+
+def es_imagen(nombre: str) -> bool:
+    return posixpath.splitext(nombre)[1].lower() in EXTENSIONES_IMAGEN
+
+
+def _a_rgb(imagen: Image.Image) -> Image.Image:
+    # Documentos: la transparencia se aplana sobre blanco
+    if imagen.mode in ("RGBA", "LA", "PA") or (
+        imagen.mode == "P" and "transparency" in imagen.info
+    ):
+        rgba = imagen.convert("RGBA")
+        fondo = Image.new("RGB", imagen.size, (255, 255, 255))
+        fondo.paste(rgba, mask=rgba.getchannel("A"))
+        return fondo
+    return imagen if imagen.mode in ("RGB", "L") else imagen.convert("RGB")
+
+
+def _jpeg(imagen: Image.Image, calidad: int, icc_profile=None) -> bytes:
+    buffer = io.BytesIO()
+    # Sin exif=...: Pillow no copia los metadatos originales
+    imagen.save(
+        buffer,
+        format="JPEG",
+        quality=calidad,
+        optimize=True,
+        progressive=True,
+        icc_profile=icc_profile,
+    )
+    return buffer.getvalue()
+
+
+def recodificar(datos: bytes) -> tuple[bytes, bytes]:
+    """
+    Returns:
+        ``(optimizado, vista_previa)`` en JPEG
+    """
+    imagen = Image.open(io.BytesIO(datos))
+    ancho, alto = imagen.size
+    if ancho * alto > PIXELES_MAXIMOS:
+        raise ImagenDemasiadoGrande(f"{ancho}x{alto} px")
+    icc_profile = imagen.info.get("icc_profile")
+    # JPEG: decodifica directamente a escala reducida cuando es mucho más grande
+    imagen.draft("RGB", (DIMENSION_MAXIMA, DIMENSION_MAXIMA))
+    imagen = ImageOps.exif_transpose(imagen)
+    imagen.thumbnail((DIMENSION_MAXIMA, DIMENSION_MAXIMA), Image.Resampling.LANCZOS)
+    imagen = _a_rgb(imagen)
+    optimizado = _jpeg(imagen, CALIDAD_JPEG, icc_profile)
+
+    imagen.thumbnail(
+        (DIMENSION_VISTA_PREVIA, DIMENSION_VISTA_PREVIA), Image.Resampling.LANCZOS
+    )
+    return optimizado, _jpeg(imagen, CALIDAD_VISTA_PREVIA)
+
+
+def optimizar_documento(documento_id: int) -> None:
+    documento = DocumentoSolicitud.objects.filter(pk=documento_id).first()
+    if documento is None or not documento.archivo or not es_imagen(documento.archivo.name):
+        return
+
+    storage = documento.archivo.storage
+    ruta = documento.archivo.name
+    with storage.open(ruta, "rb") as archivo:
+        original = archivo.read()
+    sha256 = documento.sha256 or hashlib.sha256(original).hexdigest()
+
+    try:
+        optimizado, vista_previa = recodificar(original)
+    except ImagenDemasiadoGrande as e:
+        logger.warning("Documento %s sin optimizar: imagen de %s", documento_id, e)
+        return
+
+    if len(optimizado) < len(original) * AHORRO_MINIMO:
+        contenido = ContentFile(optimizado, name="documento.jpg")
+        contenido.sha256 = sha256 = hashlib.sha256(optimizado).hexdigest()
+        with ArchivoDocumento.guardando() as guardar:
+            nueva = guardar(contenido.name, contenido)
+            if nueva != ruta:
+                ArchivoDocumento.reemplazar(ruta, nueva, len(optimizado), sha256)
+
+    storage.guardar_derivado(ruta_vista_previa(sha256), vista_previa)
+
+
+def optimizar_en_segundo_plano(documento_ids: list[int]) -> None:
+    if not getattr(settings, "DOCUMENTOS_OPTIMIZAR_IMAGENES", False):
+        return
+
+    for documento_id in documento_ids:
+        _ejecutor.submit(_optimizar, documento_id)
+
+
+def _optimizar(documento_id: int) -> None:
+    try:
+        optimizar_documento(documento_id)
+    except Exception:
+        logger.exception("No se pudo optimizar el documento %s", documento_id)
+    finally:
+        connection.close()
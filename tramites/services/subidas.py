@@ -0,0 +1,213 @@
+"""
+Subidas reanudables de documentos para conexiones inestables.
+
+Protocolo (todas las rutas bajo ``/tramites/subidas/``):
+
+1. ``POST /`` con ``solicitud``, ``requisito``, ``nombre`` y ``tamano``: crea
+   la sesión y devuelve su ``id``.
+2. ``PATCH /{id}/`` con el cuerpo en bruto (``application/octet-stream``) y la
+   cabecera ``Upload-Offset``: agrega la parte al temporal. Si el desplazamiento
+   no coincide con lo recibido responde 409 con el desplazamiento correcto.
+3. ``GET /{id}/``: cuántos bytes se han recibido (para reanudar).
+4. ``POST /{id}/finalizar/``: valida el archivo completo y lo adjunta como
+   ``DocumentoSolicitud`` en una transacción.
+
+Las partes se escriben directamente al temporal conforme llegan; lo que alcanzó
+a escribirse antes de un corte cuenta como recibido, así que un reintento solo
+envía los bytes que faltan.
+"""
+
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File, locks
+from django.db import transaction
+from django.utils import timezone
+
+from core.utils import (
+    LARGO_FIRMA,
+    TAMANO_MAXIMO_DOCUMENTO,
+    calcular_sha256,
+    detectar_tipo_documento,
+    validar_archivo_documento,
+)
+from tramites.models import DocumentoSolicitud, SubidaDocumento
+
+# Tiempo que se conserva una subida sin finalizar
+VIGENCIA_SUBIDA = timedelta(hours=24)
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+class DesfaseSubida(Exception):
+    """La parte no empieza donde termina lo recibido."""
+
+    def __init__(self, recibidos: int):
+        super().__init__(f"Se esperaba el desplazamiento {recibidos}")
+        self.recibidos = recibidos
+
+
+class _ArchivoCompleto(File):
+    """El temporal completo; ``FileSystemStorage`` lo mueve en vez de copiarlo."""
+
+    def __init__(self, ruta: Path, nombre: str):
+        super().__init__(open(ruta, "rb"), name=nombre)
+        self.ruta = ruta
+
+    def temporary_file_path(self):
+        return str(self.ruta)
+
+
+def directorio_subidas() -> Path:
+    return Path(settings.SUBIDAS_TEMPORALES_DIR)
+
+
+def ruta_temporal(subida: SubidaDocumento) -> Path:
+    return directorio_subidas() / f"{subida.id}.part"
+
+
+def bytes_recibidos(subida: SubidaDocumento) -> int:
+    try:
+        return ruta_temporal(subida).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _verificar_vigencia(subida: SubidaDocumento) -> None:
+    if subida.expira <= timezone.now():
+        raise ValueError("La subida expiró o fue cancelada.")
+
+
+def _mismo_archivo(ruta: Path, abierto) -> bool:
+    try:
+        return os.stat(ruta).st_ino == os.fstat(abierto.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def crear_subida(usuario, solicitud, requisito, nombre: str, tamano: int) -> SubidaDocumento:
+    if not 0 < tamano <= TAMANO_MAXIMO_DOCUMENTO:
+        raise ValueError("El archivo no debe exceder 5MB.")
+
+    limpiar_subidas_vencidas()
+    subida = SubidaDocumento.objects.create(
+        usuario=usuario,
+        solicitud=solicitud,
+        requisito=requisito,
+        nombre=nombre,
+        tamano=tamano,
+        expira=timezone.now() + VIGENCIA_SUBIDA,
+    )
+    directorio_subidas().mkdir(parents=True, exist_ok=True)
+    ruta_temporal(subida).touch()
+    return subida
+
+
+def agregar_parte(subida: SubidaDocumento, desplazamiento: int, flujo) -> int:
+    """
+    Escribe en el temporal lo que llegue de ``flujo`` a partir de
+    ``desplazamiento``.
+
+    Returns:
+        Bytes recibidos en total
+    """
+    _verificar_vigencia(subida)
+    ruta = ruta_temporal(subida)
+    if not ruta.exists():
+        raise ValueError("La subida expiró o fue cancelada.")
+
+    with open(ruta, "r+b") as temporal:
+        # Una sola parte a la vez por subida (reintentos simultáneos del cliente)
+        locks.lock(temporal, locks.LOCK_EX)
+        try:
+            # Mientras se esperaba el candado la subida pudo finalizarse: el
+            # temporal ya se movió (u otro archivo ocupa su nombre)
+            if not _mismo_archivo(ruta, temporal):
+                raise ValueError("La subida ya fue finalizada o cancelada.")
+            recibidos = os.fstat(temporal.fileno()).st_size
+            if desplazamiento != recibidos:
+                raise DesfaseSubida(recibidos)
+
+            temporal.seek(recibidos)
+            restante = subida.tamano - recibidos
+            while bloque := flujo.read(min(TAMANO_BLOQUE, restante + 1)):
+                if len(bloque) > restante:
+                    raise ValueError("Se recibieron más bytes que el tamaño declarado.")
+                temporal.write(bloque)
+                restante -= len(bloque)
+                temporal.flush()
+
+                # Validación temprana del tipo en cuanto llegan los primeros bytes
+                if recibidos < LARGO_FIRMA <= temporal.tell() or restante == 0:
+                    recibidos = temporal.tell()
+                    temporal.seek(0)
+                    tipo = detectar_tipo_documento(temporal.read(LARGO_FIRMA))
+                    temporal.seek(recibidos)
+                    if tipo is None:
+                        temporal.truncate(0)
+                        raise ValueError(
+                            "Tipo de archivo no válido. Solo se permiten: PDF, JPG, PNG"
+                        )
+            return temporal.tell()
+        finally:
+            locks.unlock(temporal)
+
+
+def finalizar_subida(subida: SubidaDocumento) -> DocumentoSolicitud:
+    """Valida el archivo completo y lo adjunta (o reemplaza) como documento de la solicitud."""
+    _verificar_vigencia(subida)
+    ruta = ruta_temporal(subida)
+    if not ruta.exists():
+        raise ValueError("La subida expiró o fue cancelada.")
+
+    with open(ruta, "rb") as candado:
+        # El mismo candado que agregar_parte: ninguna parte llega mientras se
+        # calcula el hash y se mueve el temporal
+        locks.lock(candado, locks.LOCK_EX)
+        try:
+            recibidos = os.fstat(candado.fileno()).st_size
+            if recibidos != subida.tamano:
+                raise ValueError(
+                    f"Faltan bytes: se recibieron {recibidos} de {subida.tamano}."
+                )
+
+            archivo = _ArchivoCompleto(ruta, subida.nombre)
+            try:
+                archivo.sha256 = calcular_sha256(archivo)
+                archivo.tipo_detectado = detectar_tipo_documento(archivo.read(LARGO_FIRMA))
+                archivo.seek(0)
+                validar_archivo_documento(archivo)
+
+                with transaction.atomic():
+                    documento = DocumentoSolicitud.objects.filter(
+                        solicitud=subida.solicitud, requisito=subida.requisito
+                    ).first()
+                    if documento is None:
+                        documento = DocumentoSolicitud(
+                            solicitud=subida.solicitud, requisito=subida.requisito
+                        )
+                    documento.archivo = archivo
+                    documento.save()
+                    subida.delete()
+            finally:
+                archivo.close()
+
+            # Si el contenido ya existía el temporal no se movió
+            ruta.unlink(missing_ok=True)
+        finally:
+            locks.unlock(candado)
+    return documento
+
+
+def cancelar_subida(subida: SubidaDocumento) -> None:
+    ruta_temporal(subida).unlink(missing_ok=True)
+    subida.delete()
+
+
+def limpiar_subidas_vencidas() -> int:
+    vencidas = list(SubidaDocumento.objects.filter(expira__lt=timezone.now())[:100])
+    for subida in vencidas:
+        cancelar_subida(subida)
+    return len(vencidas)
@@ -1,7 +1,14 @@
-from django.db.models.signals import post_save, m2m_changed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, m2m_changed
 from django.dispatch import receiver
-from tramites.models import Solicitud, DocumentoSolicitud, SolicitudAsignacion
+from tramites.models import (
+    ArchivoDocumento,
+    DocumentoSolicitud,
+    Solicitud,
+    SolicitudAsignacion,
+)
 from notificaciones.services import NotificationManager
+from tramites.services.optimizacion import es_imagen, optimizar_en_segundo_plano
 from core.choices import EstatusSolicitud
 
 
@@ -48,34 +55,26 @@ def notificar_documento_subido(sender, instance, created, **kwargs):
     Solo notificación interna, sin email para evitar spam.
     """
     if created:
-        # Notificar al ciudadano (sin email para evitar spam)
-        notification_manager.crear_notificacion(
-            usuario=instance.solicitud.ciudadano.usuario,
-            tipo="DOCUMENTO_RECIBIDO",
-            titulo="Documento Recibido",
-            mensaje=f"Se ha agregado el documento para el requisito '{instance.requisito.nombre}' a su solicitud.",
-            solicitud=instance.solicitud,
-            metadata={
-                "requisito": instance.requisito.nombre,
-                "folio": f"SOL-{instance.solicitud.id:06d}",
-            },
-            forzar_sin_email=True,  # No enviar email por documentos
+        # Ciudadano y funcionarios asignados (solo bandeja interna)
+        notification_manager.notificar_documentos_recibidos(
+            instance.solicitud, [instance.requisito]
         )
 
-        # Notificar a los funcionarios asignados (solo bandeja interna)
-        asignaciones_activas = instance.solicitud.asignaciones.filter(activo=True)
-        for asignacion in asignaciones_activas:
-            notification_manager.crear_notificacion(
-                usuario=asignacion.funcionario,
-                tipo="DOCUMENTO_RECIBIDO",
-                titulo="Nuevo Documento en Solicitud",
-                mensaje=f"Se ha agregado un nuevo documento a la solicitud {instance.solicitud.ciudadano.nombre_completo}.",
-                solicitud=instance.solicitud,
-                metadata={
-                    "requisito": instance.requisito.nombre,
-                    "folio": f"SOL-{instance.solicitud.id:06d}",
-                },
-            )
+
+@receiver(post_save, sender=DocumentoSolicitud)
+def optimizar_documento_subido(sender, instance, **kwargs):
+    """Optimiza las fotos de documentos en segundo plano al confirmar la subida."""
+    if not getattr(instance, "archivo_nuevo", False) or not es_imagen(instance.archivo.name):
+        return
+    documento_id = instance.pk
+    transaction.on_commit(lambda: optimizar_en_segundo_plano([documento_id]))
+
+
+@receiver(post_delete, sender=DocumentoSolicitud)
+def liberar_archivo_documento(sender, instance, **kwargs):
+    """Resta la referencia al contenido del documento (se borra al llegar a cero)."""
+    if instance.archivo:
+        ArchivoDocumento.liberar(instance.archivo.name)
 
 
 @receiver(post_save, sender=SolicitudAsignacion)
@@ -72,9 +72,11 @@ class ActualizarContactoCiudadanoView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-from rest_framework import generics, filters
+from rest_framework import generics
 from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Q
+from core.search import filtrar_por_nombre
 from usuarios.models import Usuario
 
 class StandardResultsSetPagination(LimitOffsetPagination):
@@ -86,13 +88,22 @@ class UsuarioListView(generics.ListAPIView):
     serializer_class = UsuarioListSerializer
     permission_classes = [IsAuthenticated] # TODO: Add IsAdminUser
     pagination_class = StandardResultsSetPagination
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['username', 'ciudadano__nombre', 'ciudadano__apellido_paterno', 'funcionario__nombre_completo']
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['rol']
     
     def get_queryset(self):
         # Allow filtering by role through query params if needed beyond basic filterset
         queryset = super().get_queryset()
+
+        # Búsqueda por nombre sin acentos y tolerante a errores (ciudadano o funcionario)
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset = filtrar_por_nombre(
+                queryset,
+                ['ciudadano__nombre_busqueda', 'funcionario__nombre_busqueda'],
+                search,
+                extra=Q(username__icontains=search),
+            )
         return queryset
 
 